@@ -0,0 +1,74 @@
+"""Compare l'encodage MCP JSON historique et les codecs binaires.
+
+Usage : python -m benchmarks.bench_codec [--iterations N]
+"""
+import argparse
+import json
+import timeit
+from src.core import codec
+
+def _message(description_size: int) -> dict:
+    return {
+        "message_type": "vision_analysis",
+        "content": {
+            "description": "a red silk scarf with a geometric pattern " * description_size,
+            "features": {
+                "color": "rouge",
+                "pattern": "géométrique",
+                "material": "soie",
+                "style": "élégant",
+                "dimensions": "90×90cm"
+            },
+            "scores": [0.1 * i for i in range(32)]
+        },
+        "metadata": {
+            "customer_id": "33612345678",
+            "correlation_id": "9a881458fe4248d18acc1702d5e67e7a",
+            "reply_to": "agent_responses:2c4ff7",
+            "timestamp": "2026-10-18T10:00:00"
+        },
+        "ttl": 3600
+    }
+
+def _json_path(payload: dict):
+    """Chemin historique : json.dumps, puis json.loads après .decode()"""
+    data = json.dumps(payload).encode()
+    return (
+        lambda: json.dumps(payload).encode(),
+        lambda: json.loads(data.decode()),
+        len(data)
+    )
+
+def _codec_path(payload: dict, name: str, compression: str):
+    data = codec.encode(payload, codec=name, compression=compression)
+    return (
+        lambda: codec.encode(payload, codec=name, compression=compression),
+        lambda: codec.decode(data),
+        len(data)
+    )
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    variants = [("json (to_json/from_json)", lambda p: _json_path(p))]
+    for name in ("json", "msgpack"):
+        for compression in ("none", "zlib"):
+            variants.append((
+                f"{name}+{compression}",
+                lambda p, n=name, c=compression: _codec_path(p, n, c)
+            ))
+
+    print(f"{'payload':<8} {'variant':<26} {'encode µs':>10} {'decode µs':>10} {'bytes':>8}")
+    for label, size in (("small", 1), ("large", 500)):
+        payload = _message(size)
+        iterations = args.iterations if label == "small" else max(args.iterations // 20, 100)
+        for variant, build in variants:
+            encode, decode, length = build(payload)
+            encode_us = timeit.timeit(encode, number=iterations) / iterations * 1e6
+            decode_us = timeit.timeit(decode, number=iterations) / iterations * 1e6
+            print(f"{label:<8} {variant:<26} {encode_us:>10.2f} {decode_us:>10.2f} {length:>8}")
+
+if __name__ == "__main__":
+    main()
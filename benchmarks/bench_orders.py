@@ -0,0 +1,101 @@
+"""Compare l'insertion des commandes par l'unité de travail ORM et par insert_order.
+
+Pour chaque taille de commande, rapporte le débit (commandes/s) et la latence
+p50/p95 d'une commande, insérée et validée dans sa propre transaction. Sans
+--database-url, une base sqlite temporaire est utilisée.
+
+Usage : python -m benchmarks.bench_orders [--items 1 10 100] [--orders 200]
+        [--database-url postgresql://…]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.orm import sessionmaker
+from src.core.database import Base, async_session_scope, create_pooled_async_engine
+from src.core.models import Customer, Order, OrderItem, Product
+from src.core.orders import insert_order
+
+CATALOGUE_SIZE = 100
+
+def _seed(url: str):
+    engine = create_engine(url)
+    Base.metadata.create_all(engine)
+    with sessionmaker(bind=engine)() as db:
+        if db.get(Customer, 1) is None:
+            db.add(Customer(id=1, name="Benchmark"))
+            db.add_all(
+                Product(id=product_id, name=f"Foulard {product_id}", price=20.0 + product_id, stock_quantity=10**6)
+                for product_id in range(1, CATALOGUE_SIZE + 1)
+            )
+            db.commit()
+    engine.dispose()
+
+async def _orm_order(db, lines):
+    """Chemin d'origine : un objet par ligne, insérés au flush"""
+    order = Order(customer_id=1, status="pending", total_amount=0)
+    db.add(order)
+    total_amount = 0
+    for product_id, quantity, price in lines:
+        db.add(OrderItem(order=order, product_id=product_id, quantity=quantity, price_at_time=price))
+        total_amount += price * quantity
+    order.total_amount = total_amount
+    await db.flush()
+
+async def _bulk_order(db, lines):
+    await insert_order(db, 1, lines)
+
+async def _run(session_factory, create, items: int, orders: int) -> dict:
+    lines = [
+        (product_id % CATALOGUE_SIZE + 1, 1, 20.0 + product_id % CATALOGUE_SIZE + 1)
+        for product_id in range(items)
+    ]
+    # Première commande hors mesure : connexion, compilation des requêtes
+    async with async_session_scope(session_factory) as db:
+        await create(db, lines)
+
+    latencies = []
+    for _ in range(orders):
+        start = time.perf_counter()
+        async with async_session_scope(session_factory) as db:
+            await create(db, lines)
+        latencies.append(time.perf_counter() - start)
+
+    latencies.sort()
+    return {
+        "orders_per_sec": orders / sum(latencies),
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000
+    }
+
+async def _bench(url: str, sizes: list, orders: int):
+    engine = create_pooled_async_engine(url, name="bench")
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+    print(f"{'path':<6} {'items':>5} {'orders/s':>10} {'p50 ms':>10} {'p95 ms':>10}")
+    for items in sizes:
+        for path, create in (("orm", _orm_order), ("bulk", _bulk_order)):
+            result = await _run(session_factory, create, items, orders)
+            print(
+                f"{path:<6} {items:>5} {result['orders_per_sec']:>10.1f} "
+                f"{result['p50_ms']:>10.2f} {result['p95_ms']:>10.2f}"
+            )
+    await engine.dispose()
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", nargs="+", type=int, default=[1, 10, 100])
+    parser.add_argument("--orders", type=int, default=200)
+    parser.add_argument("--database-url", help="base de test : des commandes y sont ajoutées")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        url = args.database_url or f"sqlite:///{os.path.join(directory, 'orders.db')}"
+        _seed(url)
+        asyncio.run(_bench(url, args.items, args.orders))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Compare les modes d'inférence de BLIP-2 du VisionAgent.
+
+Pour chaque mode et nombre de faisceaux, rapporte le débit (images/s) et la
+latence p50/p95 d'un lot. Sans --image, des images synthétiques sont utilisées.
+
+Usage : python -m benchmarks.bench_vision [--modes cpu_fp32 cpu_int8]
+        [--beams 5 1] [--batch-size 1] [--batches 10] [--image foulard.jpg]
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+from PIL import Image, ImageDraw
+from src.agents.vision_agent import VisionAgent, resolve_inference_mode
+from src.core.config import settings, VisionInferenceMode
+from src.core.model_registry import ModelRegistry
+
+def _synthetic_image(directory: str, seed: int) -> str:
+    rng = random.Random(seed)
+    image = Image.new("RGB", (640, 640), "white")
+    draw = ImageDraw.Draw(image)
+    for _ in range(40):
+        x, y = rng.randint(0, 600), rng.randint(0, 600)
+        color = tuple(rng.randint(0, 255) for _ in range(3))
+        draw.ellipse([x, y, x + rng.randint(20, 200), y + rng.randint(20, 200)], fill=color)
+    path = os.path.join(directory, f"scarf-{seed}.jpg")
+    image.save(path, quality=90)
+    return path
+
+async def _run(mode: VisionInferenceMode, beams: int, images: list, batches: int) -> dict:
+    settings.VISION_NUM_BEAMS = beams
+    agent = VisionAgent()
+    agent.inference_mode = resolve_inference_mode(mode)
+    agent.model_registry = ModelRegistry(memory_budget_mb=0)
+    agent.analysis_cache = None
+    await agent.initialize()
+
+    async with agent.model_registry.use("blip2"):
+        # Premier lot hors mesure : allocations, chargement de l'extracteur
+        agent._analyze_images(images)
+
+        latencies = []
+        for _ in range(batches):
+            start = time.perf_counter()
+            agent._analyze_images(images)
+            latencies.append(time.perf_counter() - start)
+
+    await agent.model_registry.close()
+    latencies.sort()
+    return {
+        "images_per_sec": len(images) * batches / sum(latencies),
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000
+    }
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--modes",
+        nargs="+",
+        default=[VisionInferenceMode.CPU_FP32.value, VisionInferenceMode.CPU_INT8.value],
+        choices=[mode.value for mode in VisionInferenceMode]
+    )
+    parser.add_argument("--beams", nargs="+", type=int, default=[5, 1])
+    parser.add_argument("--batch-size", type=int, default=1)
+    parser.add_argument("--batches", type=int, default=10)
+    parser.add_argument("--image", help="image à analyser (sinon images synthétiques)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        if args.image:
+            images = [args.image] * args.batch_size
+        else:
+            images = [_synthetic_image(directory, seed) for seed in range(args.batch_size)]
+
+        print(f"threads={settings.VISION_CPU_THREADS or 'default'} batch_size={args.batch_size}")
+        print(f"{'mode':<12} {'beams':>5} {'images/s':>10} {'p50 ms':>10} {'p95 ms':>10}")
+        for mode in args.modes:
+            for beams in args.beams:
+                result = asyncio.run(_run(VisionInferenceMode(mode), beams, images, args.batches))
+                print(
+                    f"{mode:<12} {beams:>5} {result['images_per_sec']:>10.2f} "
+                    f"{result['p50_ms']:>10.0f} {result['p95_ms']:>10.0f}"
+                )
+
+if __name__ == "__main__":
+    main()
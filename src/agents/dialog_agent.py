@@ -4,24 +4,36 @@ from langchain.prompts import PromptTemplate
 from src.core.agent_base import BaseAgent
 from src.core.mcp import MCPMessage
 from src.core.config import settings, ModelProvider
+from src.core.history import create_history_store
+from src.core.llm_cache import LLMResponseCache
+from src.core.model_registry import model_registry
 
 class DialogAgent(BaseAgent):
     def __init__(self):
         super().__init__()
-        self.llm = None
-        self.conversation_history = {}
+        self.model_registry = model_registry
+        self.history_store = create_history_store()
+        self.response_cache = (
+            LLMResponseCache(f"{settings.MODEL_PROVIDER.value}:{settings.MODEL_NAME}")
+            if settings.LLM_CACHE_ENABLED else None
+        )
         
     async def initialize(self):
-        """Initialise le modèle de langage selon la configuration"""
+        """Déclare le modèle de langage ; il est chargé au premier message"""
+        estimated_mb = 4400 if settings.MODEL_PROVIDER == ModelProvider.LOCAL else 0
+        self.model_registry.register("dialog_llm", self._create_llm, estimated_mb=estimated_mb)
+        
+    def _create_llm(self):
+        """Crée le modèle de langage selon la configuration"""
         if settings.MODEL_PROVIDER == ModelProvider.OPENROUTER:
             from langchain_openrouter import ChatOpenRouter
-            self.llm = ChatOpenRouter(
+            return ChatOpenRouter(
                 api_key=settings.OPENROUTER_API_KEY,
                 model="google/gemini-2.5-pro"
             )
         elif settings.MODEL_PROVIDER == ModelProvider.LOCAL:
             from langchain_community.llms import LlamaCpp
-            self.llm = LlamaCpp(
+            return LlamaCpp(
                 model_path="./models/mistral-7b-instruct-v0.2.Q4_K_M.gguf",
                 temperature=0.7,
                 max_tokens=2000,
@@ -30,7 +42,7 @@ class DialogAgent(BaseAgent):
             )
         else:  # OpenAI par défaut
             from langchain_openai import ChatOpenAI
-            self.llm = ChatOpenAI(temperature=0.7)
+            return ChatOpenAI(temperature=0.7)
             
     async def process(self, message: MCPMessage) -> MCPMessage:
         """Traite un message client et génère une réponse appropriée"""
@@ -39,25 +51,35 @@ class DialogAgent(BaseAgent):
             return self._error_response("Customer ID required")
             
         # Récupérer l'historique de conversation
-        history = self.conversation_history.get(customer_id, [])
+        history = await self.history_store.get(customer_id)
         
         # Préparer le prompt avec le contexte
         prompt = self._prepare_prompt(message.content, history)
         
         try:
-            # Générer la réponse
-            response = await self.llm.apredict(prompt)
+            # Générer la réponse ; avec un historique, le prompt est propre au client
+            # et n'est pas mis en cache
+            cacheable = self.response_cache is not None and not history
+            response = await self.response_cache.get(prompt) if cacheable else None
+            if response is None:
+                # Le modèle n'est chargé qu'en l'absence de réponse en cache
+                async with self.model_registry.use("dialog_llm") as llm:
+                    response = await llm.apredict(prompt)
+                if cacheable:
+                    await self.response_cache.set(prompt, response)
             
-            # Mettre à jour l'historique
-            history.append({
-                "role": "user",
-                "content": message.content.get("text", "")
-            })
-            history.append({
-                "role": "assistant",
-                "content": response
-            })
-            self.conversation_history[customer_id] = history[-10:]  # Garder les 10 derniers messages
+            # Mettre à jour l'historique (borné à HISTORY_MAX_MESSAGES messages)
+            await self.history_store.append(
+                customer_id,
+                {
+                    "role": "user",
+                    "content": message.content.get("text", "")
+                },
+                {
+                    "role": "assistant",
+                    "content": response
+                }
+            )
             
             return MCPMessage(
                 message_type="dialog_response",
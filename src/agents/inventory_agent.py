@@ -1,18 +1,36 @@
 from typing import Optional, List, Dict
+import asyncio
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import async_sessionmaker
 from sqlalchemy.orm import Session
 from src.core.agent_base import BaseAgent
+from src.core.availability_cache import AvailabilityCache
+from src.core.config import settings
 from src.core.mcp import MCPMessage
-from src.core.models import Product, Order
-from src.core.database import get_db
+from src.core.models import Product, Order, StockReservation
+from src.core.database import async_session_scope, run_read_only, session_scope
+from src.core.reservations import hold_stock, validate_quantity
+from src.core.vector_index import ProductVectorIndex, track_product_changes
 
 class InventoryAgent(BaseAgent):
     def __init__(self):
         super().__init__()
-        self.db: Optional[Session] = None
+        # Une AsyncSession par appel de handler ; None = moteur asyncio du processus
+        self.session_factory: Optional[async_sessionmaker] = None
+        self.similarity_index = ProductVectorIndex()
+        self.availability_cache = (
+            AvailabilityCache(self.mcp_broker)
+            if settings.AVAILABILITY_CACHE_ENABLED else None
+        )
         
     async def initialize(self):
-        """Initialise la connexion à la base de données"""
-        self.db = next(get_db())
+        """Charge l'index de similarité"""
+        # Construction de l'index (CPU) hors de la boucle, sur une session synchrone
+        with session_scope() as db:
+            await asyncio.to_thread(self.similarity_index.load_or_build, db)
+        track_product_changes(self.similarity_index)
+        if self.availability_cache is not None:
+            await self.availability_cache.start()
         
     async def process(self, message: MCPMessage) -> MCPMessage:
         """Gère les requêtes liées à l'inventaire"""
@@ -20,7 +38,10 @@ class InventoryAgent(BaseAgent):
         
         handlers = {
             "check_availability": self._check_availability,
+            "check_products": self._check_products,
+            "search_products": self._search_products,
             "reserve_product": self._reserve_product,
+            "reserve_products": self._reserve_products,
             "update_stock": self._update_stock,
             "get_similar_products": self._get_similar_products
         }
@@ -50,56 +71,184 @@ class InventoryAgent(BaseAgent):
         if not product_id:
             raise ValueError("Product ID required")
             
-        product = self.db.query(Product).filter(Product.id == product_id).first()
-        if not product:
-            raise ValueError("Product not found")
+        quantity = (
+            await self.availability_cache.get(product_id)
+            if self.availability_cache is not None else None
+        )
+        if quantity is None:
+            # Relevées avant la lecture : une invalidation concurrente annule le remplissage
+            generations = (
+                await self.availability_cache.generations([product_id])
+                if self.availability_cache is not None else None
+            )
+            async with async_session_scope(self.session_factory) as db:
+                quantity = (await db.execute(
+                    # Stock non renseigné : indisponible, à distinguer d'un produit absent
+                    select(func.coalesce(Product.stock_quantity, 0)).where(Product.id == product_id)
+                )).scalar_one_or_none()
+            if quantity is None:
+                raise ValueError("Product not found")
+            if self.availability_cache is not None:
+                await self.availability_cache.set(product_id, quantity, generations)
             
+        # Indicatif : la réservation reste un UPDATE conditionnel, le cache ne peut pas provoquer de survente
         return {
             "product_id": product_id,
-            "available": product.stock_quantity > 0,
-            "quantity": product.stock_quantity
+            "available": quantity > 0,
+            "quantity": quantity
+        }
+        
+    async def _check_products(self, content: Dict) -> Dict:
+        """Disponibilité et prix de plusieurs produits, en une seule requête"""
+        product_ids = list(dict.fromkeys(content.get("product_ids") or []))
+        if not product_ids:
+            raise ValueError("Product IDs required")
+            
+        generations = (
+            await self.availability_cache.generations(product_ids)
+            if self.availability_cache is not None else None
+        )
+        async with async_session_scope(self.session_factory) as db:
+            rows = await db.execute(
+                select(
+                    Product.id,
+                    Product.name,
+                    Product.price,
+                    func.coalesce(Product.stock_quantity, 0).label("stock_quantity")
+                )
+                .where(Product.id.in_(product_ids))
+            )
+            found = {
+                p.id: {
+                    "product_id": p.id,
+                    "name": p.name,
+                    "price": p.price,
+                    "available": p.stock_quantity > 0,
+                    "quantity": p.stock_quantity
+                }
+                for p in rows
+            }
+        products = [found[product_id] for product_id in product_ids if product_id in found]
+        if self.availability_cache is not None:
+            await self.availability_cache.set_many(
+                {p["product_id"]: p["quantity"] for p in products},
+                generations
+            )
+        
+        return {
+            "products": products,
+            "missing": [product_id for product_id in product_ids if product_id not in found]
         }
         
+    async def _search_products(self, content: Dict) -> Dict:
+        """Produits en stock, filtrés sur le nom si une recherche est fournie"""
+        query = content.get("query")
+        limit = content.get("limit", 10)
+        
+        async def read(db) -> List[Dict]:
+            statement = select(Product.id, Product.name, Product.price, Product.stock_quantity).where(
+                Product.stock_quantity > 0
+            )
+            if query:
+                statement = statement.where(Product.name.ilike(f"%{query}%"))
+            rows = await db.execute(statement.order_by(Product.id).limit(limit))
+            return [
+                {
+                    "product_id": p.id,
+                    "name": p.name,
+                    "price": p.price,
+                    "quantity": p.stock_quantity
+                }
+                for p in rows
+            ]
+            
+        return {"query": query, "products": await run_read_only(read, self.session_factory)}
+        
     async def _reserve_product(self, content: Dict) -> Dict:
-        """Réserve une quantité de produit pour une commande"""
+        """Réserve une quantité de produit pour une commande, pour RESERVATION_TTL secondes"""
         product_id = content.get("product_id")
-        quantity = content.get("quantity", 1)
+        quantity = validate_quantity(content.get("quantity", 1))
         
-        product = self.db.query(Product).filter(Product.id == product_id).first()
-        if not product:
-            raise ValueError("Product not found")
-            
-        if product.stock_quantity < quantity:
-            raise ValueError("Insufficient stock")
+        reserved = await self._hold({product_id: quantity}, content.get("order_id"))
+        await self._invalidate_availability([product_id])
+        return reserved[0]
+        
+    async def _reserve_products(self, content: Dict) -> Dict:
+        """Réserve tous les articles d'une commande, ou aucun"""
+        quantities: Dict[int, int] = {}
+        for item in content.get("items") or []:
+            product_id = item.get("product_id")
+            if product_id is None:
+                raise ValueError("Product ID required")
+            quantities[product_id] = (
+                quantities.get(product_id, 0) + validate_quantity(item.get("quantity", 1))
+            )
+        if not quantities:
+            raise ValueError("Items required")
             
-        # Réserver le stock
-        product.stock_quantity -= quantity
-        self.db.commit()
+        reserved = await self._hold(quantities, content.get("order_id"))
+        await self._invalidate_availability(quantities)
+        return {"reserved": reserved}
         
-        return {
-            "product_id": product_id,
-            "reserved_quantity": quantity,
-            "remaining_stock": product.stock_quantity
-        }
+    async def _hold(self, quantities: Dict[int, int], order_id: Optional[int]) -> List[Dict]:
+        """Retire le stock et l'inscrit au registre des réservations, en une transaction.
+        
+        Sans paiement avant l'expiration, le stock est restitué par le ReservationSweeper.
+        """
+        async with async_session_scope(self.session_factory) as db:
+            holds = await db.run_sync(hold_stock, quantities, order_id=order_id)
+            # Lu avant le commit, qui expire les objets de la session
+            return [
+                {
+                    "product_id": hold["reservation"].product_id,
+                    "reserved_quantity": hold["reservation"].quantity,
+                    "remaining_stock": hold["remaining_stock"],
+                    "reservation_id": hold["reservation"].id,
+                    "expires_at": hold["reservation"].expires_at.isoformat()
+                }
+                for hold in holds
+            ]
+        
+    async def _invalidate_availability(self, product_ids):
+        """Propage un changement de stock au cache de disponibilité de tous les réplicas"""
+        if self.availability_cache is not None:
+            await self.availability_cache.invalidate(product_ids)
         
     async def _update_stock(self, content: Dict) -> Dict:
-        """Met à jour le stock d'un produit"""
+        """Met à jour le stock d'un produit à partir de la quantité physiquement présente.
+        
+        Les réservations actives en sont déduites dans la même requête : `stock_quantity`
+        reste le stock vendable, sans réservation en cours.
+        """
         product_id = content.get("product_id")
         new_quantity = content.get("quantity")
         
         if None in (product_id, new_quantity):
             raise ValueError("Product ID and quantity required")
             
-        product = self.db.query(Product).filter(Product.id == product_id).first()
-        if not product:
-            raise ValueError("Product not found")
-            
-        product.stock_quantity = new_quantity
-        self.db.commit()
+        held = (
+            select(func.coalesce(func.sum(StockReservation.quantity), 0))
+            .where(StockReservation.product_id == product_id, StockReservation.status == "held")
+            .scalar_subquery()
+        )
+        async with async_session_scope(self.session_factory) as db:
+            available = (await db.execute(
+                update(Product)
+                .where(Product.id == product_id, held <= new_quantity)
+                .values(stock_quantity=new_quantity - held)
+                .returning(Product.stock_quantity)
+                .execution_options(synchronize_session=False)
+            )).scalar_one_or_none()
+            if available is None:
+                if await db.get(Product, product_id) is None:
+                    raise ValueError("Product not found")
+                raise ValueError(f"Quantity below the stock held for product {product_id}")
+        await self._invalidate_availability([product_id])
         
         return {
             "product_id": product_id,
-            "new_quantity": new_quantity
+            "new_quantity": new_quantity,
+            "available_quantity": available
         }
         
     async def _get_similar_products(self, content: Dict) -> Dict:
@@ -107,26 +256,67 @@ class InventoryAgent(BaseAgent):
         product_id = content.get("product_id")
         limit = content.get("limit", 5)
         
-        product = self.db.query(Product).filter(Product.id == product_id).first()
-        if not product:
-            raise ValueError("Product not found")
+        async with async_session_scope(self.session_factory) as db:
+            # Relation dynamique et chargements paresseux : parcours ORM synchrone
+            similar_products = await db.run_sync(self._find_similar_products, product_id, limit)
             
-        similar_products = (
-            product.similar_products
-            .filter(Product.stock_quantity > 0)
-            .limit(limit)
-            .all()
-        )
-        
         return {
             "product_id": product_id,
-            "similar_products": [
-                {
-                    "id": p.id,
-                    "name": p.name,
-                    "price": p.price,
-                    "stock_quantity": p.stock_quantity
-                }
-                for p in similar_products
+            "similar_products": similar_products
+        }
+        
+    def _find_similar_products(self, db: Session, product_id: int, limit: int) -> List[Dict]:
+        product = db.query(Product).filter(Product.id == product_id).first()
+        if not product:
+            raise ValueError("Product not found")
+            
+        if product.embedding:
+            similar_products = self._search_similar_in_stock(db, product, limit)
+        else:
+            # Sans embedding, repli sur les associations saisies manuellement
+            similar_products = [
+                (p, None)
+                for p in (
+                    product.similar_products
+                    .filter(Product.stock_quantity > 0)
+                    .limit(limit)
+                    .all()
+                )
             ]
-        }
\ No newline at end of file
+        
+        return [
+            {
+                "id": p.id,
+                "name": p.name,
+                "price": p.price,
+                "stock_quantity": p.stock_quantity,
+                "similarity": similarity
+            }
+            for p, similarity in similar_products
+        ]
+        
+    def _search_similar_in_stock(self, db: Session, product: Product, limit: int) -> list:
+        """Voisins les plus proches dans l'index FAISS, filtrés sur le stock en une requête"""
+        candidates = [
+            (product_id, score)
+            for product_id, score in self.similarity_index.search(
+                product.get_embedding(),
+                (limit + 1) * settings.VECTOR_INDEX_OVERSAMPLE
+            )
+            if product_id != product.id
+        ]
+        if not candidates:
+            return []
+            
+        in_stock = {
+            p.id: p
+            for p in db.query(Product).filter(
+                Product.id.in_([product_id for product_id, _ in candidates]),
+                Product.stock_quantity > 0
+            )
+        }
+        return [
+            (in_stock[product_id], score)
+            for product_id, score in candidates
+            if product_id in in_stock
+        ][:limit]
\ No newline at end of file
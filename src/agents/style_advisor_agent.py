@@ -1,20 +1,20 @@
 from typing import Optional, List, Dict
 import numpy as np
 from sklearn.cluster import KMeans
+from sqlalchemy import select
 from src.core.agent_base import BaseAgent
 from src.core.mcp import MCPMessage
 from src.core.models import Product, Customer
-from src.core.database import get_db
+from src.core.database import run_read_only
 
 class StyleAdvisorAgent(BaseAgent):
     def __init__(self):
         super().__init__()
-        self.db = None
+        self.session_factory = None  # moteur asyncio du processus par défaut
         self.style_clusters = None
         
     async def initialize(self):
         """Initialise l'agent de conseil en style"""
-        self.db = next(get_db())
         await self._initialize_style_clusters()
         
     async def process(self, message: MCPMessage) -> MCPMessage:
@@ -45,13 +45,14 @@ class StyleAdvisorAgent(BaseAgent):
             
     async def _initialize_style_clusters(self):
         """Initialise les clusters de style basés sur les données produits"""
-        products = self.db.query(Product).all()
-        features = []
-        
-        for product in products:
+        async def read(db) -> List[List[float]]:
             # Extraire les caractéristiques pertinentes
-            feature_vector = self._extract_style_features(product)
-            features.append(feature_vector)
+            return [
+                self._extract_style_features(product)
+                for product in (await db.execute(select(Product))).scalars()
+            ]
+            
+        features = await run_read_only(read, self.session_factory)
             
         # Créer des clusters de style
         if features:
@@ -66,13 +67,18 @@ class StyleAdvisorAgent(BaseAgent):
         
     async def _generate_recommendations(self, customer_id: str, context: Dict) -> Dict:
         """Génère des recommandations de style personnalisées"""
-        customer = self.db.query(Customer).filter(Customer.id == customer_id).first()
-        
-        if not customer:
-            raise ValueError("Customer not found")
+        async def read(db) -> Dict:
+            customer = (await db.execute(
+                select(Customer).where(Customer.id == customer_id)
+            )).scalar_one_or_none()
+            
+            if not customer:
+                raise ValueError("Customer not found")
+                
+            # Analyser les préférences du client
+            return self._analyze_customer_preferences(customer)
             
-        # Analyser les préférences du client
-        preferences = self._analyze_customer_preferences(customer)
+        preferences = await run_read_only(read, self.session_factory)
         
         # Générer des recommandations contextuelles
         occasion = context.get("occasion", "casual")
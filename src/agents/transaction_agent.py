@@ -1,18 +1,33 @@
-from typing import Optional, Dict
+from typing import Optional, Dict, Sequence, Set
+from sqlalchemy.ext.asyncio import async_sessionmaker
 from sqlalchemy.orm import Session
 from src.core.agent_base import BaseAgent
-from src.core.mcp import MCPMessage
-from src.core.models import Order, OrderItem, Customer
-from src.core.database import get_db
+from src.core.availability_cache import AvailabilityCache
+from src.core.config import settings
+from src.core.mcp import MCPMessage, MCPResponseRouter
+from src.core.models import Order, Customer, StockReservation
+from src.core.orders import insert_order
+from src.core.database import async_session_scope, run_read_only
+from src.core.reservations import convert_holds, decrement_stock, release_holds, validate_quantity
 
 class TransactionAgent(BaseAgent):
-    def __init__(self):
+    def __init__(self, response_router: Optional[MCPResponseRouter] = None):
         super().__init__()
-        self.db: Optional[Session] = None
+        # Une AsyncSession par appel de handler ; None = moteur asyncio du processus
+        self.session_factory: Optional[async_sessionmaker] = None
+        # Requêtes vers l'InventoryAgent ; partagé avec l'application quand il est fourni
+        self.response_router = response_router
+        # Sert uniquement à diffuser les invalidations vers l'InventoryAgent
+        self.availability_cache = (
+            AvailabilityCache(self.mcp_broker)
+            if settings.AVAILABILITY_CACHE_ENABLED else None
+        )
         
     async def initialize(self):
-        """Initialise la connexion à la base de données"""
-        self.db = next(get_db())
+        """Initialise le canal de réponse"""
+        if self.response_router is None:
+            self.response_router = MCPResponseRouter(self.mcp_broker)
+            await self.response_router.start()
         
     async def process(self, message: MCPMessage) -> MCPMessage:
         """Gère les transactions et les commandes"""
@@ -53,35 +68,50 @@ class TransactionAgent(BaseAgent):
         if not customer_id or not items:
             raise ValueError("Customer ID and items required")
             
-        # Créer la commande
-        order = Order(
-            customer_id=customer_id,
-            status="pending",
-            total_amount=0
-        )
-        self.db.add(order)
-        
-        # Ajouter les articles
-        total_amount = 0
         for item in items:
-            order_item = OrderItem(
-                order=order,
-                product_id=item["product_id"],
-                quantity=item["quantity"],
-                price_at_time=item["price"]
-            )
-            total_amount += item["price"] * item["quantity"]
-            self.db.add(order_item)
+            validate_quantity(item.get("quantity"))
+            
+        # Prix et stock de tout le panier en un seul aller-retour
+        products = await self._check_products([item["product_id"] for item in items])
+        requested: Dict[int, int] = {}
+        for item in items:
+            requested[item["product_id"]] = requested.get(item["product_id"], 0) + item["quantity"]
+        for product_id, quantity in requested.items():
+            if products[product_id]["quantity"] < quantity:
+                raise ValueError(f"Insufficient stock for product {product_id}")
+            
+        # Articles au prix du catalogue, jamais à celui envoyé par le client
+        lines = []
+        for item in items:
+            price = products[item["product_id"]]["price"]
+            if price is None:
+                raise ValueError(f"No price for product {item['product_id']}")
+            lines.append((item["product_id"], item["quantity"], price))
             
-        order.total_amount = total_amount
-        self.db.commit()
+        async with async_session_scope(self.session_factory) as db:
+            order = await insert_order(db, customer_id, lines, content.get("shipping_address"))
         
         return {
-            "order_id": order.id,
-            "total_amount": total_amount,
+            "order_id": order["order_id"],
+            "total_amount": order["total_amount"],
             "status": "pending"
         }
         
+    async def _check_products(self, product_ids) -> Dict[int, Dict]:
+        """Interroge l'InventoryAgent pour tous les produits d'une commande"""
+        response = await self.response_router.request(
+            "inventory_requests",
+            MCPMessage(
+                message_type="inventory_request",
+                content={"action": "check_products", "product_ids": product_ids}
+            )
+        )
+        if response.message_type == "error":
+            raise ValueError(response.content.get("error"))
+        if response.content["missing"]:
+            raise ValueError(f"Product {response.content['missing'][0]} not found")
+        return {product["product_id"]: product for product in response.content["products"]}
+        
     async def _update_order_status(self, content: Dict) -> Dict:
         """Met à jour le statut d'une commande"""
         order_id = content.get("order_id")
@@ -90,12 +120,21 @@ class TransactionAgent(BaseAgent):
         if None in (order_id, new_status):
             raise ValueError("Order ID and status required")
             
-        order = self.db.query(Order).filter(Order.id == order_id).first()
-        if not order:
-            raise ValueError("Order not found")
-            
-        order.status = new_status
-        self.db.commit()
+        released_products: Set[int] = set()
+        async with async_session_scope(self.session_factory) as db:
+            order = await db.get(Order, order_id)
+            if not order:
+                raise ValueError("Order not found")
+                
+            order.status = new_status
+            if new_status == "cancelled":
+                # Le stock réservé pour la commande est restitué immédiatement
+                await db.run_sync(
+                    release_holds,
+                    StockReservation.order_id == order_id,
+                    released_products=released_products
+                )
+        await self._invalidate_availability(released_products)
         
         return {
             "order_id": order_id,
@@ -110,15 +149,15 @@ class TransactionAgent(BaseAgent):
         if None in (order_id, payment_method):
             raise ValueError("Order ID and payment method required")
             
-        order = self.db.query(Order).filter(Order.id == order_id).first()
-        if not order:
-            raise ValueError("Order not found")
-            
         # TODO: Intégrer avec un système de paiement réel
         # Simulation de paiement réussi
-        order.payment_status = "paid"
-        order.status = "confirmed"
-        self.db.commit()
+        async with async_session_scope(self.session_factory) as db:
+            changed_products = await db.run_sync(
+                self._settle_order,
+                order_id,
+                content.get("reservation_ids") or ()
+            )
+        await self._invalidate_availability(changed_products)
         
         return {
             "order_id": order_id,
@@ -126,6 +165,38 @@ class TransactionAgent(BaseAgent):
             "payment_status": "paid"
         }
         
+    @staticmethod
+    def _settle_order(db: Session, order_id: int, reservation_ids: Sequence[int]) -> Set[int]:
+        """Confirme une commande payée ; retourne les produits dont le stock a changé"""
+        order = db.query(Order).filter(Order.id == order_id).first()
+        if not order:
+            raise ValueError("Order not found")
+        if order.payment_status == "paid":
+            # Message redélivré (transport au moins une fois) : déjà réglée
+            return set()
+            
+        # Les réservations actives deviennent définitives ; la part expirée (ou jamais
+        # réservée) de chaque article est reprise sur le stock maintenant, sans survente
+        shortfall: Dict[int, int] = {}
+        for item in order.items:
+            shortfall[item.product_id] = shortfall.get(item.product_id, 0) + item.quantity
+        changed_products: Set[int] = set()
+        for product_id, quantity in convert_holds(
+            db, order_id, reservation_ids, released_products=changed_products
+        ):
+            shortfall[product_id] = shortfall.get(product_id, 0) - quantity
+        quantities = {product_id: quantity for product_id, quantity in shortfall.items() if quantity > 0}
+        for product_id in sorted(quantities):
+            decrement_stock(db, product_id, quantities[product_id])
+                
+        order.payment_status = "paid"
+        order.status = "confirmed"
+        return changed_products | set(quantities)
+        
+    async def _invalidate_availability(self, product_ids):
+        if product_ids and self.availability_cache is not None:
+            await self.availability_cache.invalidate(product_ids)
+        
     async def _get_order_status(self, content: Dict) -> Dict:
         """Récupère le statut d'une commande"""
         order_id = content.get("order_id")
@@ -133,14 +204,18 @@ class TransactionAgent(BaseAgent):
         if not order_id:
             raise ValueError("Order ID required")
             
-        order = self.db.query(Order).filter(Order.id == order_id).first()
-        if not order:
-            raise ValueError("Order not found")
+        async def read(db) -> Dict:
+            order = await db.get(Order, order_id)
+            if not order:
+                raise ValueError("Order not found")
+                
+            return {
+                "order_id": order_id,
+                "status": order.status,
+                "payment_status": order.payment_status,
+                "total_amount": order.total_amount,
+                "created_at": order.created_at.isoformat()
+            }
             
-        return {
-            "order_id": order_id,
-            "status": order.status,
-            "payment_status": order.payment_status,
-            "total_amount": order.total_amount,
-            "created_at": order.created_at.isoformat()
-        }
\ No newline at end of file
+        # Servi par le réplica s'il est à jour à DB_REPLICA_MAX_LAG près
+        return await run_read_only(read, self.session_factory)
\ No newline at end of file
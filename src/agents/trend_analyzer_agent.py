@@ -1,21 +1,22 @@
 from typing import List, Dict, Optional
 from datetime import datetime, timedelta
 import json
+from sqlalchemy import select
 from src.core.agent_base import BaseAgent
 from src.core.mcp import MCPMessage
 from src.core.models import Product, Interaction
-from src.core.database import get_db
+from src.core.database import run_read_only
 
 class TrendAnalyzerAgent(BaseAgent):
     def __init__(self):
         super().__init__()
-        self.db = None
+        self.session_factory = None  # moteur asyncio du processus par défaut
         self.trends_cache = {}
         self.cache_ttl = timedelta(hours=1)
         
     async def initialize(self):
         """Initialise l'agent d'analyse des tendances"""
-        self.db = next(get_db())
+        pass
         
     async def process(self, message: MCPMessage) -> MCPMessage:
         """Traite une demande d'analyse des tendances"""
@@ -58,7 +59,7 @@ class TrendAnalyzerAgent(BaseAgent):
                 return cached_data["data"]
                 
         # Analyser les interactions récentes
-        recent_interactions = self._get_recent_interactions()
+        recent_interactions = await self._get_recent_interactions()
         
         # Analyser les ventes récentes
         sales_trends = self._analyze_sales_trends()
@@ -117,24 +118,26 @@ class TrendAnalyzerAgent(BaseAgent):
             "confidence_scores": self._calculate_confidence_scores(predictions)
         }
         
-    def _get_recent_interactions(self) -> List[Dict]:
+    async def _get_recent_interactions(self) -> List[Dict]:
         """Récupère les interactions récentes avec les produits"""
         cutoff_date = datetime.now() - timedelta(days=30)
         
-        interactions = (
-            self.db.query(Interaction)
-            .filter(Interaction.timestamp >= cutoff_date)
-            .all()
-        )
-        
-        return [
-            {
-                "type": i.interaction_type,
-                "content": i.content,
-                "timestamp": i.timestamp.isoformat()
-            }
-            for i in interactions
-        ]
+        async def read(db) -> List[Dict]:
+            interactions = (await db.execute(
+                select(Interaction)
+                .where(Interaction.timestamp >= cutoff_date)
+            )).scalars().all()
+            
+            return [
+                {
+                    "type": i.interaction_type,
+                    "content": i.content,
+                    "timestamp": i.timestamp.isoformat()
+                }
+                for i in interactions
+            ]
+            
+        return await run_read_only(read, self.session_factory)
         
     def _analyze_sales_trends(self) -> Dict:
         """Analyse les tendances de ventes"""
@@ -1,64 +1,128 @@
-from typing import Optional
+from typing import List, Optional
 import re
+import asyncio
 import torch
-from PIL import Image
 import structlog
 from transformers import AutoProcessor, AutoModelForVision2Seq
 from src.core.agent_base import BaseAgent
+from src.core.batching import MicroBatcher
+from src.core.config import settings, VisionInferenceMode
+from src.core.image_cache import ImageAnalysisCache
+from src.core.ingestion import DecodedImage, image_ingestor
 from src.core.mcp import MCPMessage
+from src.core.model_registry import model_registry
+from src.core.zero_shot import EmbeddingZeroShotClassifier
 
 logger = structlog.get_logger()
 
+# Caractéristiques recherchées dans les descriptions de foulards
+SCARF_FEATURE_CANDIDATES = {
+    "color": [
+        "rouge", "bleu", "vert", "jaune", "noir", "blanc", "rose",
+        "violet", "marron", "gris", "doré", "argenté", "multicolore"
+    ],
+    "pattern": [
+        "fleuri", "rayé", "à pois", "géométrique", "uni", "cachemire",
+        "abstrait", "animal", "paisley", "chevron", "ethnique"
+    ],
+    "material": [
+        "soie", "coton", "laine", "modal", "cachemire", "polyester",
+        "viscose", "lin", "satin", "mousseline"
+    ],
+    "style": [
+        "classique", "bohème", "moderne", "vintage", "élégant",
+        "casual", "luxe", "minimaliste", "romantique"
+    ]
+}
+
+# Mémoire approximative de BLIP-2 (opt-2.7b) selon le mode d'inférence
+BLIP2_ESTIMATED_MB = {
+    VisionInferenceMode.CUDA_FP16: 7800,
+    VisionInferenceMode.CPU_FP32: 15600,
+    VisionInferenceMode.CPU_INT8: 5000
+}
+
+def resolve_inference_mode(mode: Optional[VisionInferenceMode] = None) -> VisionInferenceMode:
+    """Résout le mode AUTO selon la présence d'un GPU"""
+    mode = mode or settings.VISION_INFERENCE_MODE
+    if mode == VisionInferenceMode.AUTO:
+        return VisionInferenceMode.CUDA_FP16 if torch.cuda.is_available() else VisionInferenceMode.CPU_FP32
+    return mode
+
 class VisionAgent(BaseAgent):
     def __init__(self):
         super().__init__()
-        self.model = None
-        self.processor = None
+        self.model_registry = model_registry
+        self.inference_mode = resolve_inference_mode()
+        self.batcher: Optional[MicroBatcher] = None
+        self.feature_extractor = EmbeddingZeroShotClassifier(SCARF_FEATURE_CANDIDATES)
+        self.analysis_cache = ImageAnalysisCache() if settings.VISION_CACHE_ENABLED else None
         
     async def initialize(self):
-        """Initialise le modèle de vision"""
-        # Utilise Salesforce BLIP-2 par défaut, mais peut être remplacé par d'autres modèles
-        self.processor = AutoProcessor.from_pretrained("Salesforce/blip2-opt-2.7b")
-        self.model = AutoModelForVision2Seq.from_pretrained("Salesforce/blip2-opt-2.7b", torch_dtype=torch.float16)
-        
-        if torch.cuda.is_available():
-            self.model = self.model.to("cuda")
+        """Déclare les modèles de vision ; ils sont chargés à la première analyse"""
+        self.model_registry.register(
+            "blip2",
+            self._load_blip2,
+            estimated_mb=BLIP2_ESTIMATED_MB[self.inference_mode]
+        )
+        self.model_registry.register(
+            "scarf_features",
+            self._load_feature_extractor,
+            self._unload_feature_extractor,
+            estimated_mb=500
+        )
+            
+        # L'inférence s'exécute hors de la boucle asyncio, par lots de requêtes concurrentes
+        self.batcher = MicroBatcher(
+            self._analyze_images,
+            max_batch_size=settings.VISION_BATCH_SIZE,
+            max_wait_ms=settings.VISION_BATCH_WAIT_MS,
+            name="blip2"
+        )
             
     async def process(self, message: MCPMessage) -> MCPMessage:
         """Analyse une image et extrait des informations sur le foulard"""
-        image_path = message.content.get("image_path")
-        if not image_path:
+        if not message.content.get("image_path") and not message.content.get("image_url"):
             return MCPMessage(
                 message_type="error",
                 content={"error": "No image provided"}
             )
             
         try:
-            # Charger et prétraiter l'image
-            image = Image.open(image_path)
-            inputs = self.processor(image, return_tensors="pt")
-            
-            if torch.cuda.is_available():
-                inputs = {k: v.to("cuda") for k, v in inputs.items()}
-                
-            # Générer la description
-            outputs = self.model.generate(
-                **inputs,
-                max_length=50,
-                num_beams=5
-            )
+            image = await self._load_image(message.content)
             
-            description = self.processor.decode(outputs[0], skip_special_tokens=True)
-            
-            # Extraire les caractéristiques spécifiques au foulard
-            features = self._extract_scarf_features(description)
+            # Une image déjà analysée (ou sa copie recompressée) est servie depuis le cache
+            fingerprint = None
+            if self.analysis_cache is not None:
+                fingerprint = await asyncio.to_thread(self.analysis_cache.fingerprint, image)
+                cached = await asyncio.to_thread(
+                    self.analysis_cache.get,
+                    fingerprint["content_hash"],
+                    fingerprint["perceptual_hash"]
+                )
+                if cached is not None:
+                    return MCPMessage(
+                        message_type="vision_analysis",
+                        content=cached,
+                        metadata={"cache": "hit"}
+                    )
+                    
+            # Décrire l'image et extraire ses caractéristiques (pool d'inférence, par lot) ;
+            # les modèles restent résidents tant que la requête les utilise
+            async with self.model_registry.use("blip2"), self.model_registry.use("scarf_features"):
+                analysis = await self.batcher.submit(image.path)
             
+            if fingerprint is not None:
+                await asyncio.to_thread(
+                    self.analysis_cache.set,
+                    fingerprint["content_hash"],
+                    analysis,
+                    fingerprint["perceptual_hash"]
+                )
+                
             return MCPMessage(
                 message_type="vision_analysis",
-                content={
-                    "description": description,
-                    "features": features
-                }
+                content=analysis
             )
             
         except Exception as e:
@@ -67,59 +131,121 @@ class VisionAgent(BaseAgent):
                 content={"error": str(e)}
             )
             
-    def _extract_scarf_features(self, description: str) -> dict:
-        """Extrait les caractéristiques spécifiques au foulard depuis la description"""
-        features = {
-            "color": None,
-            "pattern": None,
-            "material": None,
-            "style": None
-        }
+    async def _load_image(self, content: dict) -> DecodedImage:
+        """Image décodée du message ; retéléchargée depuis image_url si le fichier manque ou est illisible"""
+        image_path = content.get("image_path")
+        image_url = content.get("image_url")
+        if image_path:
+            try:
+                return await asyncio.to_thread(image_ingestor.load, image_path, content.get("content_hash"))
+            except OSError as e:
+                # Fichier purgé, ou agent sur une machine qui ne partage pas MEDIA_STORAGE_PATH
+                if not image_url:
+                    raise
+                logger.warning("image_reingested", path=image_path, error=str(e))
+        return await image_ingestor.ingest(image_url)
         
-        # Liste des caractéristiques à rechercher
-        color_candidates = [
-            "rouge", "bleu", "vert", "jaune", "noir", "blanc", "rose", 
-            "violet", "marron", "gris", "doré", "argenté", "multicolore"
-        ]
+    def _load_blip2(self) -> tuple:
+        """Charge BLIP-2 selon le mode d'inférence (exécuté dans un thread par le registre)"""
+        # Utilise Salesforce BLIP-2 par défaut, mais peut être remplacé par d'autres modèles
+        processor = AutoProcessor.from_pretrained("Salesforce/blip2-opt-2.7b")
         
-        pattern_candidates = [
-            "fleuri", "rayé", "à pois", "géométrique", "uni", "cachemire",
-            "abstrait", "animal", "paisley", "chevron", "ethnique"
-        ]
+        if self.inference_mode == VisionInferenceMode.CUDA_FP16:
+            model = AutoModelForVision2Seq.from_pretrained(
+                "Salesforce/blip2-opt-2.7b",
+                torch_dtype=torch.float16
+            ).to("cuda")
+        else:
+            # Le float16 est lent, voire non supporté, sur CPU
+            if settings.VISION_CPU_THREADS > 0:
+                torch.set_num_threads(settings.VISION_CPU_THREADS)
+            model = AutoModelForVision2Seq.from_pretrained(
+                "Salesforce/blip2-opt-2.7b",
+                torch_dtype=torch.float32
+            )
+            if self.inference_mode == VisionInferenceMode.CPU_INT8:
+                # Poids des couches linéaires en int8, activations quantifiées à la volée
+                model = torch.quantization.quantize_dynamic(
+                    model,
+                    {torch.nn.Linear},
+                    dtype=torch.qint8
+                )
+                
+        model.eval()
+        logger.info("vision_model_loaded", mode=self.inference_mode.value)
+        return processor, model
         
-        material_candidates = [
-            "soie", "coton", "laine", "modal", "cachemire", "polyester",
-            "viscose", "lin", "satin", "mousseline"
-        ]
+    def _load_feature_extractor(self) -> EmbeddingZeroShotClassifier:
+        # Embeddings des caractéristiques candidates calculés une fois par chargement
+        self.feature_extractor.load()
+        return self.feature_extractor
         
-        style_candidates = [
-            "classique", "bohème", "moderne", "vintage", "élégant",
-            "casual", "luxe", "minimaliste", "romantique"
-        ]
+    def _unload_feature_extractor(self, feature_extractor: EmbeddingZeroShotClassifier):
+        feature_extractor.encoder = None
+        feature_extractor.label_embeddings = None
         
-        # Extraire les caractéristiques avec zero-shot classification
-        for feature_type, candidates in [
-            ("color", color_candidates),
-            ("pattern", pattern_candidates),
-            ("material", material_candidates),
-            ("style", style_candidates)
-        ]:
+    def _analyze_images(self, image_paths: List[str]) -> list:
+        """Décrit un lot d'images et en extrait les caractéristiques (pool d'inférence)"""
+        processor, model = self.model_registry.get_loaded("blip2")
+        results: list = [None] * len(image_paths)
+        images, positions = [], []
+        
+        # Une image illisible n'échoue que pour sa propre requête ; l'image décodée
+        # à l'ingestion est réutilisée, déjà à la taille d'entrée du processeur
+        for position, image_path in enumerate(image_paths):
             try:
-                result = self.feature_extractor(
-                    description,
-                    candidates,
-                    hypothesis_template="Ce foulard est {}."
-                )
-                # Sélectionner la caractéristique avec le score le plus élevé
-                if result["scores"][0] > 0.5:  # Seuil de confiance
-                    features[feature_type] = result["labels"][0]
+                images.append(image_ingestor.load(image_path).resized(settings.VISION_INPUT_SIZE))
+                positions.append(position)
             except Exception as e:
-                logger.error(f"Erreur lors de l'extraction de {feature_type}: {str(e)}")
+                results[position] = e
+                
+        if not images:
+            return results
+            
+        # Charger et prétraiter les images
+        inputs = processor(images=images, return_tensors="pt")
+        
+        if self.inference_mode == VisionInferenceMode.CUDA_FP16:
+            inputs = {k: v.to("cuda") for k, v in inputs.items()}
+            inputs["pixel_values"] = inputs["pixel_values"].half()
+            
+        # Générer les descriptions (num_beams configurable ; 1 = décodage glouton)
+        with torch.inference_mode():
+            outputs = model.generate(
+                **inputs,
+                max_length=settings.VISION_MAX_LENGTH,
+                num_beams=settings.VISION_NUM_BEAMS
+            )
+            
+        descriptions = [
+            description.strip()
+            for description in processor.batch_decode(outputs, skip_special_tokens=True)
+        ]
+        
+        # Extraire les caractéristiques spécifiques au foulard, pour tout le lot à la fois
+        features = self._extract_scarf_features(descriptions)
+        for position, description, image_features in zip(positions, descriptions, features):
+            results[position] = {
+                "description": description,
+                "features": image_features
+            }
+            
+        return results
         
+    def _extract_scarf_features(self, descriptions: List[str]) -> List[dict]:
+        """Extrait les caractéristiques spécifiques au foulard depuis les descriptions"""
+        # Un seul encodage et un seul produit matriciel pour tous les attributs
+        try:
+            features = self.feature_extractor.classify(descriptions)
+        except Exception as e:
+            logger.error("feature_extraction_error", error=str(e))
+            features = [dict.fromkeys(SCARF_FEATURE_CANDIDATES) for _ in descriptions]
+            
         # Recherche de motifs supplémentaires dans le texte
         dimensions_pattern = r"(\d+)\s*[x×]\s*(\d+)\s*(cm|m)"
-        match = re.search(dimensions_pattern, description)
-        if match:
-            features["dimensions"] = f"{match.group(1)}×{match.group(2)}{match.group(3)}"
-            
-        return features
\ No newline at end of file
+        for description, image_features in zip(descriptions, features):
+            match = re.search(dimensions_pattern, description)
+            if match:
+                image_features["dimensions"] = f"{match.group(1)}×{match.group(2)}{match.group(3)}"
+                
+        return features
@@ -2,19 +2,18 @@ from abc import ABC, abstractmethod
 from typing import Any, Dict, List, Optional
 import datetime
 from langchain.agents import AgentExecutor
-from langgraph.graph import StateGraph
 from src.core.config import settings
-from src.core.mcp import MCPBroker, MCPMessage
+from src.core.mcp import MCPMessage, create_broker
+from src.core.runtime import AgentRuntime
 import structlog
 
 logger = structlog.get_logger()
 
 class BaseAgent(ABC):
     def __init__(self):
-        self.mcp_broker = MCPBroker()
+        self.mcp_broker = create_broker()
         self.state = {}
         self.max_retries = 3
-        self.retry_count = 0
         
     @abstractmethod
     async def initialize(self):
@@ -26,6 +25,21 @@ class BaseAgent(ABC):
         """Traite un message et retourne une réponse"""
         pass
         
+    async def handle_request(self, message: MCPMessage) -> MCPMessage:
+        """Traite un message reçu du bus et répond à l'émetteur s'il attend une réponse"""
+        try:
+            response = await self.process(message)
+        except Exception as e:
+            logger.error(
+                "agent_error",
+                agent_type=self.__class__.__name__,
+                error=str(e)
+            )
+            response = self._create_response("error", {"error": str(e)})
+
+        await self.mcp_broker.reply(message, response)
+        return response
+        
     async def handle_error(self, error: Exception, context: Dict[str, Any]):
         """Gère les erreurs dans le workflow"""
         logger.error(
@@ -35,15 +49,13 @@ class BaseAgent(ABC):
             context=context
         )
         
-        # Incrémenter le compteur de tentatives
-        self.retry_count += 1
+        # Compteur propre à ce message : l'agent traite des messages concurrents
+        retry_count = 0
         
-        if self.retry_count < self.max_retries:
-            # Tentative de récupération
+        while retry_count < self.max_retries:
+            retry_count += 1
+            # Réessayer le traitement ; l'agent reste initialisé entre deux tentatives
             try:
-                # Réinitialiser l'agent si nécessaire
-                await self.initialize()
-                # Réessayer le traitement
                 return await self.process(context.get("original_message"))
             except Exception as retry_error:
                 logger.error(
@@ -62,13 +74,10 @@ class BaseAgent(ABC):
             },
             metadata={
                 "timestamp": datetime.datetime.utcnow().isoformat(),
-                "retry_count": self.retry_count
+                "retry_count": retry_count
             }
         )
         
-        # Réinitialiser le compteur
-        self.retry_count = 0
-        
         return error_response
         
     def _validate_message(self, message: MCPMessage) -> bool:
@@ -95,18 +104,26 @@ class BaseAgent(ABC):
 
 class AgentOrchestrator:
     def __init__(self):
-        self.mcp_broker = MCPBroker()
-        self.workflow = StateGraph()
+        self.mcp_broker = create_broker()
+        self.runtime = AgentRuntime(self.mcp_broker)
         
-    def register_agent(self, agent: BaseAgent, channels: List[str]):
+    def register_agent(
+        self,
+        agent: BaseAgent,
+        channels: List[str],
+        concurrency: Optional[int] = None
+    ):
         """Enregistre un agent avec ses canaux d'écoute"""
-        pubsub = self.mcp_broker.subscribe(channels)
-        # Setup agent dans le workflow LangGraph
+        self.runtime.register(agent, channels, concurrency=concurrency)
         
-    def start(self):
-        """Démarre l'orchestrateur"""
-        self.workflow.run()
+    async def start(self):
+        """Démarre la consommation des canaux par les agents"""
+        await self.runtime.start()
+        
+    async def stop(self):
+        """Arrête les agents après avoir traité les messages en cours"""
+        await self.runtime.stop()
         
     async def handle_error(self, error: Exception, context: Dict[str, Any]):
         """Gère les erreurs dans le workflow"""
-        pass
\ No newline at end of file
+        pass
@@ -0,0 +1,212 @@
+import asyncio
+from typing import Dict, Iterable, Optional, Tuple
+import redis.asyncio as aioredis
+import structlog
+from redis.exceptions import WatchError
+from src.core.cache import LRUCache
+from src.core.config import settings
+from src.core.mcp import AsyncMCPBroker, MCPMessage, get_async_connection_pool
+from src.core.metrics import AVAILABILITY_CACHE_REQUESTS
+
+logger = structlog.get_logger()
+
+# Génération Redis illisible : le remplissage de Redis correspondant est abandonné
+_UNKNOWN = object()
+
+# Jeton pris avant la lecture en base : product_id -> (génération locale, génération Redis)
+Generations = Dict[int, Tuple[int, object]]
+
+class AvailabilityCache:
+    """Cache du stock disponible par produit, en lecture seule devant la base.
+
+    Un LRU en mémoire (AVAILABILITY_CACHE_TTL) précède Redis (AVAILABILITY_REDIS_TTL),
+    partagé entre réplicas. Toute écriture de stock invalide les deux niveaux et
+    diffuse l'invalidation sur AVAILABILITY_INVALIDATION_CHANNEL, que chaque
+    réplica écoute ; les TTL bornent l'obsolescence si un message est perdu.
+
+    Chaque invalidation incrémente une génération par produit, locale et dans
+    Redis. Un remplissage après lecture en base n'est écrit que si la génération
+    relevée avant la lecture n'a pas bougé : une valeur lue avant une
+    invalidation ne peut pas la recouvrir.
+    """
+
+    def __init__(
+        self,
+        broker: AsyncMCPBroker,
+        key_prefix: str = "availability",
+        memory_ttl: Optional[float] = None,
+        redis_ttl: Optional[int] = None
+    ):
+        self.broker = broker
+        self.key_prefix = key_prefix
+        self.channel = settings.AVAILABILITY_INVALIDATION_CHANNEL
+        self.redis_ttl = redis_ttl or settings.AVAILABILITY_REDIS_TTL
+        self.memory = LRUCache(
+            maxsize=settings.AVAILABILITY_CACHE_MAX_ENTRIES,
+            ttl=memory_ttl or settings.AVAILABILITY_CACHE_TTL
+        )
+        self.redis_client = (
+            aioredis.Redis(connection_pool=get_async_connection_pool())
+            if settings.AVAILABILITY_CACHE_REDIS else None
+        )
+        self._generations: Dict[int, int] = {}
+        self._listener: Optional[asyncio.Task] = None
+        # Délai avant de se réabonner après une coupure du bus (secondes)
+        self.reconnect_delay = 1.0
+
+    def key(self, product_id: int) -> str:
+        return f"{self.key_prefix}:{product_id}"
+
+    def generation_key(self, product_id: int) -> str:
+        return f"{self.key_prefix}:generation:{product_id}"
+
+    async def generations(self, product_ids: Iterable[int]) -> Generations:
+        """Relève les générations des produits, à faire avant de lire la base"""
+        product_ids = list(product_ids)
+        remote = [None] * len(product_ids)
+        if self.redis_client is not None and product_ids:
+            try:
+                remote = await self.redis_client.mget(
+                    [self.generation_key(product_id) for product_id in product_ids]
+                )
+            except Exception as e:
+                logger.warning("availability_cache_redis_error", error=str(e))
+                remote = [_UNKNOWN] * len(product_ids)
+        return {
+            product_id: (self._generations.get(product_id, 0), generation)
+            for product_id, generation in zip(product_ids, remote)
+        }
+
+    async def get(self, product_id: int) -> Optional[int]:
+        """Retourne la quantité en stock connue, ou None"""
+        quantity = self.memory.get(product_id)
+        if quantity is not None:
+            AVAILABILITY_CACHE_REQUESTS.labels(tier="memory", result="hit").inc()
+            return quantity
+
+        if self.redis_client is not None:
+            try:
+                cached = await self.redis_client.get(self.key(product_id))
+            except Exception as e:
+                logger.warning("availability_cache_redis_error", error=str(e))
+                cached = None
+            if cached is not None:
+                quantity = int(cached)
+                self.memory.set(product_id, quantity)
+                AVAILABILITY_CACHE_REQUESTS.labels(tier="redis", result="hit").inc()
+                return quantity
+
+        AVAILABILITY_CACHE_REQUESTS.labels(tier="all", result="miss").inc()
+        return None
+
+    async def set(self, product_id: int, quantity: int, generations: Optional[Generations] = None):
+        """Enregistre la quantité lue en base dans les deux niveaux"""
+        await self.set_many({product_id: quantity}, generations)
+
+    async def set_many(self, quantities: Dict[int, int], generations: Optional[Generations] = None):
+        """Comme `set`, en un seul aller-retour Redis.
+
+        Avec `generations` (relevées avant la lecture), un produit invalidé depuis
+        n'est pas écrit : ni en mémoire si l'invalidation a été reçue ici, ni dans
+        Redis si elle y a été enregistrée.
+        """
+        for product_id, quantity in quantities.items():
+            if generations is None or self._generations.get(product_id, 0) == generations[product_id][0]:
+                self.memory.set(product_id, quantity)
+        if self.redis_client is not None and quantities:
+            try:
+                await self._store(quantities, generations)
+            except Exception as e:
+                logger.warning("availability_cache_redis_error", error=str(e))
+
+    async def _store(self, quantities: Dict[int, int], generations: Optional[Generations]):
+        async with self.redis_client.pipeline(transaction=True) as pipe:
+            if generations is not None:
+                keys = [self.generation_key(product_id) for product_id in quantities]
+                # Une invalidation entre la relecture et l'EXEC fait échouer la transaction
+                await pipe.watch(*keys)
+                current = await pipe.mget(keys)
+                quantities = {
+                    product_id: quantity
+                    for (product_id, quantity), generation in zip(quantities.items(), current)
+                    if generation == generations[product_id][1]
+                }
+                pipe.multi()
+            for product_id, quantity in quantities.items():
+                pipe.set(self.key(product_id), quantity, ex=self.redis_ttl)
+            try:
+                await pipe.execute()
+            except WatchError:
+                pass
+
+    async def invalidate(self, product_ids: Iterable[int]):
+        """Invalide les produits ici, dans Redis et sur les autres réplicas"""
+        product_ids = sorted(set(product_ids))
+        if not product_ids:
+            return
+        self._forget(product_ids)
+
+        try:
+            if self.redis_client is not None:
+                async with self.redis_client.pipeline(transaction=True) as pipe:
+                    for product_id in product_ids:
+                        pipe.incr(self.generation_key(product_id))
+                        pipe.expire(self.generation_key(product_id), self.redis_ttl)
+                    pipe.delete(*(self.key(product_id) for product_id in product_ids))
+                    await pipe.execute()
+            await self.broker.broadcast(
+                self.channel,
+                MCPMessage(
+                    message_type="availability_invalidation",
+                    content={"product_ids": product_ids}
+                )
+            )
+        except Exception as e:
+            # La valeur peut rester dans Redis, d'où les réplicas rechargent leur LRU :
+            # l'obsolescence est bornée par AVAILABILITY_REDIS_TTL
+            logger.warning("availability_invalidation_error", error=str(e))
+
+    async def start(self):
+        """Écoute les invalidations des autres réplicas"""
+        if self._listener is None:
+            self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+
+    async def _listen(self):
+        """Boucle de l'écouteur : se réabonne après une coupure du bus"""
+        reconnecting = False
+        while True:
+            pubsub = None
+            try:
+                pubsub = await self.broker.subscribe([self.channel])
+                if reconnecting:
+                    # Des invalidations ont pu être perdues pendant la coupure
+                    self.memory.clear()
+                    reconnecting = False
+                async for message in self.broker.listen(pubsub):
+                    self._forget(message.content.get("product_ids", ()))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("availability_listener_error", error=str(e))
+                reconnecting = True
+                await asyncio.sleep(self.reconnect_delay)
+            finally:
+                if pubsub is not None:
+                    try:
+                        await pubsub.aclose()
+                    except Exception:
+                        pass
+
+    def _forget(self, product_ids: Iterable[int]):
+        for product_id in product_ids:
+            self._generations[product_id] = self._generations.get(product_id, 0) + 1
+            self.memory.delete(product_id)
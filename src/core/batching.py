@@ -0,0 +1,86 @@
+import asyncio
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Any, Callable, List, Optional, Tuple
+import structlog
+from src.core.metrics import INFERENCE_BATCH_SIZE, INFERENCE_QUEUE_DEPTH
+
+logger = structlog.get_logger()
+
+class MicroBatcher:
+    """Regroupe les requêtes concurrentes pour les exécuter en un seul lot.
+
+    Dès qu'une requête arrive, le batcher attend `max_wait_ms` pour laisser les
+    requêtes concurrentes la rejoindre, puis exécute `process_batch` sur au plus
+    `max_batch_size` éléments dans un exécuteur dédié, hors de la boucle asyncio.
+    `process_batch` retourne un résultat par élément, ou une exception à propager
+    à la requête concernée uniquement.
+    """
+
+    def __init__(
+        self,
+        process_batch: Callable[[List[Any]], List[Any]],
+        max_batch_size: int,
+        max_wait_ms: float,
+        name: str,
+        executor: Optional[Executor] = None
+    ):
+        self.process_batch = process_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.name = name
+        self.executor = executor or ThreadPoolExecutor(
+            max_workers=1,
+            thread_name_prefix=f"{name}-inference"
+        )
+        self._queue: "asyncio.Queue[Tuple[Any, asyncio.Future]]" = asyncio.Queue()
+        self._worker: Optional[asyncio.Task] = None
+
+    async def submit(self, item: Any) -> Any:
+        """Soumet un élément et attend son résultat"""
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._run())
+
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((item, future))
+        INFERENCE_QUEUE_DEPTH.labels(model=self.name).set(self._queue.qsize())
+        return await future
+
+    async def close(self):
+        """Arrête le batcher et libère l'exécuteur"""
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        self.executor.shutdown(wait=False)
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+
+            # Fenêtre de regroupement : les requêtes concurrentes rejoignent le lot
+            if self._queue.qsize() < self.max_batch_size - 1:
+                await asyncio.sleep(self.max_wait)
+            while len(batch) < self.max_batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+
+            INFERENCE_QUEUE_DEPTH.labels(model=self.name).set(self._queue.qsize())
+            INFERENCE_BATCH_SIZE.labels(model=self.name).observe(len(batch))
+
+            items = [item for item, _ in batch]
+            try:
+                results = await loop.run_in_executor(self.executor, self.process_batch, items)
+            except Exception as e:
+                logger.error("batch_inference_error", model=self.name, size=len(batch), error=str(e))
+                results = [e] * len(batch)
+
+            for (_, future), result in zip(batch, results):
+                if future.done():
+                    continue
+                if isinstance(result, BaseException):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
@@ -0,0 +1,78 @@
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+class LRUCache:
+    """Cache LRU borné en nombre d'entrées, avec expiration optionnelle.
+
+    Avec `refresh_on_get`, chaque lecture repousse l'expiration : le `ttl` devient
+    une durée d'inactivité, et l'ordre LRU coïncide avec l'ordre d'expiration.
+    """
+
+    def __init__(
+        self,
+        maxsize: int,
+        ttl: Optional[float] = None,
+        refresh_on_get: bool = False
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.refresh_on_get = refresh_on_get
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Retourne la valeur si elle est présente et non expirée"""
+        entry = self._data.get(key)
+        if entry is None:
+            return default
+
+        expires_at, value = entry
+        now = time.monotonic()
+        if expires_at is not None and expires_at <= now:
+            del self._data[key]
+            return default
+
+        self._data.move_to_end(key)
+        if self.refresh_on_get and self.ttl is not None:
+            self._data[key] = (now + self.ttl, value)
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        """Ajoute ou remplace une entrée, en évinçant les moins récemment utilisées"""
+        ttl = ttl if ttl is not None else self.ttl
+        now = time.monotonic()
+        self._data[key] = (now + ttl if ttl is not None else None, value)
+        self._data.move_to_end(key)
+        self._evict(now)
+
+    def keys(self) -> list:
+        """Clés non expirées, de la moins à la plus récemment utilisée"""
+        now = time.monotonic()
+        return [
+            key for key, (expires_at, _) in self._data.items()
+            if expires_at is None or expires_at > now
+        ]
+
+    def delete(self, key: Hashable):
+        self._data.pop(key, None)
+
+    def clear(self):
+        self._data.clear()
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def _evict(self, now: float):
+        """Supprime les entrées expirées en tête de liste puis l'excédent de taille"""
+        while self._data:
+            expires_at, _ = next(iter(self._data.values()))
+            if expires_at is None or expires_at > now:
+                break
+            self._data.popitem(last=False)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+_MISSING = object()
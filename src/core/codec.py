@@ -0,0 +1,166 @@
+import json
+import zlib
+from abc import ABC, abstractmethod
+from typing import Any, Dict
+
+# Octet d'en-tête des charges encodées :
+#   bit 7      : toujours 1 (un JSON historique commence par "{", soit 0x7B)
+#   bits 4-6   : identifiant du codec
+#   bits 2-3   : identifiant de la compression
+#   bits 0-1   : version du format
+FRAME_FLAG = 0x80
+FORMAT_VERSION = 0
+
+class Codec(ABC):
+    codec_id: int
+    name: str
+
+    @abstractmethod
+    def dumps(self, payload: Dict[str, Any]) -> bytes:
+        """Sérialise un dictionnaire"""
+        pass
+
+    @abstractmethod
+    def loads(self, data: bytes) -> Dict[str, Any]:
+        """Désérialise un dictionnaire"""
+        pass
+
+class JSONCodec(Codec):
+    codec_id = 0
+    name = "json"
+
+    def dumps(self, payload: Dict[str, Any]) -> bytes:
+        return json.dumps(payload, separators=(",", ":")).encode()
+
+    def loads(self, data: bytes) -> Dict[str, Any]:
+        return json.loads(data)
+
+class MsgpackCodec(Codec):
+    codec_id = 1
+    name = "msgpack"
+
+    def __init__(self):
+        import msgpack
+        self._msgpack = msgpack
+
+    def dumps(self, payload: Dict[str, Any]) -> bytes:
+        return self._msgpack.packb(payload, use_bin_type=True)
+
+    def loads(self, data: bytes) -> Dict[str, Any]:
+        return self._msgpack.unpackb(data, raw=False)
+
+class Compressor(ABC):
+    compression_id: int
+    name: str
+
+    @abstractmethod
+    def compress(self, data: bytes) -> bytes:
+        pass
+
+    @abstractmethod
+    def decompress(self, data: bytes) -> bytes:
+        pass
+
+class ZlibCompressor(Compressor):
+    compression_id = 1
+    name = "zlib"
+
+    def __init__(self, level: int = 1):
+        self.level = level
+
+    def compress(self, data: bytes) -> bytes:
+        return zlib.compress(data, self.level)
+
+    def decompress(self, data: bytes) -> bytes:
+        return zlib.decompress(data)
+
+class LZ4Compressor(Compressor):
+    compression_id = 2
+    name = "lz4"
+
+    def __init__(self):
+        import lz4.frame
+        self._lz4 = lz4.frame
+
+    def compress(self, data: bytes) -> bytes:
+        return self._lz4.compress(data)
+
+    def decompress(self, data: bytes) -> bytes:
+        return self._lz4.decompress(data)
+
+_CODEC_CLASSES = {cls.name: cls for cls in (JSONCodec, MsgpackCodec)}
+_COMPRESSOR_CLASSES = {cls.name: cls for cls in (ZlibCompressor, LZ4Compressor)}
+_codecs: Dict[Any, Codec] = {}
+_compressors: Dict[Any, Compressor] = {}
+
+def get_codec(name: str) -> Codec:
+    """Retourne l'instance du codec demandé (par nom)"""
+    if name not in _codecs:
+        if name not in _CODEC_CLASSES:
+            raise ValueError(f"Unknown codec: {name}")
+        codec = _CODEC_CLASSES[name]()
+        _codecs[name] = _codecs[codec.codec_id] = codec
+    return _codecs[name]
+
+def get_compressor(name: str) -> Compressor:
+    """Retourne l'instance de l'algorithme de compression demandé (par nom)"""
+    if name not in _compressors:
+        if name not in _COMPRESSOR_CLASSES:
+            raise ValueError(f"Unknown compression: {name}")
+        compressor = _COMPRESSOR_CLASSES[name]()
+        _compressors[name] = _compressors[compressor.compression_id] = compressor
+    return _compressors[name]
+
+def _by_id(registry: Dict[Any, Any], classes: Dict[str, Any], attribute: str, value: int):
+    """Retrouve une instance par identifiant d'en-tête"""
+    if value not in registry:
+        for name, cls in classes.items():
+            if getattr(cls, attribute) == value:
+                instance = cls()
+                registry[name] = registry[value] = instance
+                break
+        else:
+            raise ValueError(f"Unknown {attribute}: {value}")
+    return registry[value]
+
+def encode(
+    payload: Dict[str, Any],
+    codec: str = "msgpack",
+    compression: str = "none",
+    threshold: int = 4096
+) -> bytes:
+    """Encode un dictionnaire avec un octet d'en-tête.
+
+    La compression n'est appliquée qu'au-delà de `threshold` octets, et seulement
+    si elle réduit effectivement la taille.
+    """
+    serializer = get_codec(codec)
+    body = serializer.dumps(payload)
+    compression_id = 0
+    if compression != "none" and len(body) > threshold:
+        compressor = get_compressor(compression)
+        compressed = compressor.compress(body)
+        if len(compressed) < len(body):
+            body = compressed
+            compression_id = compressor.compression_id
+
+    header = FRAME_FLAG | (serializer.codec_id << 4) | (compression_id << 2) | FORMAT_VERSION
+    return bytes((header,)) + body
+
+def decode(data: bytes) -> Dict[str, Any]:
+    """Décode une charge encodée, ou un JSON historique sans en-tête"""
+    if not data or not data[0] & FRAME_FLAG:
+        return json.loads(data)
+
+    header = data[0]
+    version = header & 0x03
+    if version != FORMAT_VERSION:
+        raise ValueError(f"Unsupported frame version: {version}")
+
+    body = data[1:]
+    compression_id = (header >> 2) & 0x03
+    if compression_id:
+        compressor = _by_id(_compressors, _COMPRESSOR_CLASSES, "compression_id", compression_id)
+        body = compressor.decompress(body)
+    serializer = _by_id(_codecs, _CODEC_CLASSES, "codec_id", (header >> 4) & 0x07)
+    return serializer.loads(body)
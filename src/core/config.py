@@ -1,5 +1,5 @@
 from enum import Enum
-from typing import Optional
+from typing import Dict, List, Optional
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 class ModelProvider(str, Enum):
@@ -17,6 +17,29 @@ class VectorStore(str, Enum):
     WEAVIATE = "weaviate"
     CHROMA = "chroma"
 
+class MCPTransport(str, Enum):
+    PUBSUB = "pubsub"
+    STREAMS = "streams"
+
+class MCPCodec(str, Enum):
+    JSON = "json"
+    MSGPACK = "msgpack"
+
+class MCPCompression(str, Enum):
+    NONE = "none"
+    ZLIB = "zlib"
+    LZ4 = "lz4"  # requires the optional lz4 package
+
+class VisionInferenceMode(str, Enum):
+    AUTO = "auto"  # cuda_fp16 when a GPU is available, cpu_fp32 otherwise
+    CUDA_FP16 = "cuda_fp16"
+    CPU_FP32 = "cpu_fp32"
+    CPU_INT8 = "cpu_int8"  # dynamic int8 quantization of Linear layers
+
+class HistoryBackend(str, Enum):
+    MEMORY = "memory"
+    REDIS = "redis"
+
 class Settings(BaseSettings):
     # Service Configuration
     SERVICE_NAME: str = "scarf-assistant"
@@ -26,6 +49,26 @@ class Settings(BaseSettings):
     VIRTUAL_TRY_ON_MODEL: str = "virtual-try-on-v1"
     VIRTUAL_TRY_ON_DEVICE: str = "cuda" if torch.cuda.is_available() else "cpu"
     MAX_IMAGE_SIZE: int = 1024
+    MAX_IMAGE_BYTES: int = 15 * 1024 * 1024  # downloads above this are aborted
+    IMAGE_DOWNLOAD_TIMEOUT: float = 10.0
+    IMAGE_DOWNLOAD_CHUNK_SIZE: int = 64 * 1024
+    DECODED_IMAGE_CACHE_SIZE: int = 64  # decoded images shared by the agents of a process
+    
+    # Vision Configuration
+    VISION_INPUT_SIZE: int = 224  # BLIP-2 processor input resolution
+    VISION_INFERENCE_MODE: VisionInferenceMode = VisionInferenceMode.AUTO
+    VISION_CPU_THREADS: int = 0  # torch intra-op threads on CPU; 0 = torch default
+    VISION_NUM_BEAMS: int = 5  # 1 = greedy decoding, much faster on CPU
+    VISION_MAX_LENGTH: int = 50  # tokens per generated description
+    VISION_BATCH_SIZE: int = 8  # images per batched generate call
+    VISION_BATCH_WAIT_MS: float = 10  # window for concurrent requests to join a batch
+    VISION_CACHE_ENABLED: bool = True  # analyses stored under MEDIA_STORAGE_PATH/vision_cache
+    VISION_CACHE_MAX_ENTRIES: int = 2048  # in-memory tier
+    VISION_CACHE_PERCEPTUAL: bool = True  # also match resized/recompressed copies
+    VISION_CACHE_PERCEPTUAL_DISTANCE: int = 4  # max differing bits between 64-bit dHashes
+    VISION_FEATURE_MODEL: str = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
+    VISION_FEATURE_THRESHOLD: float = 0.5  # minimum per-attribute probability to keep a label
+    VISION_FEATURE_TEMPERATURE: float = 0.05  # softmax temperature over cosine similarities
     
     # Style Advisor Configuration
     STYLE_CLUSTERS: int = 5
@@ -46,11 +89,26 @@ class Settings(BaseSettings):
     MODEL_PROVIDER: ModelProvider = ModelProvider.LOCAL
     MODEL_NAME: str = "mistral-7b-instruct"
     EMBEDDINGS_PROVIDER: EmbeddingsProvider = EmbeddingsProvider.SENTENCE_TRANSFORMERS
+    EMBEDDING_STORAGE_DTYPE: str = "float32"  # float16 halves Product.embedding size
     VECTOR_STORE: VectorStore = VectorStore.FAISS
+    MODEL_MEMORY_BUDGET_MB: int = 0  # resident models above this are unloaded LRU first; 0 = unlimited
+    MODEL_WARMUP: List[str] = []  # models loaded in the background at startup, e.g. ["blip2"]
     
     # Database URLs
     DATABASE_URL: str
+    ASYNC_DATABASE_URL: Optional[str] = None  # agents' asyncio engine; defaults to DATABASE_URL with asyncpg/aiosqlite
+    DATABASE_REPLICA_URL: Optional[str] = None  # read-only queries (analytics, order status) when set
+    DB_REPLICA_MAX_LAG: float = 5.0  # seconds of replay lag before reads fall back to the primary
+    DB_REPLICA_CHECK_INTERVAL: float = 10.0  # seconds between replica health checks
+    DB_REPLICA_CHECK_TIMEOUT: float = 1.0  # an unanswered check counts as the replica being down
+    DB_POOL_SIZE: int = 10  # connections kept open per process
+    DB_MAX_OVERFLOW: int = 20  # extra connections opened under load, closed when returned
+    DB_POOL_TIMEOUT: float = 10.0  # seconds to wait for a free connection
+    DB_POOL_RECYCLE: int = 1800  # seconds before a connection is replaced
+    DB_POOL_PRE_PING: bool = True  # test connections on checkout (server restarts, idle timeouts)
     REDIS_URL: str
+    REDIS_MAX_CONNECTIONS: int = 50  # shared by every broker of the process
+    REDIS_POOL_TIMEOUT: float = 5.0  # seconds to wait for a free connection
     VECTOR_STORE_URL: Optional[str] = None
     
     # WhatsApp Configuration
@@ -60,11 +118,65 @@ class Settings(BaseSettings):
     # Agent Configuration
     AGENT_MESSAGE_TTL: int = 3600  # 1 hour
     MAX_RETRIES: int = 3
+    MCP_RESPONSE_CHANNEL: str = "agent_responses"
+    MCP_RESPONSE_TIMEOUT: float = 1.8  # seconds, keeps the webhook under the 2s budget
+    MCP_LATE_REPLY_WINDOW: int = 1000  # expired request ids remembered to detect late replies
+    MCP_TRANSPORT: MCPTransport = MCPTransport.PUBSUB
+    MCP_CODEC: MCPCodec = MCPCodec.MSGPACK
+    MCP_COMPRESSION: MCPCompression = MCPCompression.ZLIB
+    MCP_COMPRESSION_THRESHOLD: int = 4096  # bytes; smaller payloads are sent uncompressed
+    AGENT_DEFAULT_CONCURRENCY: int = 4
+    AGENT_CONCURRENCY: Dict[str, int] = {  # per agent class, overrides the default
+        "VisionAgent": 1,
+        "DialogAgent": 8,
+        "InventoryAgent": 16,
+        "TransactionAgent": 8
+    }
+    AGENT_QUEUE_SIZE: int = 100  # in-flight messages per agent before the bus stops being read
+    AGENT_SHUTDOWN_TIMEOUT: float = 30.0  # seconds allowed to drain queues on shutdown
+    WORKFLOW_HISTORY_SIZE: int = 20  # steps kept in each workflow run's history
+    WORKFLOW_MAX_STEPS: int = 16  # guards against transition cycles
+    WORKFLOW_BRANCH_TIMEOUT: float = 1.5  # seconds per branch of a parallel step
+    
+    # Conversation History
+    HISTORY_BACKEND: HistoryBackend = HistoryBackend.MEMORY  # use redis with several replicas
+    HISTORY_MAX_MESSAGES: int = 10  # messages kept per customer
+    HISTORY_MAX_CUSTOMERS: int = 10000  # in-memory backend only
+    HISTORY_IDLE_TTL: int = 86400  # seconds of inactivity before a conversation is dropped
+    
+    # LLM Response Cache
+    LLM_CACHE_ENABLED: bool = True
+    LLM_CACHE_REDIS: bool = True  # shared tier behind the in-memory LRU
+    LLM_CACHE_MAX_ENTRIES: int = 5000
+    LLM_CACHE_TTL: int = 3600  # 1 hour
+    MCP_STREAM_BATCH_SIZE: int = 10  # entries read per XREADGROUP/XAUTOCLAIM call
+    MCP_STREAM_BLOCK_MS: int = 1000
+    MCP_STREAM_CLAIM_IDLE_MS: int = 60000  # pending entries older than this are reclaimed
     
     # Storage
     MEDIA_STORAGE_PATH: str = "./data/media"
     TEMP_STORAGE_PATH: str = "./data/temp"
     
+    # Stock Reservations
+    RESERVATION_TTL: int = 900  # seconds a cart holds stock before it is released
+    RESERVATION_SWEEP_INTERVAL: float = 30.0  # seconds between expired-hold sweeps
+    RESERVATION_SWEEP_BATCH: int = 500  # holds released per transaction
+    
+    # Availability Cache
+    AVAILABILITY_CACHE_ENABLED: bool = True
+    AVAILABILITY_CACHE_REDIS: bool = True  # shared tier behind the in-memory LRU
+    AVAILABILITY_CACHE_MAX_ENTRIES: int = 10000
+    AVAILABILITY_CACHE_TTL: float = 5.0  # max staleness of a replica that missed an invalidation
+    AVAILABILITY_REDIS_TTL: int = 60  # seconds
+    AVAILABILITY_INVALIDATION_CHANNEL: str = "availability_invalidation"
+    
+    # Similarity Index
+    VECTOR_INDEX_PATH: str = "./data/indexes/products.faiss"
+    VECTOR_INDEX_REBUILD_ON_START: bool = False  # rebuild from the database instead of loading the file
+    VECTOR_INDEX_IVF_MIN: int = 20000  # catalogue size above which an IVF index replaces exact search
+    VECTOR_INDEX_NPROBE: int = 16  # IVF lists scanned per query
+    VECTOR_INDEX_OVERSAMPLE: int = 4  # candidates fetched per result, before the stock filter
+    
     # Security
     ENCRYPTION_KEY: Optional[str] = None
     
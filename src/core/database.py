@@ -1,10 +1,89 @@
-from sqlalchemy import create_engine, MetaData
+import asyncio
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterator, Awaitable, Callable, Dict, Iterator, Optional, TypeVar
+import structlog
+from sqlalchemy import create_engine, event, MetaData, text
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import NullPool
 from src.core.config import settings
+from src.core.metrics import (
+    DB_POOL_CAPACITY,
+    DB_POOL_CHECKED_OUT,
+    DB_POOL_OVERFLOW,
+    DB_READ_ROUTING,
+    DB_REPLICA_LAG
+)
+
+logger = structlog.get_logger()
+
+T = TypeVar("T")
+
+# Pilotes asyncio correspondant aux pilotes synchrones de DATABASE_URL
+ASYNC_DRIVERS = {
+    "postgresql": "asyncpg",
+    "sqlite": "aiosqlite"
+}
+
+def _pool_options(url: str, name: str) -> dict:
+    if url.startswith("sqlite"):
+        # Pool adapté par SQLAlchemy au fichier ou à la base en mémoire
+        return {}
+    DB_POOL_CAPACITY.labels(engine=name).set(settings.DB_POOL_SIZE + settings.DB_MAX_OVERFLOW)
+    return {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING
+    }
+
+def create_pooled_engine(url: str, name: str = "primary") -> Engine:
+    """Crée un moteur dont le pool est dimensionné par la configuration"""
+    engine = create_engine(url, **_pool_options(url, name))
+    instrument_pool(engine, name)
+    return engine
+
+def to_async_url(url: str) -> str:
+    """postgresql://… → postgresql+asyncpg://…, sqlite://… → sqlite+aiosqlite://…"""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No asyncio driver configured for {backend}")
+    return parsed.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}").render_as_string(hide_password=False)
+
+def create_pooled_async_engine(url: str, name: str = "primary") -> AsyncEngine:
+    """Équivalent asyncio de create_pooled_engine ; `url` est une URL synchrone ou asyncio"""
+    if "+" not in make_url(url).drivername:
+        url = to_async_url(url)
+    if url.startswith("sqlite"):
+        # Une connexion aiosqlite laissée dans le pool garde son thread actif et bloque l'arrêt
+        engine = create_async_engine(url, poolclass=NullPool)
+    else:
+        engine = create_async_engine(url, **_pool_options(url, f"{name}_async"))
+    instrument_pool(engine.sync_engine, f"{name}_async")
+    return engine
+
+def instrument_pool(engine: Engine, name: str):
+    """Publie l'occupation du pool à chaque emprunt et restitution de connexion"""
+    pool = engine.pool
+
+    def record(returning: int):
+        # L'événement checkin précède la remise de la connexion dans le pool
+        if hasattr(pool, "checkedout"):
+            DB_POOL_CHECKED_OUT.labels(engine=name).set(pool.checkedout() - returning)
+        if hasattr(pool, "overflow"):
+            DB_POOL_OVERFLOW.labels(engine=name).set(max(pool.overflow(), 0))
+
+    event.listen(engine, "checkout", lambda *args: record(0))
+    event.listen(engine, "checkin", lambda *args: record(1))
 
 # Configuration de la base de données
-engine = create_engine(settings.DATABASE_URL)
+engine = create_pooled_engine(settings.DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 metadata = MetaData()
@@ -16,6 +95,220 @@ def get_db():
     finally:
         db.close()
 
+# Retard de rejeu d'un réplica PostgreSQL, nul s'il n'a rien à rejouer
+_REPLICA_LAG_QUERY = text("""
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+""")
+
+async def replica_lag(db: AsyncSession) -> float:
+    """Retard du réplica en secondes (0 hors PostgreSQL, où seule la disponibilité est vérifiée)"""
+    if db.get_bind().dialect.name != "postgresql":
+        await db.execute(text("SELECT 1"))
+        return 0.0
+    return float((await db.execute(_REPLICA_LAG_QUERY)).scalar() or 0)
+
+class ReplicaRouter:
+    """Oriente les sessions en lecture seule vers le réplica tant qu'il répond et reste à jour.
+
+    L'état du réplica est vérifié au plus une fois par DB_REPLICA_CHECK_INTERVAL ; en
+    retard de plus de DB_REPLICA_MAX_LAG secondes ou injoignable, les lectures
+    retournent au primaire jusqu'à la vérification suivante. Une connexion perdue en
+    cours de lecture a le même effet, sans attendre la vérification.
+    """
+
+    def __init__(
+        self,
+        primary: async_sessionmaker,
+        replica: async_sessionmaker,
+        max_lag: Optional[float] = None,
+        check_interval: Optional[float] = None
+    ):
+        self.primary = primary
+        self.replica = replica
+        self.max_lag = max_lag if max_lag is not None else settings.DB_REPLICA_MAX_LAG
+        self.check_interval = (
+            check_interval if check_interval is not None else settings.DB_REPLICA_CHECK_INTERVAL
+        )
+        self._healthy = False
+        self._checked_at: Optional[float] = None
+        self._lock = asyncio.Lock()
+
+    async def session_factory(self) -> async_sessionmaker:
+        """Fabrique à utiliser pour la prochaine lecture"""
+        if await self.is_healthy():
+            DB_READ_ROUTING.labels(target="replica").inc()
+            return self.replica
+        DB_READ_ROUTING.labels(target="primary").inc()
+        return self.primary
+
+    async def is_healthy(self) -> bool:
+        if not self._is_stale():
+            return self._healthy
+        # Une seule vérification à la fois ; les lectures concurrentes en partagent le résultat
+        async with self._lock:
+            if self._is_stale():
+                self._healthy = await self._check()
+                self._checked_at = time.monotonic()
+        return self._healthy
+
+    def mark_unhealthy(self, error: Exception):
+        """Écarte le réplica jusqu'à la prochaine vérification"""
+        logger.warning("replica_unavailable", error=str(error) or type(error).__name__)
+        self._healthy = False
+        self._checked_at = time.monotonic()
+
+    async def run(self, work: Callable[[AsyncSession], Awaitable[T]]) -> T:
+        """Exécute une lecture ; si le réplica tombe pendant celle-ci, la rejoue sur le primaire"""
+        session_factory = await self.session_factory()
+        if session_factory is self.replica:
+            try:
+                async with async_session_scope(session_factory, read_only=True) as db:
+                    return await work(db)
+            except DBAPIError as e:
+                if not is_connection_error(e):
+                    raise
+                self.mark_unhealthy(e)
+            DB_READ_ROUTING.labels(target="primary").inc()
+
+        async with async_session_scope(self.primary, read_only=True) as db:
+            return await work(db)
+
+    def _is_stale(self) -> bool:
+        return self._checked_at is None or time.monotonic() - self._checked_at >= self.check_interval
+
+    async def _check(self) -> bool:
+        try:
+            async with self.replica() as db:
+                lag = await asyncio.wait_for(replica_lag(db), settings.DB_REPLICA_CHECK_TIMEOUT)
+        except Exception as e:
+            logger.warning("replica_unavailable", error=str(e) or type(e).__name__)
+            return False
+
+        DB_REPLICA_LAG.set(lag)
+        if lag > self.max_lag:
+            logger.warning("replica_lagging", lag=lag, max_lag=self.max_lag)
+            return False
+        return True
+
+def is_connection_error(error: Exception) -> bool:
+    """Vrai si l'erreur vient d'une connexion perdue ou refusée, et non de la requête"""
+    if not isinstance(error, DBAPIError):
+        return False
+    if error.connection_invalidated:
+        return True
+    # Connexion refusée ou coupée au niveau de la socket, éventuellement enveloppée
+    # par l'adaptateur asyncio du pilote
+    orig = error.orig
+    return isinstance(orig, OSError) or isinstance(getattr(orig, "__cause__", None), OSError)
+
+def _make_async_session_factory(engine: AsyncEngine) -> async_sessionmaker:
+    # Les objets restent lisibles après le commit, sans requête implicite
+    return async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+
+_async_engines: Dict[str, AsyncEngine] = {}
+_async_session_factory: Optional[async_sessionmaker] = None
+_replica_router: Optional[ReplicaRouter] = None
+
+def get_async_session_factory() -> async_sessionmaker:
+    """Fabrique de sessions asyncio du processus, créée à la première utilisation"""
+    global _async_session_factory
+    if _async_session_factory is None:
+        _async_engines["primary"] = create_pooled_async_engine(
+            settings.ASYNC_DATABASE_URL or settings.DATABASE_URL
+        )
+        _async_session_factory = _make_async_session_factory(_async_engines["primary"])
+    return _async_session_factory
+
+def get_replica_router() -> Optional[ReplicaRouter]:
+    """Routeur des lectures, si un réplica est configuré"""
+    global _replica_router
+    if _replica_router is None and settings.DATABASE_REPLICA_URL:
+        _async_engines["replica"] = create_pooled_async_engine(
+            settings.DATABASE_REPLICA_URL,
+            name="replica"
+        )
+        _replica_router = ReplicaRouter(
+            get_async_session_factory(),
+            _make_async_session_factory(_async_engines["replica"])
+        )
+    return _replica_router
+
+async def close_async_engine():
+    """Ferme les connexions des moteurs asyncio"""
+    global _async_session_factory, _replica_router
+    for engine in _async_engines.values():
+        await engine.dispose()
+    _async_engines.clear()
+    _async_session_factory = None
+    _replica_router = None
+
+@contextmanager
+def session_scope(session_factory: sessionmaker = SessionLocal) -> Iterator[Session]:
+    """Session propre à une unité de travail : validée à la sortie, annulée sur erreur.
+
+    La connexion retourne au pool à la fermeture ; aucune session n'est partagée
+    entre messages concurrents.
+    """
+    db = session_factory()
+    try:
+        yield db
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+@asynccontextmanager
+async def async_session_scope(
+    session_factory: Optional[async_sessionmaker] = None,
+    read_only: bool = False
+) -> AsyncIterator[AsyncSession]:
+    """Équivalent asyncio de session_scope : les requêtes n'occupent pas la boucle d'événements.
+
+    Avec `read_only`, la session peut être servie par le réplica (données en retard
+    d'au plus DB_REPLICA_MAX_LAG secondes) et n'est jamais validée. Le bloc ne peut
+    pas être rejoué : pour retomber sur le primaire si le réplica tombe en cours de
+    lecture, utiliser run_read_only.
+    """
+    router = None
+    if session_factory is None:
+        router = get_replica_router() if read_only else None
+        session_factory = (
+            await router.session_factory() if router is not None else get_async_session_factory()
+        )
+    db = session_factory()
+    try:
+        yield db
+        if not read_only:
+            await db.commit()
+    except Exception as e:
+        if router is not None and session_factory is router.replica and is_connection_error(e):
+            router.mark_unhealthy(e)
+        await db.rollback()
+        raise
+    finally:
+        await db.close()
+
+async def run_read_only(
+    work: Callable[[AsyncSession], Awaitable[T]],
+    session_factory: Optional[async_sessionmaker] = None
+) -> T:
+    """Exécute `work(db)` dans une session en lecture seule et retourne son résultat.
+
+    Sans fabrique fournie, la lecture passe par le réplica s'il est configuré et
+    retombe sur le primaire si sa connexion est perdue : `work` peut être rejouée.
+    """
+    router = get_replica_router() if session_factory is None else None
+    if router is not None:
+        return await router.run(work)
+    async with async_session_scope(session_factory, read_only=True) as db:
+        return await work(db)
+
 # Fonction d'initialisation de la base de données
 def init_db():
-    Base.metadata.create_all(bind=engine)
\ No newline at end of file
+    Base.metadata.create_all(bind=engine)
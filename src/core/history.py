@@ -0,0 +1,88 @@
+import json
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import Dict, List
+import redis.asyncio as aioredis
+from src.core.cache import LRUCache
+from src.core.config import settings, HistoryBackend
+from src.core.mcp import get_async_connection_pool
+
+class ConversationHistoryStore(ABC):
+    """Historique des conversations par client, borné à HISTORY_MAX_MESSAGES messages"""
+
+    @abstractmethod
+    async def get(self, customer_id: str) -> List[Dict[str, str]]:
+        """Retourne les derniers messages du client, du plus ancien au plus récent"""
+        pass
+
+    @abstractmethod
+    async def append(self, customer_id: str, *messages: Dict[str, str]):
+        """Ajoute des messages à l'historique du client"""
+        pass
+
+    @abstractmethod
+    async def clear(self, customer_id: str):
+        """Supprime l'historique du client"""
+        pass
+
+class InMemoryHistoryStore(ConversationHistoryStore):
+    """Historique local au processus.
+
+    Les clients inactifs depuis HISTORY_IDLE_TTL sont évincés, et au plus
+    HISTORY_MAX_CUSTOMERS conversations sont conservées (LRU).
+    """
+
+    def __init__(self):
+        self._histories = LRUCache(
+            maxsize=settings.HISTORY_MAX_CUSTOMERS,
+            ttl=settings.HISTORY_IDLE_TTL,
+            refresh_on_get=True
+        )
+
+    async def get(self, customer_id: str) -> List[Dict[str, str]]:
+        return list(self._histories.get(customer_id, ()))
+
+    async def append(self, customer_id: str, *messages: Dict[str, str]):
+        history = self._histories.get(customer_id)
+        if history is None:
+            history = deque(maxlen=settings.HISTORY_MAX_MESSAGES)
+        history.extend(messages)
+        self._histories.set(customer_id, history)
+
+    async def clear(self, customer_id: str):
+        self._histories.delete(customer_id)
+
+class RedisHistoryStore(ConversationHistoryStore):
+    """Historique partagé entre réplicas, dans une liste Redis par client.
+
+    La liste est tronquée (LTRIM) à chaque ajout et expire après HISTORY_IDLE_TTL
+    secondes d'inactivité.
+    """
+
+    def __init__(self, key_prefix: str = "conversation_history"):
+        self.redis_client = aioredis.Redis(connection_pool=get_async_connection_pool())
+        self.key_prefix = key_prefix
+
+    def _key(self, customer_id: str) -> str:
+        return f"{self.key_prefix}:{customer_id}"
+
+    async def get(self, customer_id: str) -> List[Dict[str, str]]:
+        entries = await self.redis_client.lrange(self._key(customer_id), 0, -1)
+        return [json.loads(entry) for entry in entries]
+
+    async def append(self, customer_id: str, *messages: Dict[str, str]):
+        key = self._key(customer_id)
+        async with self.redis_client.pipeline(transaction=True) as pipe:
+            pipe.rpush(key, *(json.dumps(message) for message in messages))
+            pipe.ltrim(key, -settings.HISTORY_MAX_MESSAGES, -1)
+            pipe.expire(key, settings.HISTORY_IDLE_TTL)
+            await pipe.execute()
+
+    async def clear(self, customer_id: str):
+        await self.redis_client.delete(self._key(customer_id))
+
+def create_history_store() -> ConversationHistoryStore:
+    """Crée le stockage d'historique correspondant à la configuration"""
+    if settings.HISTORY_BACKEND == HistoryBackend.REDIS:
+        return RedisHistoryStore()
+    return InMemoryHistoryStore()
@@ -0,0 +1,158 @@
+import os
+import json
+import hashlib
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional
+from PIL import Image
+import structlog
+from src.core.cache import LRUCache
+from src.core.config import settings
+from src.core.ingestion import DecodedImage
+
+logger = structlog.get_logger()
+
+class ImageAnalysisCache:
+    """Cache des analyses d'images, indexé par empreinte du contenu.
+
+    L'empreinte SHA-256 des octets identifie une image exacte ; l'empreinte
+    perceptuelle (dHash 64 bits) retrouve la même photo redimensionnée ou
+    recompressée, à VISION_CACHE_PERCEPTUAL_DISTANCE bits près. Un LRU en mémoire
+    précède un stockage JSON sur disque sous MEDIA_STORAGE_PATH. Les méthodes sont
+    bloquantes (accès disque) et peuvent être appelées depuis plusieurs threads.
+    """
+
+    def __init__(self, root: Optional[str] = None):
+        self.root = Path(root or settings.MEDIA_STORAGE_PATH) / "vision_cache"
+        self.memory = LRUCache(maxsize=settings.VISION_CACHE_MAX_ENTRIES)
+        self.perceptual_index = LRUCache(maxsize=settings.VISION_CACHE_MAX_ENTRIES)
+        self._perceptual_index_loaded = False
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def content_hash(data: bytes) -> str:
+        return hashlib.sha256(data).hexdigest()
+
+    @staticmethod
+    def perceptual_hash(image: Image.Image) -> str:
+        """dHash : compare chaque pixel à son voisin sur une vignette 9×8 en niveaux de gris"""
+        pixels = list(image.convert("L").resize((9, 8), Image.LANCZOS).getdata())
+        bits = 0
+        for row in range(8):
+            for col in range(8):
+                left = pixels[row * 9 + col]
+                right = pixels[row * 9 + col + 1]
+                bits = (bits << 1) | (left > right)
+        return f"{bits:016x}"
+
+    def fingerprint(self, image: DecodedImage) -> Dict[str, Optional[str]]:
+        """Calcule les empreintes d'une image ingérée, sans la décoder à nouveau"""
+        content_hash = image.content_hash
+        if content_hash is None:
+            with open(image.path, "rb") as f:
+                content_hash = self.content_hash(f.read())
+
+        perceptual_hash = None
+        if settings.VISION_CACHE_PERCEPTUAL:
+            try:
+                perceptual_hash = self.perceptual_hash(image.image)
+            except Exception as e:
+                logger.warning("perceptual_hash_failed", path=image.path, error=str(e))
+
+        return {"content_hash": content_hash, "perceptual_hash": perceptual_hash}
+
+    def get(
+        self,
+        content_hash: str,
+        perceptual_hash: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        """Retourne l'analyse de l'image, ou d'une image perceptuellement identique"""
+        analysis = self._get_exact(content_hash)
+        if analysis is None and perceptual_hash:
+            known_hash = self._lookup_perceptual(perceptual_hash)
+            if known_hash and known_hash != content_hash:
+                analysis = self._get_exact(known_hash)
+        return analysis
+
+    def set(
+        self,
+        content_hash: str,
+        analysis: Dict[str, Any],
+        perceptual_hash: Optional[str] = None
+    ):
+        """Enregistre l'analyse en mémoire et sur disque"""
+        with self._lock:
+            self.memory.set(content_hash, analysis)
+            if perceptual_hash:
+                self.perceptual_index.set(int(perceptual_hash, 16), content_hash)
+        self._write(self._analysis_path(content_hash), json.dumps(analysis))
+        if perceptual_hash:
+            self._write(self._perceptual_path(perceptual_hash), content_hash)
+
+    def _get_exact(self, content_hash: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            analysis = self.memory.get(content_hash)
+        if analysis is not None:
+            return analysis
+
+        path = self._analysis_path(content_hash)
+        try:
+            analysis = json.loads(path.read_text())
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning("vision_cache_read_error", path=str(path), error=str(e))
+            return None
+
+        with self._lock:
+            self.memory.set(content_hash, analysis)
+        return analysis
+
+    def _lookup_perceptual(self, perceptual_hash: str) -> Optional[str]:
+        """Retrouve l'image connue la plus proche, dans la distance de Hamming tolérée"""
+        target = int(perceptual_hash, 16)
+        with self._lock:
+            if not self._perceptual_index_loaded:
+                self._load_perceptual_index()
+
+            content_hash = self.perceptual_index.get(target)
+            if content_hash is not None:
+                return content_hash
+
+            best_key, best_distance = None, settings.VISION_CACHE_PERCEPTUAL_DISTANCE + 1
+            for key in self.perceptual_index.keys():
+                distance = (key ^ target).bit_count()
+                if distance < best_distance:
+                    best_key, best_distance = key, distance
+            return self.perceptual_index.get(best_key) if best_key is not None else None
+
+    def _load_perceptual_index(self):
+        """Charge en mémoire l'index perceptuel persisté (dans la limite du LRU) ; verrou tenu"""
+        self._perceptual_index_loaded = True
+        directory = self.root / "perceptual"
+        if not directory.is_dir():
+            return
+        entries = sorted(directory.iterdir(), key=lambda path: path.stat().st_mtime)
+        for path in entries[-settings.VISION_CACHE_MAX_ENTRIES:]:
+            try:
+                self.perceptual_index.set(int(path.name, 16), path.read_text().strip())
+            except (OSError, ValueError):
+                continue
+
+    def _analysis_path(self, content_hash: str) -> Path:
+        return self.root / content_hash[:2] / f"{content_hash}.json"
+
+    def _perceptual_path(self, perceptual_hash: str) -> Path:
+        return self.root / "perceptual" / perceptual_hash
+
+    def _write(self, path: Path, data: str):
+        """Écriture atomique : un lecteur concurrent ne voit jamais de fichier partiel"""
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+            with os.fdopen(fd, "w") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning("vision_cache_write_error", path=str(path), error=str(e))
@@ -0,0 +1,136 @@
+import os
+import asyncio
+import hashlib
+import tempfile
+import threading
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+import httpx
+from PIL import Image
+import structlog
+from src.core.cache import LRUCache
+from src.core.config import settings
+
+logger = structlog.get_logger()
+
+class ImageTooLargeError(ValueError):
+    """L'image dépasse MAX_IMAGE_BYTES"""
+
+class DecodedImage:
+    """Image décodée une seule fois, partagée entre les agents du processus.
+
+    `image` est en RVB et bornée à MAX_IMAGE_SIZE pixels de côté ; les versions
+    redimensionnées pour les modèles sont calculées à la première demande.
+    """
+
+    __slots__ = ("path", "content_hash", "image", "_resized", "_lock")
+
+    def __init__(self, path: str, content_hash: Optional[str], image: Image.Image):
+        self.path = path
+        self.content_hash = content_hash
+        self.image = image
+        self._resized: Dict[int, Image.Image] = {}
+        self._lock = threading.Lock()
+
+    def resized(self, size: int) -> Image.Image:
+        """Version carrée size×size, à la taille d'entrée d'un processeur de modèle"""
+        with self._lock:
+            image = self._resized.get(size)
+            if image is None:
+                image = self.image.resize((size, size), Image.BICUBIC)
+                self._resized[size] = image
+            return image
+
+class ImageIngestor:
+    """Télécharge et décode les images reçues, à mémoire bornée.
+
+    Le téléchargement est écrit par morceaux sous MEDIA_STORAGE_PATH/images, nommé
+    par l'empreinte SHA-256 du contenu, et interrompu au-delà de MAX_IMAGE_BYTES.
+    Le décodage utilise le mode draft (JPEG) et `thumbnail` pour ne jamais
+    matérialiser la pleine résolution ; les images décodées sont gardées dans un LRU.
+    """
+
+    def __init__(self, root: Optional[str] = None, client: Optional[httpx.AsyncClient] = None):
+        self.root = Path(root or settings.MEDIA_STORAGE_PATH) / "images"
+        self._client = client
+        self._decoded = LRUCache(maxsize=settings.DECODED_IMAGE_CACHE_SIZE)
+        self._lock = threading.Lock()
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=settings.IMAGE_DOWNLOAD_TIMEOUT,
+                follow_redirects=True
+            )
+        return self._client
+
+    async def ingest(self, url: str) -> DecodedImage:
+        """Télécharge puis décode l'image"""
+        path, content_hash = await self.download(url)
+        return await asyncio.to_thread(self.load, path, content_hash)
+
+    async def download(self, url: str) -> Tuple[str, str]:
+        """Écrit l'image sur disque par morceaux ; retourne son chemin et son empreinte"""
+        self.root.mkdir(parents=True, exist_ok=True)
+        digest = hashlib.sha256()
+        received = 0
+
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, prefix=".download-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                async with self.client.stream("GET", url) as response:
+                    response.raise_for_status()
+                    declared = int(response.headers.get("content-length") or 0)
+                    if declared > settings.MAX_IMAGE_BYTES:
+                        raise ImageTooLargeError(f"Image too large: {declared} bytes")
+
+                    async for chunk in response.aiter_bytes(settings.IMAGE_DOWNLOAD_CHUNK_SIZE):
+                        received += len(chunk)
+                        if received > settings.MAX_IMAGE_BYTES:
+                            raise ImageTooLargeError(f"Image too large: over {settings.MAX_IMAGE_BYTES} bytes")
+                        digest.update(chunk)
+                        f.write(chunk)
+
+            content_hash = digest.hexdigest()
+            path = self.root / content_hash[:2] / content_hash
+            path.parent.mkdir(exist_ok=True)
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+
+        logger.info("image_downloaded", url=url, size=received, content_hash=content_hash)
+        return str(path), content_hash
+
+    def load(self, path: str, content_hash: Optional[str] = None) -> DecodedImage:
+        """Retourne l'image décodée, depuis le LRU ou décodée à taille bornée (bloquant)"""
+        with self._lock:
+            decoded = self._decoded.get(path)
+        if decoded is not None:
+            return decoded
+
+        decoded = DecodedImage(path, content_hash, self.decode(path))
+        with self._lock:
+            self._decoded.set(path, decoded)
+        return decoded
+
+    @staticmethod
+    def decode(path: str, max_size: Optional[int] = None) -> Image.Image:
+        """Décode en RVB, le plus grand côté borné à MAX_IMAGE_SIZE"""
+        max_size = max_size or settings.MAX_IMAGE_SIZE
+        with Image.open(path) as image:
+            # JPEG : décodage directement à l'échelle 1/2, 1/4 ou 1/8 suffisante
+            image.draft("RGB", (max_size, max_size))
+            image.thumbnail((max_size, max_size), Image.BICUBIC, reducing_gap=2.0)
+            return image.convert("RGB")
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+image_ingestor = ImageIngestor()
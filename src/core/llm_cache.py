@@ -0,0 +1,89 @@
+import re
+import hashlib
+import unicodedata
+from typing import Optional
+import redis.asyncio as aioredis
+import structlog
+from src.core.cache import LRUCache
+from src.core.config import settings
+from src.core.mcp import get_async_connection_pool
+from src.core.metrics import LLM_CACHE_REQUESTS
+
+logger = structlog.get_logger()
+
+_WHITESPACE = re.compile(r"\s+")
+_SPACE_BEFORE_PUNCTUATION = re.compile(r"\s+([?!.,;:])")
+
+class LLMResponseCache:
+    """Cache des réponses LLM indexé par prompt normalisé et nom du modèle.
+
+    Deux niveaux : un LRU en mémoire consulté en premier, puis Redis, partagé
+    entre réplicas. Une réponse trouvée dans Redis est recopiée en mémoire.
+    """
+
+    def __init__(self, model_name: str, key_prefix: str = "llm_cache"):
+        self.model_name = model_name
+        self.key_prefix = key_prefix
+        self.memory = LRUCache(
+            maxsize=settings.LLM_CACHE_MAX_ENTRIES,
+            ttl=settings.LLM_CACHE_TTL
+        )
+        self.redis_client = (
+            aioredis.Redis(connection_pool=get_async_connection_pool())
+            if settings.LLM_CACHE_REDIS else None
+        )
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def normalize(prompt: str) -> str:
+        """Normalise la casse, les espaces et l'espacement de la ponctuation"""
+        prompt = unicodedata.normalize("NFKC", prompt).lower()
+        prompt = _SPACE_BEFORE_PUNCTUATION.sub(r"\1", prompt)
+        return _WHITESPACE.sub(" ", prompt).strip()
+
+    def key(self, prompt: str) -> str:
+        digest = hashlib.sha256(
+            f"{self.model_name}\x00{self.normalize(prompt)}".encode()
+        ).hexdigest()
+        return f"{self.key_prefix}:{digest}"
+
+    async def get(self, prompt: str) -> Optional[str]:
+        """Retourne la réponse en cache pour ce prompt, le cas échéant"""
+        key = self.key(prompt)
+        response = self.memory.get(key)
+        if response is not None:
+            self._record("memory", "hit")
+            return response
+
+        if self.redis_client is not None:
+            try:
+                cached = await self.redis_client.get(key)
+            except Exception as e:
+                logger.warning("llm_cache_redis_error", error=str(e))
+                cached = None
+            if cached is not None:
+                response = cached.decode()
+                self.memory.set(key, response)
+                self._record("redis", "hit")
+                return response
+
+        self._record("all", "miss")
+        return None
+
+    async def set(self, prompt: str, response: str):
+        """Enregistre la réponse dans les deux niveaux"""
+        key = self.key(prompt)
+        self.memory.set(key, response)
+        if self.redis_client is not None:
+            try:
+                await self.redis_client.set(key, response, ex=settings.LLM_CACHE_TTL)
+            except Exception as e:
+                logger.warning("llm_cache_redis_error", error=str(e))
+
+    def _record(self, tier: str, result: str):
+        if result == "hit":
+            self.hits += 1
+        else:
+            self.misses += 1
+        LLM_CACHE_REQUESTS.labels(tier=tier, result=result).inc()
@@ -1,7 +1,16 @@
 import json
+import uuid
+import time
+import asyncio
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional
 import redis
-from typing import Any, Dict, Optional
-from src.core.config import settings
+import redis.asyncio as aioredis
+import structlog
+from src.core import codec
+from src.core.config import settings, MCPTransport
+
+logger = structlog.get_logger()
 
 class MCPMessage:
     def __init__(
@@ -16,17 +25,16 @@ class MCPMessage:
         self.metadata = metadata or {}
         self.ttl = ttl
 
-    def to_json(self) -> str:
-        return json.dumps({
+    def to_dict(self) -> Dict[str, Any]:
+        return {
             "message_type": self.message_type,
             "content": self.content,
             "metadata": self.metadata,
             "ttl": self.ttl
-        })
+        }
 
     @classmethod
-    def from_json(cls, json_str: str) -> "MCPMessage":
-        data = json.loads(json_str)
+    def from_dict(cls, data: Dict[str, Any]) -> "MCPMessage":
         return cls(
             message_type=data["message_type"],
             content=data["content"],
@@ -34,13 +42,69 @@ class MCPMessage:
             ttl=data["ttl"]
         )
 
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict())
+
+    @classmethod
+    def from_json(cls, json_str: str) -> "MCPMessage":
+        return cls.from_dict(json.loads(json_str))
+
+    def encode(self) -> bytes:
+        """Encode le message pour le transport, selon le codec configuré"""
+        return codec.encode(
+            self.to_dict(),
+            codec=settings.MCP_CODEC.value,
+            compression=settings.MCP_COMPRESSION.value,
+            threshold=settings.MCP_COMPRESSION_THRESHOLD
+        )
+
+    @classmethod
+    def decode(cls, data: bytes) -> "MCPMessage":
+        """Décode un message reçu, quel que soit le codec de l'émetteur"""
+        return cls.from_dict(codec.decode(data))
+
+_connection_pool: Optional[redis.ConnectionPool] = None
+_async_connection_pool: Optional[aioredis.ConnectionPool] = None
+
+def get_connection_pool() -> redis.ConnectionPool:
+    """Retourne le pool de connexions Redis synchrone partagé par le processus"""
+    global _connection_pool
+    if _connection_pool is None:
+        _connection_pool = redis.BlockingConnectionPool.from_url(
+            settings.REDIS_URL,
+            max_connections=settings.REDIS_MAX_CONNECTIONS,
+            timeout=settings.REDIS_POOL_TIMEOUT
+        )
+    return _connection_pool
+
+def get_async_connection_pool() -> aioredis.ConnectionPool:
+    """Retourne le pool de connexions Redis asyncio partagé par le processus"""
+    global _async_connection_pool
+    if _async_connection_pool is None:
+        _async_connection_pool = aioredis.BlockingConnectionPool.from_url(
+            settings.REDIS_URL,
+            max_connections=settings.REDIS_MAX_CONNECTIONS,
+            timeout=settings.REDIS_POOL_TIMEOUT
+        )
+    return _async_connection_pool
+
+async def close_connection_pools():
+    """Ferme les pools de connexions Redis partagés"""
+    global _connection_pool, _async_connection_pool
+    if _async_connection_pool is not None:
+        await _async_connection_pool.disconnect()
+        _async_connection_pool = None
+    if _connection_pool is not None:
+        _connection_pool.disconnect()
+        _connection_pool = None
+
 class MCPBroker:
     def __init__(self):
-        self.redis_client = redis.Redis.from_url(settings.REDIS_URL)
+        self.redis_client = redis.Redis(connection_pool=get_connection_pool())
         
     def publish(self, channel: str, message: MCPMessage):
         """Publie un message MCP sur un canal"""
-        self.redis_client.publish(channel, message.to_json())
+        self.redis_client.publish(channel, message.encode())
         
     def subscribe(self, channels: list[str]):
         """S'abonne à des canaux MCP"""
@@ -48,16 +112,345 @@ class MCPBroker:
         pubsub.subscribe(*channels)
         return pubsub
         
-    def get_message(self, pubsub):
+    def get_message(self, pubsub, timeout: float = 0.0):
         """Récupère le prochain message des canaux souscrits"""
-        message = pubsub.get_message()
+        message = pubsub.get_message(timeout=timeout)
+        if message and message["type"] == "message":
+            return MCPMessage.decode(message["data"])
+        return None
+
+    def reply(self, request: MCPMessage, response: MCPMessage):
+        """Publie la réponse sur le canal de retour de la requête, avec le même id de corrélation"""
+        reply_to = request.metadata.get("reply_to")
+        if not reply_to:
+            return
+        response.metadata["correlation_id"] = request.metadata.get("correlation_id")
+        self.publish(reply_to, response)
+
+class MCPDelivery:
+    """Message reçu d'un canal, à acquitter une fois traité"""
+
+    def __init__(
+        self,
+        channel: str,
+        message: MCPMessage,
+        entry_id: Optional[str] = None,
+        ack: Optional[Callable[[], Awaitable[None]]] = None
+    ):
+        self.channel = channel
+        self.message = message
+        self.entry_id = entry_id
+        self._ack = ack
+
+    async def ack(self):
+        """Confirme le traitement ; sans effet pour le transport pub/sub"""
+        if self._ack is not None:
+            await self._ack()
+
+class AsyncMCPBroker:
+    """Variante asyncio de MCPBroker, sans écriture bloquante sur la boucle d'événements.
+
+    Toutes les instances partagent le pool de connexions du processus : en créer une
+    par agent ne coûte aucune connexion supplémentaire.
+    """
+
+    def __init__(self):
+        self.redis_client = aioredis.Redis(connection_pool=get_async_connection_pool())
+
+    async def publish(self, channel: str, message: MCPMessage):
+        """Publie un message MCP sur un canal"""
+        await self.redis_client.publish(channel, message.encode())
+
+    async def subscribe(self, channels: list[str]):
+        """S'abonne à des canaux MCP"""
+        pubsub = self.redis_client.pubsub(ignore_subscribe_messages=True)
+        await pubsub.subscribe(*channels)
+        return pubsub
+
+    async def get_message(self, pubsub, timeout: float = 0.0) -> Optional[MCPMessage]:
+        """Récupère le prochain message des canaux souscrits"""
+        message = await pubsub.get_message(
+            ignore_subscribe_messages=True,
+            timeout=timeout
+        )
         if message and message["type"] == "message":
-            return MCPMessage.from_json(message["data"].decode())
+            return MCPMessage.decode(message["data"])
         return None
 
+    async def listen(self, pubsub) -> AsyncIterator[MCPMessage]:
+        """Itère sur les messages des canaux souscrits jusqu'à la fermeture de l'abonnement"""
+        async for message in pubsub.listen():
+            if message["type"] == "message":
+                yield MCPMessage.decode(message["data"])
+
+    async def consume(
+        self,
+        channels: list[str],
+        group: str,
+        consumer: str
+    ) -> AsyncIterator[MCPDelivery]:
+        """Consomme les messages des canaux pour un groupe de workers.
+
+        En pub/sub, chaque abonné reçoit tous les messages : `group` et `consumer`
+        ne sont utilisés que par le transport Streams.
+        """
+        pubsub = await self.subscribe(channels)
+        try:
+            async for message in pubsub.listen():
+                if message["type"] == "message":
+                    yield MCPDelivery(
+                        channel=message["channel"].decode(),
+                        message=MCPMessage.decode(message["data"])
+                    )
+        finally:
+            await pubsub.aclose()
+
+    async def reply(self, request: MCPMessage, response: MCPMessage):
+        """Publie la réponse sur le canal de retour de la requête, avec le même id de corrélation"""
+        reply_to = request.metadata.get("reply_to")
+        if not reply_to:
+            return
+        response.metadata["correlation_id"] = request.metadata.get("correlation_id")
+        # Le canal de retour est propre à un processus : toujours en pub/sub
+        await self.broadcast(reply_to, response)
+
+    async def broadcast(self, channel: str, message: MCPMessage):
+        """Diffuse un message à tous les processus abonnés, en pub/sub quel que soit le transport"""
+        await self.redis_client.publish(channel, message.encode())
+
+    async def close(self):
+        """Libère le client ; le pool partagé est fermé par close_connection_pools"""
+        await self.redis_client.aclose(close_connection_pool=False)
+
+class StreamsMCPBroker(AsyncMCPBroker):
+    """Transport Redis Streams : files durables partagées entre réplicas d'un agent.
+
+    Chaque canal est un stream ; chaque type d'agent lit via son propre groupe de
+    consommateurs, de sorte qu'un message n'est traité que par une seule réplique.
+    Les entrées non acquittées d'un worker arrêté sont réclamées par les autres
+    après `MCP_STREAM_CLAIM_IDLE_MS` (livraison au moins une fois).
+    """
+
+    async def publish(self, channel: str, message: MCPMessage):
+        """Ajoute un message au stream du canal, en purgeant les entrées expirées"""
+        # Les entrées plus anciennes que la durée de vie du message sont supprimées
+        min_id = int(time.time() * 1000) - message.ttl * 1000
+        await self.redis_client.xadd(
+            channel,
+            {"data": message.encode()},
+            minid=min_id,
+            approximate=True
+        )
+
+    async def consume(
+        self,
+        channels: list[str],
+        group: str,
+        consumer: str
+    ) -> AsyncIterator[MCPDelivery]:
+        """Lit les streams des canaux au sein d'un groupe de consommateurs"""
+        for channel in channels:
+            await self._ensure_group(channel, group)
+
+        last_claim = 0.0
+        while True:
+            # Réclamer périodiquement les entrées abandonnées par un worker arrêté
+            if time.monotonic() - last_claim >= settings.MCP_STREAM_CLAIM_IDLE_MS / 1000:
+                last_claim = time.monotonic()
+                for channel in channels:
+                    for delivery in await self._claim_stale(channel, group, consumer):
+                        yield delivery
+
+            response = await self.redis_client.xreadgroup(
+                group,
+                consumer,
+                {channel: ">" for channel in channels},
+                count=settings.MCP_STREAM_BATCH_SIZE,
+                block=settings.MCP_STREAM_BLOCK_MS
+            )
+            for stream, entries in response or []:
+                for entry_id, fields in entries:
+                    delivery = self._to_delivery(stream.decode(), group, entry_id, fields)
+                    if delivery is not None:
+                        yield delivery
+
+    async def _ensure_group(self, channel: str, group: str):
+        """Crée le groupe de consommateurs (et le stream) s'il n'existe pas"""
+        try:
+            await self.redis_client.xgroup_create(channel, group, id="0", mkstream=True)
+        except redis.ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    async def _claim_stale(self, channel: str, group: str, consumer: str) -> list:
+        """Transfère à ce worker les entrées en attente depuis trop longtemps"""
+        deliveries = []
+        start_id = "0-0"
+        while True:
+            response = await self.redis_client.xautoclaim(
+                channel,
+                group,
+                consumer,
+                min_idle_time=settings.MCP_STREAM_CLAIM_IDLE_MS,
+                start_id=start_id,
+                count=settings.MCP_STREAM_BATCH_SIZE
+            )
+            start_id, entries = response[0], response[1]
+            for entry_id, fields in entries:
+                delivery = self._to_delivery(channel, group, entry_id, fields)
+                if delivery is not None:
+                    deliveries.append(delivery)
+            if start_id in (b"0-0", "0-0"):
+                return deliveries
+
+    def _to_delivery(
+        self,
+        channel: str,
+        group: str,
+        entry_id: bytes,
+        fields: Optional[Dict[bytes, bytes]]
+    ) -> Optional[MCPDelivery]:
+        """Construit la livraison d'une entrée ; les entrées purgées sont ignorées"""
+        if not fields or b"data" not in fields:
+            return None
+
+        async def ack():
+            await self.redis_client.xack(channel, group, entry_id)
+
+        return MCPDelivery(
+            channel=channel,
+            message=MCPMessage.decode(fields[b"data"]),
+            entry_id=entry_id.decode(),
+            ack=ack
+        )
+
+def create_broker() -> AsyncMCPBroker:
+    """Crée le broker asynchrone correspondant au transport configuré"""
+    if settings.MCP_TRANSPORT == MCPTransport.STREAMS:
+        return StreamsMCPBroker()
+    return AsyncMCPBroker()
+
+class MCPResponseRouter:
+    """Associe les réponses des agents aux requêtes en attente via leur id de corrélation.
+
+    Un seul abonnement au canal de réponse du processus est partagé par toutes les
+    requêtes : chaque requête enregistre un future, résolu par l'écouteur à l'arrivée
+    de la réponse portant le même `correlation_id`.
+    """
+
+    def __init__(
+        self,
+        broker: AsyncMCPBroker,
+        channel: Optional[str] = None,
+        timeout: Optional[float] = None,
+        on_late_reply: Optional[Callable[[MCPMessage], Optional[Awaitable[None]]]] = None
+    ):
+        self.broker = broker
+        # Canal propre au processus : seule cette réplique détient les futures en attente
+        self.channel = channel or f"{settings.MCP_RESPONSE_CHANNEL}:{uuid.uuid4().hex}"
+        self.timeout = timeout if timeout is not None else settings.MCP_RESPONSE_TIMEOUT
+        self.on_late_reply = on_late_reply
+        self._pending: Dict[str, asyncio.Future] = {}
+        # Ids expirés récemment, pour distinguer une réponse tardive d'une réponse inconnue
+        self._expired: "OrderedDict[str, float]" = OrderedDict()
+        self._pubsub = None
+        self._listener: Optional[asyncio.Task] = None
+
+    async def start(self):
+        """Démarre l'écouteur unique du canal de réponse"""
+        self._pubsub = await self.broker.subscribe([self.channel])
+        self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        """Arrête l'écouteur et annule les requêtes encore en attente"""
+        if self._listener:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+        if self._pubsub:
+            await self._pubsub.aclose()
+            self._pubsub = None
+        for future in self._pending.values():
+            if not future.done():
+                future.cancel()
+        self._pending.clear()
+
+    async def request(
+        self,
+        channel: str,
+        message: MCPMessage,
+        timeout: Optional[float] = None
+    ) -> MCPMessage:
+        """Publie une requête et attend la réponse corrélée.
+
+        Lève `asyncio.TimeoutError` si aucune réponse n'arrive dans le délai ; une
+        réponse arrivant ensuite est traitée comme tardive.
+        """
+        correlation_id = uuid.uuid4().hex
+        message.metadata["correlation_id"] = correlation_id
+        message.metadata["reply_to"] = self.channel
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending[correlation_id] = future
+        try:
+            await self.broker.publish(channel, message)
+            return await asyncio.wait_for(
+                future,
+                timeout if timeout is not None else self.timeout
+            )
+        except asyncio.TimeoutError:
+            self._mark_expired(correlation_id)
+            raise
+        finally:
+            self._pending.pop(correlation_id, None)
+
+    async def _listen(self):
+        """Boucle de l'écouteur : résout les futures à l'arrivée des réponses"""
+        while True:
+            try:
+                async for response in self.broker.listen(self._pubsub):
+                    self._dispatch(response)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("response_listener_error", error=str(e))
+                await asyncio.sleep(1)
+
+    def _dispatch(self, response: MCPMessage):
+        """Résout le future correspondant à la réponse reçue"""
+        correlation_id = response.metadata.get("correlation_id")
+        future = self._pending.pop(correlation_id, None)
+        if future is not None:
+            if not future.done():
+                future.set_result(response)
+            return
+
+        if correlation_id in self._expired:
+            del self._expired[correlation_id]
+            logger.warning(
+                "late_reply",
+                correlation_id=correlation_id,
+                message_type=response.message_type
+            )
+            if self.on_late_reply:
+                result = self.on_late_reply(response)
+                if asyncio.iscoroutine(result):
+                    asyncio.get_running_loop().create_task(result)
+        else:
+            logger.debug("unknown_reply", correlation_id=correlation_id)
+
+    def _mark_expired(self, correlation_id: str):
+        """Mémorise un id expiré, dans la limite de la fenêtre configurée"""
+        self._expired[correlation_id] = time.monotonic()
+        while len(self._expired) > settings.MCP_LATE_REPLY_WINDOW:
+            self._expired.popitem(last=False)
+
 # Exemple d'utilisation:
 """
-broker = MCPBroker()
+broker = MCPBroker()  # ou AsyncMCPBroker() depuis du code asynchrone
 
 # Publication
 message = MCPMessage(
@@ -0,0 +1,73 @@
+from prometheus_client import Counter, Gauge, Histogram
+
+# Cache des réponses LLM du DialogAgent
+LLM_CACHE_REQUESTS = Counter(
+    "llm_cache_requests_total",
+    "Consultations du cache de réponses LLM",
+    ["tier", "result"]
+)
+
+# Cache de disponibilité de l'InventoryAgent
+AVAILABILITY_CACHE_REQUESTS = Counter(
+    "availability_cache_requests_total",
+    "Consultations du cache de disponibilité des produits",
+    ["tier", "result"]
+)
+
+# Inférence par lots (VisionAgent)
+INFERENCE_QUEUE_DEPTH = Gauge(
+    "inference_queue_depth",
+    "Requêtes en attente d'inférence",
+    ["model"]
+)
+
+INFERENCE_BATCH_SIZE = Histogram(
+    "inference_batch_size",
+    "Nombre d'éléments par lot d'inférence",
+    ["model"],
+    buckets=(1, 2, 4, 8, 16, 32)
+)
+
+# Registre des modèles chargés à la demande
+MODEL_LOADS = Counter(
+    "model_loads_total",
+    "Chargements de modèles",
+    ["model"]
+)
+
+MODEL_RESIDENT_BYTES = Gauge(
+    "model_resident_bytes",
+    "Mémoire occupée par chaque modèle chargé",
+    ["model"]
+)
+
+# Pool de connexions SQLAlchemy
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out",
+    "Connexions empruntées au pool",
+    ["engine"]
+)
+
+DB_POOL_OVERFLOW = Gauge(
+    "db_pool_overflow",
+    "Connexions ouvertes au-delà de DB_POOL_SIZE",
+    ["engine"]
+)
+
+DB_POOL_CAPACITY = Gauge(
+    "db_pool_capacity",
+    "Connexions disponibles au maximum (DB_POOL_SIZE + DB_MAX_OVERFLOW)",
+    ["engine"]
+)
+
+# Routage des lectures vers le réplica
+DB_READ_ROUTING = Counter(
+    "db_read_routing_total",
+    "Sessions en lecture seule par moteur cible",
+    ["target"]
+)
+
+DB_REPLICA_LAG = Gauge(
+    "db_replica_lag_seconds",
+    "Retard de rejeu du réplica lors de la dernière vérification"
+)
@@ -0,0 +1,237 @@
+import gc
+import os
+import time
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, List, Optional
+import structlog
+from src.core.config import settings
+from src.core.metrics import MODEL_LOADS, MODEL_RESIDENT_BYTES
+
+logger = structlog.get_logger()
+
+class ModelHandle:
+    """Modèle enregistré : son chargeur, et son état de résidence en mémoire"""
+
+    __slots__ = (
+        "name", "loader", "unloader", "estimated_bytes",
+        "model", "size_bytes", "last_used", "in_use", "lock"
+    )
+
+    def __init__(
+        self,
+        name: str,
+        loader: Callable[[], Any],
+        unloader: Optional[Callable[[Any], None]] = None,
+        estimated_bytes: int = 0
+    ):
+        self.name = name
+        self.loader = loader
+        self.unloader = unloader
+        self.estimated_bytes = estimated_bytes
+        self.model: Any = None
+        self.size_bytes = 0
+        self.last_used = 0.0
+        self.in_use = 0
+        self.lock = asyncio.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self.model is not None
+
+class ModelRegistry:
+    """Registre des modèles chargés à la demande, sous un budget mémoire.
+
+    Un modèle n'est chargé (dans un thread) qu'à sa première utilisation ou par
+    `warm_up` en arrière-plan. Sa taille résidente est mesurée au chargement ; au-delà
+    de `memory_budget_mb`, les modèles les moins récemment utilisés et inutilisés
+    sont déchargés avant d'en charger un nouveau.
+    """
+
+    def __init__(self, memory_budget_mb: Optional[int] = None):
+        self.memory_budget = (
+            memory_budget_mb if memory_budget_mb is not None else settings.MODEL_MEMORY_BUDGET_MB
+        ) * 1024 * 1024
+        self._handles: Dict[str, ModelHandle] = {}
+        self._warm_up_task: Optional[asyncio.Task] = None
+
+    def register(
+        self,
+        name: str,
+        loader: Callable[[], Any],
+        unloader: Optional[Callable[[Any], None]] = None,
+        estimated_mb: int = 0
+    ):
+        """Déclare un modèle sans le charger ; un modèle déjà résident est conservé"""
+        handle = self._handles.get(name)
+        if handle is not None and handle.loaded:
+            return
+        self._handles[name] = ModelHandle(name, loader, unloader, estimated_mb * 1024 * 1024)
+
+    @asynccontextmanager
+    async def use(self, name: str) -> AsyncIterator[Any]:
+        """Fournit le modèle, chargé si besoin, et le protège du déchargement pendant l'usage"""
+        handle = self._get_handle(name)
+        handle.in_use += 1
+        try:
+            if not handle.loaded:
+                await self._load(handle)
+            handle.last_used = time.monotonic()
+            yield handle.model
+        finally:
+            handle.in_use -= 1
+            handle.last_used = time.monotonic()
+
+    def get_loaded(self, name: str) -> Any:
+        """Retourne un modèle résident, sans le charger"""
+        handle = self._get_handle(name)
+        if not handle.loaded:
+            raise RuntimeError(f"Model {name} is not loaded")
+        return handle.model
+
+    def start_warm_up(self, names: Iterable[str]):
+        """Charge les modèles indiqués en arrière-plan, sans bloquer le démarrage"""
+        names = [name for name in names if name in self._handles]
+        if names:
+            self._warm_up_task = asyncio.create_task(self.warm_up(names))
+
+    async def warm_up(self, names: Iterable[str]):
+        for name in names:
+            try:
+                async with self.use(name):
+                    pass
+            except Exception as e:
+                logger.error("model_warm_up_failed", model=name, error=str(e))
+
+    async def unload(self, name: str):
+        handle = self._get_handle(name)
+        async with handle.lock:
+            self._unload(handle)
+
+    async def close(self):
+        """Annule le préchauffage et décharge tous les modèles"""
+        if self._warm_up_task is not None:
+            self._warm_up_task.cancel()
+            try:
+                await self._warm_up_task
+            except asyncio.CancelledError:
+                pass
+            self._warm_up_task = None
+        for handle in self._handles.values():
+            if handle.loaded:
+                self._unload(handle)
+
+    def resident_bytes(self) -> int:
+        return sum(handle.size_bytes for handle in self._handles.values() if handle.loaded)
+
+    def stats(self) -> List[Dict[str, Any]]:
+        return [
+            {
+                "model": handle.name,
+                "loaded": handle.loaded,
+                "size_bytes": handle.size_bytes,
+                "in_use": handle.in_use
+            }
+            for handle in self._handles.values()
+        ]
+
+    def _get_handle(self, name: str) -> ModelHandle:
+        try:
+            return self._handles[name]
+        except KeyError:
+            raise KeyError(f"Unknown model: {name}") from None
+
+    async def _load(self, handle: ModelHandle):
+        async with handle.lock:
+            if handle.loaded:
+                return
+            self._make_room(handle.estimated_bytes, exclude=handle)
+
+            start = time.monotonic()
+            rss_before = _process_rss()
+            model = await asyncio.to_thread(handle.loader)
+            rss_delta = max(_process_rss() - rss_before, 0)
+
+            handle.model = model
+            # Les paramètres torch donnent la taille exacte ; à défaut, la croissance de
+            # la mémoire du processus, bruitée, est bornée par l'estimation déclarée
+            handle.size_bytes = _parameter_bytes(model) or max(rss_delta, handle.estimated_bytes)
+            MODEL_LOADS.labels(model=handle.name).inc()
+            MODEL_RESIDENT_BYTES.labels(model=handle.name).set(handle.size_bytes)
+            logger.info(
+                "model_loaded",
+                model=handle.name,
+                size_mb=round(handle.size_bytes / 1024 / 1024, 1),
+                duration=round(time.monotonic() - start, 2)
+            )
+
+            # La taille réelle peut dépasser l'estimation
+            self._make_room(0, exclude=handle)
+
+    def _make_room(self, needed_bytes: int, exclude: ModelHandle):
+        """Décharge les modèles inutilisés, du moins récent au plus récent, jusqu'au budget"""
+        if self.memory_budget <= 0:
+            return
+        candidates = sorted(
+            (
+                handle for handle in self._handles.values()
+                if handle.loaded and handle is not exclude and handle.in_use == 0
+            ),
+            key=lambda handle: handle.last_used
+        )
+        for handle in candidates:
+            if self.resident_bytes() + needed_bytes <= self.memory_budget:
+                return
+            self._unload(handle)
+        if self.resident_bytes() + needed_bytes > self.memory_budget:
+            logger.warning(
+                "model_memory_budget_exceeded",
+                resident_mb=round(self.resident_bytes() / 1024 / 1024, 1),
+                budget_mb=round(self.memory_budget / 1024 / 1024, 1)
+            )
+
+    def _unload(self, handle: ModelHandle):
+        model, handle.model = handle.model, None
+        if handle.unloader is not None:
+            try:
+                handle.unloader(model)
+            except Exception as e:
+                logger.error("model_unload_error", model=handle.name, error=str(e))
+        del model
+        handle.size_bytes = 0
+        MODEL_RESIDENT_BYTES.labels(model=handle.name).set(0)
+        gc.collect()
+        _empty_device_cache()
+        logger.info("model_unloaded", model=handle.name)
+
+def _parameter_bytes(model: Any) -> int:
+    """Taille des paramètres et buffers des modules torch contenus dans `model`"""
+    if isinstance(model, (tuple, list)):
+        return sum(_parameter_bytes(item) for item in model)
+    if isinstance(model, dict):
+        return sum(_parameter_bytes(item) for item in model.values())
+    if not (hasattr(model, "parameters") and hasattr(model, "buffers")):
+        return 0
+    try:
+        tensors = list(model.parameters()) + list(model.buffers())
+        return sum(tensor.numel() * tensor.element_size() for tensor in tensors)
+    except Exception:
+        return 0
+
+def _process_rss() -> int:
+    """Mémoire résidente du processus (Linux), 0 si indisponible"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return 0
+
+def _empty_device_cache():
+    try:
+        import torch
+    except ImportError:
+        return
+    if torch.cuda.is_available():
+        torch.cuda.empty_cache()
+
+model_registry = ModelRegistry()
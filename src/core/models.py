@@ -1,7 +1,9 @@
 from datetime import datetime
-from typing import Optional, List
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Table, Boolean
-from sqlalchemy.orm import relationship
+from typing import Optional, List, Tuple
+import numpy as np
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Table, Boolean, LargeBinary, Index
+from sqlalchemy.orm import Session, relationship
+from src.core.config import settings
 from src.core.database import Base
 
 # Table d'association pour les produits similaires
@@ -25,7 +27,9 @@ class Product(Base):
     dimensions = Column(String)
     stock_quantity = Column(Integer)
     image_urls = Column(String)  # JSON array
-    embedding = Column(String)  # Vector embedding for similarity search
+    embedding = Column(LargeBinary)  # Vector embedding for similarity search, raw little-endian bytes
+    embedding_dim = Column(Integer)
+    embedding_dtype = Column(String(16))  # float32 or float16
     similar_products = relationship(
         'Product',
         secondary=similar_products,
@@ -36,6 +40,17 @@ class Product(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    def set_embedding(self, vector: Optional[np.ndarray]):
+        """Stocke l'embedding au format binaire configuré (EMBEDDING_STORAGE_DTYPE)"""
+        if vector is None:
+            self.embedding = self.embedding_dim = self.embedding_dtype = None
+            return
+        self.embedding, self.embedding_dim, self.embedding_dtype = pack_embedding(vector)
+
+    def get_embedding(self) -> Optional[np.ndarray]:
+        """Vue NumPy (lecture seule, sans copie) de l'embedding stocké"""
+        return unpack_embedding(self.embedding, self.embedding_dim, self.embedding_dtype)
+
 class Customer(Base):
     __tablename__ = "customers"
 
@@ -73,6 +88,20 @@ class OrderItem(Base):
     
     order = relationship("Order", back_populates="items")
 
+class StockReservation(Base):
+    __tablename__ = "stock_reservations"
+
+    id = Column(Integer, primary_key=True, index=True)
+    product_id = Column(Integer, ForeignKey("products.id"), nullable=False)
+    order_id = Column(Integer, ForeignKey("orders.id"), index=True)
+    quantity = Column(Integer, nullable=False)
+    status = Column(String, nullable=False, default="held")  # held, converted, released
+    expires_at = Column(DateTime, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    # Le balayage des réservations expirées ne parcourt que les réservations actives
+    __table_args__ = (Index("ix_stock_reservations_status_expires_at", "status", "expires_at"),)
+
 class Interaction(Base):
     __tablename__ = "interactions"
 
@@ -81,4 +110,61 @@ class Interaction(Base):
     interaction_type = Column(String)  # message, image, voice, purchase
     content = Column(String)
     timestamp = Column(DateTime, default=datetime.utcnow)
-    metadata = Column(String)  # JSON
\ No newline at end of file
+    # `metadata` est réservé par SQLAlchemy : la colonne garde son nom en base
+    interaction_metadata = Column("metadata", String)  # JSON
+
+def pack_embedding(vector: np.ndarray, dtype: Optional[str] = None) -> Tuple[bytes, int, str]:
+    """Sérialise un vecteur en octets little-endian ; retourne (octets, dimension, type)"""
+    dtype = dtype or settings.EMBEDDING_STORAGE_DTYPE
+    array = np.asarray(vector, dtype=np.dtype(dtype).newbyteorder("<")).reshape(-1)
+    return array.tobytes(), array.shape[0], dtype
+
+def unpack_embedding(
+    data: Optional[bytes],
+    dim: Optional[int],
+    dtype: Optional[str]
+) -> Optional[np.ndarray]:
+    """Relit un embedding binaire par `np.frombuffer`, sans copie"""
+    if not data:
+        return None
+    array = np.frombuffer(data, dtype=np.dtype(dtype or "float32").newbyteorder("<"))
+    if dim is not None and array.shape[0] != dim:
+        raise ValueError(f"Embedding size mismatch: expected {dim}, got {array.shape[0]}")
+    return array
+
+def load_embedding_matrix(db: Session, batch_size: int = 5000) -> Tuple[np.ndarray, np.ndarray]:
+    """Charge les embeddings de tout le catalogue en une passe.
+
+    Retourne les identifiants et une matrice float32 (une ligne par produit) ; les
+    octets de chaque lot sont concaténés puis relus d'un seul `np.frombuffer`.
+    """
+    query = (
+        db.query(Product.id, Product.embedding, Product.embedding_dim, Product.embedding_dtype)
+        .filter(Product.embedding.isnot(None))
+        .order_by(Product.id)
+        .yield_per(batch_size)
+    )
+
+    ids: List[int] = []
+    blocks: List[np.ndarray] = []
+    group: List[bytes] = []
+    group_format = None
+
+    def flush():
+        if group:
+            dim, dtype = group_format
+            block = np.frombuffer(b"".join(group), dtype=np.dtype(dtype).newbyteorder("<"))
+            blocks.append(block.reshape(-1, dim).astype(np.float32, copy=False))
+            group.clear()
+
+    for product_id, data, dim, dtype in query:
+        if (dim, dtype) != group_format or len(group) >= batch_size:
+            flush()
+            group_format = (dim, dtype)
+        ids.append(product_id)
+        group.append(data)
+    flush()
+
+    if not blocks:
+        return np.empty(0, dtype=np.int64), np.empty((0, 0), dtype=np.float32)
+    return np.asarray(ids, dtype=np.int64), np.concatenate(blocks) if len(blocks) > 1 else blocks[0]
@@ -0,0 +1,44 @@
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.core.models import Order, OrderItem
+
+# (product_id, quantity, prix unitaire)
+OrderLine = Tuple[int, int, float]
+
+async def insert_order(
+    db: AsyncSession,
+    customer_id: int,
+    lines: List[OrderLine],
+    shipping_address: Optional[str] = None
+) -> Dict:
+    """Insère une commande et ses articles en deux instructions, sans passer par l'unité de travail.
+
+    Le total est calculé à partir des prix fournis et écrit avec la commande ; les
+    articles partent en un seul INSERT multi-lignes. N'effectue pas le commit.
+    """
+    total_amount = sum(price * quantity for _, quantity, price in lines)
+    order_id, created_at = (await db.execute(
+        insert(Order)
+        .values(
+            customer_id=customer_id,
+            status="pending",
+            total_amount=total_amount,
+            shipping_address=shipping_address
+        )
+        .returning(Order.id, Order.created_at)
+    )).one()
+
+    await db.execute(
+        insert(OrderItem),
+        [
+            {
+                "order_id": order_id,
+                "product_id": product_id,
+                "quantity": quantity,
+                "price_at_time": price
+            }
+            for product_id, quantity, price in lines
+        ]
+    )
+    return {"order_id": order_id, "total_amount": total_amount, "created_at": created_at}
@@ -0,0 +1,256 @@
+import asyncio
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple
+import structlog
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+from src.core.config import settings
+from src.core.database import SessionLocal
+from src.core.models import OrderItem, Product, StockReservation
+
+logger = structlog.get_logger()
+
+def validate_quantity(quantity) -> int:
+    """Vérifie qu'une quantité demandée est un entier strictement positif"""
+    if not isinstance(quantity, int) or isinstance(quantity, bool) or quantity <= 0:
+        raise ValueError("Quantity must be a positive integer")
+    return quantity
+
+def decrement_stock(db: Session, product_id: int, quantity: int) -> int:
+    """Décrément conditionnel en une requête : pas de lecture préalable, pas de survente"""
+    remaining = db.execute(
+        update(Product)
+        .where(Product.id == product_id, Product.stock_quantity >= quantity)
+        .values(stock_quantity=Product.stock_quantity - quantity)
+        .returning(Product.stock_quantity)
+        .execution_options(synchronize_session=False)
+    ).scalar_one_or_none()
+
+    if remaining is None:
+        exists = db.execute(select(Product.id).where(Product.id == product_id)).first()
+        raise ValueError(
+            f"Insufficient stock for product {product_id}" if exists
+            else f"Product {product_id} not found"
+        )
+    return remaining
+
+def hold_stock(
+    db: Session,
+    quantities: Dict[int, int],
+    order_id: Optional[int] = None,
+    ttl: Optional[int] = None
+) -> List[Dict]:
+    """Retire le stock et l'inscrit au registre pour RESERVATION_TTL secondes.
+
+    Les lignes sont mises à jour par identifiant croissant, pour que deux commandes
+    concurrentes ne puissent pas s'interbloquer. N'effectue pas le commit.
+    """
+    expires_at = datetime.utcnow() + timedelta(seconds=ttl or settings.RESERVATION_TTL)
+    holds = []
+    for product_id in sorted(quantities):
+        remaining = decrement_stock(db, product_id, quantities[product_id])
+        reservation = StockReservation(
+            product_id=product_id,
+            order_id=order_id,
+            quantity=quantities[product_id],
+            status="held",
+            expires_at=expires_at
+        )
+        db.add(reservation)
+        holds.append({"reservation": reservation, "remaining_stock": remaining})
+    db.flush()
+    return holds
+
+def convert_holds(
+    db: Session,
+    order_id: int,
+    reservation_ids: Iterable[int] = (),
+    released_products: Optional[Set[int]] = None
+) -> List[Tuple[int, int]]:
+    """Transforme en vente les réservations actives d'une commande.
+
+    Les `reservation_ids` fournis ne sont retenus que s'ils ne sont rattachés à
+    aucune commande (réservation de panier), portent sur un article de celle-ci et
+    dans la limite de sa quantité ; l'excédent est restitué au stock et le produit
+    ajouté à `released_products`. Retourne les lignes (product_id, quantity)
+    converties. N'effectue pas le commit.
+    """
+    converted = db.execute(
+        update(StockReservation)
+        .where(StockReservation.order_id == order_id, StockReservation.status == "held")
+        .values(status="converted")
+        .returning(StockReservation.product_id, StockReservation.quantity)
+        .execution_options(synchronize_session=False)
+    ).all()
+    reservation_ids = list(reservation_ids)
+    if not reservation_ids:
+        return [(product_id, quantity) for product_id, quantity in converted]
+
+    # Reste à couvrir par article, une fois les réservations de la commande converties
+    needed: Dict[int, int] = defaultdict(int)
+    for product_id, quantity in db.execute(
+        select(OrderItem.product_id, func.sum(OrderItem.quantity))
+        .where(OrderItem.order_id == order_id)
+        .group_by(OrderItem.product_id)
+    ):
+        needed[product_id] += quantity
+    for product_id, quantity in converted:
+        needed[product_id] -= quantity
+
+    candidates = db.execute(
+        select(StockReservation.id, StockReservation.product_id, StockReservation.quantity)
+        .where(
+            StockReservation.id.in_(reservation_ids),
+            StockReservation.order_id.is_(None),
+            StockReservation.status == "held",
+            StockReservation.product_id.in_([p for p, n in needed.items() if n > 0])
+        )
+        .order_by(StockReservation.id)
+    ).all()
+    for reservation_id, product_id, quantity in candidates:
+        taken = min(quantity, needed[product_id])
+        if taken <= 0:
+            continue
+        # Conditionnel : une réservation libérée ou prise entre-temps est ignorée
+        claimed = db.execute(
+            update(StockReservation)
+            .where(
+                StockReservation.id == reservation_id,
+                StockReservation.order_id.is_(None),
+                StockReservation.status == "held"
+            )
+            .values(status="converted", order_id=order_id, quantity=taken)
+            .returning(StockReservation.id)
+            .execution_options(synchronize_session=False)
+        ).first()
+        if claimed is None:
+            continue
+        if quantity > taken:
+            db.execute(
+                update(Product)
+                .where(Product.id == product_id)
+                .values(stock_quantity=Product.stock_quantity + quantity - taken)
+                .execution_options(synchronize_session=False)
+            )
+            if released_products is not None:
+                released_products.add(product_id)
+        needed[product_id] -= taken
+        converted.append((product_id, taken))
+    return [(product_id, quantity) for product_id, quantity in converted]
+
+def release_holds(db: Session, *conditions, released_products: Optional[Set[int]] = None) -> int:
+    """Libère les réservations actives correspondantes et restitue leur stock.
+
+    Le passage `held` → `released` est conditionnel : une réservation convertie
+    entre-temps par un paiement n'est jamais restituée. N'effectue pas le commit.
+    Les produits dont le stock change sont ajoutés à `released_products`.
+    """
+    released = db.execute(
+        update(StockReservation)
+        .where(StockReservation.status == "held", *conditions)
+        .values(status="released")
+        .returning(StockReservation.product_id, StockReservation.quantity)
+        .execution_options(synchronize_session=False)
+    ).all()
+
+    quantities: Dict[int, int] = defaultdict(int)
+    for product_id, quantity in released:
+        quantities[product_id] += quantity
+    for product_id in sorted(quantities):
+        db.execute(
+            update(Product)
+            .where(Product.id == product_id)
+            .values(stock_quantity=Product.stock_quantity + quantities[product_id])
+            .execution_options(synchronize_session=False)
+        )
+    if released_products is not None:
+        released_products.update(quantities)
+    return len(released)
+
+def release_expired(
+    db: Session,
+    batch_size: Optional[int] = None,
+    now: Optional[datetime] = None,
+    released_products: Optional[Set[int]] = None
+) -> int:
+    """Libère un lot de réservations expirées, en une transaction"""
+    batch_size = batch_size or settings.RESERVATION_SWEEP_BATCH
+    query = (
+        select(StockReservation.id)
+        .where(
+            StockReservation.status == "held",
+            StockReservation.expires_at <= (now or datetime.utcnow())
+        )
+        .order_by(StockReservation.expires_at)
+        .limit(batch_size)
+    )
+    # Plusieurs balayeurs (réplicas) se partagent les lots sans s'attendre
+    if db.get_bind().dialect.name == "postgresql":
+        query = query.with_for_update(skip_locked=True)
+
+    try:
+        ids = db.execute(query).scalars().all()
+        released = (
+            release_holds(db, StockReservation.id.in_(ids), released_products=released_products)
+            if ids else 0
+        )
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return released
+
+class ReservationSweeper:
+    """Tâche de fond qui restitue le stock des paniers abandonnés"""
+
+    def __init__(
+        self,
+        session_factory=SessionLocal,
+        interval: Optional[float] = None,
+        on_release: Optional[Callable[[Set[int]], Awaitable[None]]] = None
+    ):
+        self.session_factory = session_factory
+        self.interval = interval or settings.RESERVATION_SWEEP_INTERVAL
+        # Appelé avec les produits dont le stock a été restitué (invalidation des caches)
+        self.on_release = on_release
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def sweep(self, released_products: Optional[Set[int]] = None) -> int:
+        """Libère les réservations expirées, lot par lot, jusqu'à épuisement (bloquant)"""
+        total = 0
+        db = self.session_factory()
+        try:
+            while True:
+                released = release_expired(db, released_products=released_products)
+                total += released
+                if released < settings.RESERVATION_SWEEP_BATCH:
+                    return total
+        finally:
+            db.close()
+
+    async def _run(self):
+        while True:
+            try:
+                products: Set[int] = set()
+                released = await asyncio.to_thread(self.sweep, products)
+                if released:
+                    logger.info("reservations_released", count=released)
+                if products and self.on_release is not None:
+                    await self.on_release(products)
+            except Exception as e:
+                logger.error("reservation_sweep_error", error=str(e))
+            await asyncio.sleep(self.interval)
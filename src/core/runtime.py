@@ -0,0 +1,154 @@
+import os
+import socket
+import asyncio
+from typing import List, Optional, Set
+import structlog
+from src.core.config import settings
+from src.core.mcp import AsyncMCPBroker, MCPDelivery
+
+logger = structlog.get_logger()
+
+class AgentWorkerPool:
+    """Consomme les canaux d'un agent et traite les messages en parallèle.
+
+    Une boucle de consommation par canal alimente une file bornée : quand elle est
+    pleine, la lecture du bus est suspendue (backpressure). Le dispatcher lance le
+    traitement de chaque message sous un sémaphore qui borne la concurrence de l'agent.
+    """
+
+    def __init__(
+        self,
+        agent,
+        channels: List[str],
+        broker: AsyncMCPBroker,
+        concurrency: int,
+        queue_size: int
+    ):
+        self.agent = agent
+        self.name = agent.__class__.__name__
+        self.channels = channels
+        self.broker = broker
+        self.concurrency = concurrency
+        self.queue: "asyncio.Queue[MCPDelivery]" = asyncio.Queue(maxsize=queue_size)
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.consumer_name = f"{socket.gethostname()}-{os.getpid()}"
+        self._consumers: List[asyncio.Task] = []
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._in_flight: Set[asyncio.Task] = set()
+
+    async def start(self):
+        """Démarre les boucles de consommation et le dispatcher"""
+        self._consumers = [
+            asyncio.create_task(self._consume(channel), name=f"{self.name}:{channel}")
+            for channel in self.channels
+        ]
+        self._dispatcher = asyncio.create_task(self._dispatch(), name=f"{self.name}:dispatch")
+        logger.info(
+            "agent_workers_started",
+            agent=self.name,
+            channels=self.channels,
+            concurrency=self.concurrency
+        )
+
+    async def stop(self, timeout: float):
+        """Cesse de consommer, termine les messages déjà reçus puis s'arrête"""
+        for task in self._consumers:
+            task.cancel()
+        await asyncio.gather(*self._consumers, return_exceptions=True)
+
+        try:
+            await asyncio.wait_for(self.queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(
+                "agent_drain_timeout",
+                agent=self.name,
+                queued=self.queue.qsize(),
+                in_flight=len(self._in_flight)
+            )
+
+        tasks = list(self._in_flight)
+        if self._dispatcher:
+            tasks.append(self._dispatcher)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _consume(self, channel: str):
+        """Boucle de consommation d'un canal"""
+        while True:
+            try:
+                async for delivery in self.broker.consume(
+                    [channel],
+                    group=self.name,
+                    consumer=self.consumer_name
+                ):
+                    # Bloque quand la file est pleine : le bus n'est plus lu
+                    await self.queue.put(delivery)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("agent_consume_error", agent=self.name, channel=channel, error=str(e))
+                await asyncio.sleep(1)
+
+    async def _dispatch(self):
+        """Lance le traitement des messages dans la limite de concurrence"""
+        while True:
+            delivery = await self.queue.get()
+            await self.semaphore.acquire()
+            task = asyncio.create_task(self._handle(delivery))
+            self._in_flight.add(task)
+            task.add_done_callback(self._in_flight.discard)
+
+    async def _handle(self, delivery: MCPDelivery):
+        """Traite un message puis l'acquitte"""
+        try:
+            await self.agent.handle_request(delivery.message)
+            await delivery.ack()
+        except Exception as e:
+            # Non acquitté : le transport Streams le redistribuera
+            logger.error(
+                "agent_dispatch_error",
+                agent=self.name,
+                channel=delivery.channel,
+                error=str(e)
+            )
+        finally:
+            self.semaphore.release()
+            self.queue.task_done()
+
+class AgentRuntime:
+    """Exécute les pools de workers de tous les agents enregistrés"""
+
+    def __init__(self, broker: AsyncMCPBroker):
+        self.broker = broker
+        self.pools: List[AgentWorkerPool] = []
+
+    def register(
+        self,
+        agent,
+        channels: List[str],
+        concurrency: Optional[int] = None,
+        queue_size: Optional[int] = None
+    ) -> AgentWorkerPool:
+        """Enregistre un agent ; la concurrence par défaut vient de AGENT_CONCURRENCY"""
+        name = agent.__class__.__name__
+        pool = AgentWorkerPool(
+            agent,
+            channels,
+            self.broker,
+            concurrency=concurrency or settings.AGENT_CONCURRENCY.get(
+                name, settings.AGENT_DEFAULT_CONCURRENCY
+            ),
+            queue_size=queue_size or settings.AGENT_QUEUE_SIZE
+        )
+        self.pools.append(pool)
+        return pool
+
+    async def start(self):
+        for pool in self.pools:
+            await pool.start()
+
+    async def stop(self, timeout: Optional[float] = None):
+        """Arrêt gracieux : tous les agents drainent leur file en parallèle"""
+        timeout = timeout if timeout is not None else settings.AGENT_SHUTDOWN_TIMEOUT
+        await asyncio.gather(*(pool.stop(timeout) for pool in self.pools))
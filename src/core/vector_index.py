@@ -0,0 +1,180 @@
+import os
+import math
+import threading
+from pathlib import Path
+from typing import List, Optional, Tuple
+import numpy as np
+import faiss
+import structlog
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, object_session
+from src.core.config import settings
+from src.core.models import Product, load_embedding_matrix
+
+logger = structlog.get_logger()
+
+class ProductVectorIndex:
+    """Index FAISS des embeddings produits, pour la recherche de produits similaires.
+
+    Les vecteurs normalisés sont indexés par produit (produit scalaire = cosinus) :
+    recherche exacte (IndexFlatIP) pour un petit catalogue, IVF au-delà de
+    VECTOR_INDEX_IVF_MIN produits. L'index est persisté dans VECTOR_INDEX_PATH et
+    chargé en mémoire mappée au démarrage ; la première modification le recharge
+    en mémoire (copie sur écriture).
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = Path(path or settings.VECTOR_INDEX_PATH)
+        self.index: Optional[faiss.Index] = None
+        self.dirty = False
+        self._mapped = False
+        self._tracking = False
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return self.index.ntotal if self.index is not None else 0
+
+    def load_or_build(self, db: Session):
+        """Charge l'index persisté, ou le construit depuis la base s'il n'existe pas"""
+        if self.path.exists() and not settings.VECTOR_INDEX_REBUILD_ON_START:
+            self.load()
+        else:
+            self.build(db)
+            self.save()
+
+    def load(self):
+        flag = getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP)
+        with self._lock:
+            self.index = faiss.read_index(str(self.path), flag | faiss.IO_FLAG_READ_ONLY)
+            self._mapped = True
+            self.dirty = False
+            self._configure()
+        logger.info("vector_index_loaded", path=str(self.path), size=len(self))
+
+    def build(self, db: Session):
+        """Reconstruit l'index à partir des embeddings de tous les produits"""
+        ids, matrix = load_embedding_matrix(db)
+
+        with self._lock:
+            self.index = None
+            self._mapped = False
+            if len(ids):
+                matrix = self._normalize(matrix)
+                self.index = self._create_index(matrix)
+                self.index.add_with_ids(matrix, ids)
+                self._configure()
+            self.dirty = True
+        logger.info("vector_index_built", size=len(self))
+
+    def save(self):
+        """Écrit l'index de façon atomique, s'il a changé"""
+        with self._lock:
+            if not self.dirty or self.index is None:
+                return
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_name(f".{self.path.name}.tmp")
+            faiss.write_index(self.index, str(tmp_path))
+            os.replace(tmp_path, self.path)
+            self.dirty = False
+
+    def upsert(self, product_id: int, vector: Optional[np.ndarray]) -> bool:
+        """Ajoute ou remplace le vecteur d'un produit"""
+        if vector is None:
+            self.remove(product_id)
+            return False
+
+        matrix = self._normalize(vector.reshape(1, -1))
+        ids = np.asarray([product_id], dtype=np.int64)
+        with self._lock:
+            if self.index is None:
+                self.index = self._create_index(matrix)
+            self._make_writable()
+            self.index.remove_ids(ids)
+            self.index.add_with_ids(matrix, ids)
+            self.dirty = True
+        return True
+
+    def remove(self, product_id: int):
+        with self._lock:
+            if self.index is None:
+                return
+            self._make_writable()
+            if self.index.remove_ids(np.asarray([product_id], dtype=np.int64)):
+                self.dirty = True
+
+    def search(self, vector: Optional[np.ndarray], k: int) -> List[Tuple[int, float]]:
+        """Retourne les k produits les plus proches, avec leur similarité cosinus"""
+        if vector is None or self.index is None or k <= 0:
+            return []
+
+        query = self._normalize(vector.reshape(1, -1))
+        with self._lock:
+            scores, ids = self.index.search(query, min(k, self.index.ntotal))
+        return [
+            (int(product_id), float(score))
+            for product_id, score in zip(ids[0], scores[0])
+            if product_id != -1
+        ]
+
+    def _create_index(self, sample: np.ndarray) -> faiss.Index:
+        dim = sample.shape[1]
+        if len(sample) < settings.VECTOR_INDEX_IVF_MIN:
+            return faiss.IndexIDMap2(faiss.IndexFlatIP(dim))
+
+        nlist = int(4 * math.sqrt(len(sample)))
+        quantizer = faiss.IndexFlatIP(dim)
+        index = faiss.IndexIVFFlat(quantizer, dim, nlist, faiss.METRIC_INNER_PRODUCT)
+        index.train(sample)
+        return index
+
+    def _configure(self):
+        if self.index is not None and hasattr(self.index, "nprobe"):
+            self.index.nprobe = settings.VECTOR_INDEX_NPROBE
+
+    def _make_writable(self):
+        """Remplace l'index mappé (lecture seule) par une copie en mémoire"""
+        if self._mapped:
+            self.index = faiss.read_index(str(self.path))
+            self._mapped = False
+            self._configure()
+
+    @staticmethod
+    def _normalize(matrix: np.ndarray) -> np.ndarray:
+        # Copie : les embeddings relus par np.frombuffer sont en lecture seule
+        matrix = np.array(matrix, dtype=np.float32, order="C")
+        faiss.normalize_L2(matrix)
+        return matrix
+
+def track_product_changes(index: ProductVectorIndex):
+    """Répercute dans l'index les ajouts, modifications et suppressions de produits.
+
+    Les changements vus au flush sont notés dans la session et appliqués au commit ;
+    un rollback les abandonne, l'index ne reflète que des données validées.
+    """
+    if index._tracking:
+        return
+    index._tracking = True
+    key = ("vector_index_changes", id(index))
+
+    def _record(product: Product, vector: Optional[np.ndarray]):
+        # product_id -> vecteur à indexer, ou None pour le retirer
+        object_session(product).info.setdefault(key, {})[product.id] = vector
+
+    @event.listens_for(Product, "after_insert")
+    @event.listens_for(Product, "after_update")
+    def _on_product_saved(mapper, connection, product):
+        if inspect(product).attrs.embedding.history.has_changes():
+            _record(product, product.get_embedding())
+
+    @event.listens_for(Product, "after_delete")
+    def _on_product_deleted(mapper, connection, product):
+        _record(product, None)
+
+    @event.listens_for(Session, "after_commit")
+    def _on_commit(session):
+        for product_id, vector in session.info.pop(key, {}).items():
+            index.upsert(product_id, vector)
+
+    @event.listens_for(Session, "after_rollback")
+    def _on_rollback(session):
+        session.info.pop(key, None)
@@ -1,6 +1,8 @@
-from typing import Dict, Any, List
-from langgraph.graph import StateGraph, END
+import asyncio
+from collections import deque
+from typing import Callable, Dict, Any, List, Optional, Tuple, Union
 import structlog
+from src.core.config import settings
 from src.core.mcp import MCPMessage
 from src.agents.vision_agent import VisionAgent
 from src.agents.dialog_agent import DialogAgent
@@ -12,17 +14,61 @@ from src.agents.trend_analyzer_agent import TrendAnalyzerAgent
 
 logger = structlog.get_logger()
 
+class WorkflowState:
+    """État d'une exécution du workflow, propre à un message.
+
+    Créé pour chaque message et libéré à la fin de l'exécution ; l'historique des
+    étapes est borné à WORKFLOW_HISTORY_SIZE entrées.
+    """
+    __slots__ = (
+        "message",
+        "context",
+        "current_agent",
+        "results",
+        "errors",
+        "retry_count",
+        "history"
+    )
+
+    def __init__(self, message: MCPMessage, context: Optional[Dict[str, Any]] = None):
+        self.message = message
+        self.context = context or {}
+        self.current_agent: Optional[str] = None
+        self.results: Dict[str, MCPMessage] = {}
+        self.errors: List[MCPMessage] = []
+        self.retry_count: Dict[str, int] = {}
+        self.history = deque(maxlen=settings.WORKFLOW_HISTORY_SIZE)
+
+class FanOut:
+    """Étape parallèle : les agents des branches traitent leur requête simultanément.
+
+    `requests` construit, pour une branche, la requête adressée à son agent à partir
+    de l'état ; une branche sans constructeur reçoit le message d'origine. Les
+    résultats sont fusionnés dans l'état avant de passer à l'étape `then` ; une
+    branche qui dépasse son délai est enregistrée comme erreur sans bloquer les autres.
+    """
+    __slots__ = ("branches", "requests", "then", "timeout")
+
+    def __init__(
+        self,
+        branches: Tuple[str, ...],
+        requests: Optional[Dict[str, Callable[[WorkflowState], MCPMessage]]] = None,
+        then: Optional[str] = None,
+        timeout: Optional[float] = None
+    ):
+        self.branches = branches
+        self.requests = requests or {}
+        self.then = then
+        self.timeout = timeout
+
+Step = Union[str, FanOut, None]
+
 class WorkflowManager:
     def __init__(self):
-        self.workflow = StateGraph()
         self.agents = {}
-        self.state = {
-            "conversation_history": [],
-            "context": {},
-            "current_agent": None,
-            "results": {},
-            "errors": []
-        }
+        self.nodes = {}
+        self.node_agents = {}
+        self.entry_point = "DialogAgent"
         
     def setup_workflow(self):
         """Configure le workflow avec tous les agents"""
@@ -37,46 +83,105 @@ class WorkflowManager:
             "trend_analyzer": TrendAnalyzerAgent()
         }
         
-        # Définir les nœuds du workflow
-        for name, agent in self.agents.items():
-            self.workflow.add_node(name, self._create_agent_node(agent))
+        # Définir les nœuds du workflow, nommés d'après la classe de l'agent
+        for agent in self.agents.values():
+            self.add_node(agent)
             
-        # Configurer les transitions
-        self._setup_transitions()
+        return self
         
-        # Compiler le workflow
-        return self.workflow.compile()
+    def add_node(self, agent: Any):
+        """Ajoute un agent comme nœud du workflow"""
+        name = agent.__class__.__name__
+        self.nodes[name] = self._create_agent_node(agent)
+        self.node_agents[name] = agent
+        
+    async def run(self, message: MCPMessage, context: Optional[Dict[str, Any]] = None) -> WorkflowState:
+        """Exécute le workflow pour un message, avec un état qui lui est propre"""
+        state = WorkflowState(message, context)
+        node = self.entry_point
+        
+        for _ in range(settings.WORKFLOW_MAX_STEPS):
+            if node is None:
+                break
+            if isinstance(node, FanOut):
+                node = await self._run_fan_out(state, node)
+            else:
+                node = await self.nodes[node](state)
+        else:
+            logger.warning("workflow_max_steps_reached", last_agent=state.current_agent)
+            
+        return state
+        
+    async def _run_fan_out(self, state: WorkflowState, fan_out: FanOut) -> Step:
+        """Exécute les branches en parallèle et fusionne leurs résultats dans l'état"""
+        timeout = fan_out.timeout or settings.WORKFLOW_BRANCH_TIMEOUT
+        
+        async def run_branch(name: str) -> MCPMessage:
+            build_request = fan_out.requests.get(name)
+            try:
+                request = build_request(state) if build_request else state.message
+                return await asyncio.wait_for(
+                    self.node_agents[name].process(request),
+                    timeout
+                )
+            except asyncio.TimeoutError:
+                logger.warning("workflow_branch_timeout", agent=name, timeout=timeout)
+                return MCPMessage(
+                    message_type="error",
+                    content={"error": "timeout", "agent": name}
+                )
+            except Exception as e:
+                logger.error("workflow_branch_error", agent=name, error=str(e))
+                return MCPMessage(
+                    message_type="error",
+                    content={"error": str(e), "agent": name}
+                )
+                
+        # La latence de l'étape est celle de la branche la plus lente
+        responses = await asyncio.gather(*(run_branch(name) for name in fan_out.branches))
+        
+        for name, response in zip(fan_out.branches, responses):
+            state.results[name] = response
+            state.history.append((name, response.message_type))
+            if response.message_type == "error":
+                state.errors.append(response)
+                
+        return fan_out.then
         
     def _create_agent_node(self, agent: Any):
         """Crée un nœud de workflow pour un agent"""
-        async def node_function(state: Dict[str, Any]):
+        async def node_function(state: WorkflowState) -> Step:
             try:
                 # Mettre à jour le contexte
-                state["current_agent"] = agent.__class__.__name__
+                state.current_agent = agent.__class__.__name__
                 
                 # Traiter le message
-                response = await agent.process(state["message"])
+                response = await agent.process(state.message)
                 
                 # Stocker le résultat
-                state["results"][agent.__class__.__name__] = response
+                state.results[agent.__class__.__name__] = response
+                state.history.append((agent.__class__.__name__, response.message_type))
                 
                 # Déterminer le prochain agent
-                next_agent = self._determine_next_step(state, response)
-                return next_agent if next_agent else END
+                return self._determine_next_step(state, response)
                 
             except Exception as e:
-                # Gérer l'erreur
-                error_state = await agent.handle_error(e, state)
-                state["errors"].append(error_state)
-                
-                # Déterminer la récupération
+                # Seule couche de reprise : handle_error réessaie jusqu'à max_retries fois
+                response = await agent.handle_error(e, {"original_message": state.message})
+                state.results[agent.__class__.__name__] = response
+                state.history.append((agent.__class__.__name__, response.message_type))
+                if response.message_type != "error":
+                    return self._determine_next_step(state, response)
+                    
+                state.errors.append(response)
+                state.retry_count[agent.__class__.__name__] = response.metadata.get("retry_count", 0)
                 return self._handle_error_transition(state, agent.__class__.__name__)
                 
         return node_function
         
-    def _determine_next_step(self, state: Dict[str, Any], response: MCPMessage) -> str:
+    def _determine_next_step(self, state: WorkflowState, response: MCPMessage) -> Step:
         """Détermine le prochain agent basé sur l'état actuel et la réponse"""
-        current_agent = state["current_agent"]
+        current_agent = state.current_agent
         
         # Logique de transition basée sur l'agent actuel
         transitions = {
@@ -87,6 +192,15 @@ class WorkflowManager:
             "DialogAgent": {
                 "product_query": "InventoryAgent",
                 "purchase_intent": "TransactionAgent",
+                # Conseil, tendances et stock sont indépendants : interrogés en parallèle
+                "recommendation": FanOut(
+                    ("StyleAdvisorAgent", "TrendAnalyzerAgent", "InventoryAgent"),
+                    requests={
+                        "StyleAdvisorAgent": self._style_request,
+                        "TrendAnalyzerAgent": self._trends_request,
+                        "InventoryAgent": self._in_stock_request
+                    }
+                ),
                 "general": None  # Fin de la conversation
             },
             "InventoryAgent": {
@@ -104,6 +218,38 @@ class WorkflowManager:
         result_type = self._analyze_response(response)
         return transitions.get(current_agent, {}).get(result_type)
         
+    @staticmethod
+    def _customer_id(state: WorkflowState) -> Optional[int]:
+        return state.context.get("customer_id") or state.message.content.get("customer_id")
+        
+    @classmethod
+    def _style_request(cls, state: WorkflowState) -> MCPMessage:
+        """Conseil personnalisé pour le client de la conversation"""
+        return MCPMessage(
+            message_type="style_request",
+            content={
+                "customer_id": cls._customer_id(state),
+                "context": state.message.content.get("context", {})
+            }
+        )
+        
+    @staticmethod
+    def _trends_request(state: WorkflowState) -> MCPMessage:
+        return MCPMessage(message_type="trend_request", content={"action": "get_trends"})
+        
+    @staticmethod
+    def _in_stock_request(state: WorkflowState) -> MCPMessage:
+        """Produits en stock, restreints à la recherche extraite par le dialogue s'il y en a une"""
+        dialog = state.results.get("DialogAgent")
+        query = dialog.content.get("recommendation_request") if dialog is not None else None
+        return MCPMessage(
+            message_type="inventory_request",
+            content={
+                "action": "search_products",
+                "query": query if isinstance(query, str) else None
+            }
+        )
+        
     def _analyze_response(self, response: MCPMessage) -> str:
         """Analyse la réponse pour déterminer le type de résultat"""
         if response.message_type == "error":
@@ -112,6 +258,8 @@ class WorkflowManager:
         content = response.content
         if "purchase_intent" in content:
             return "purchase_intent"
+        elif "recommendation_request" in content:
+            return "recommendation"
         elif "product_query" in content:
             return "product_query"
         elif "availability" in content:
@@ -121,21 +269,8 @@ class WorkflowManager:
             
         return "general"
         
-    def _handle_error_transition(self, state: Dict[str, Any], failed_agent: str) -> str:
-        """Détermine la transition en cas d'erreur"""
-        # Vérifier le nombre de tentatives
-        retry_count = state.get("retry_count", {}).get(failed_agent, 0)
-        
-        if retry_count < 3:
-            # Mettre à jour le compteur de tentatives
-            if "retry_count" not in state:
-                state["retry_count"] = {}
-            state["retry_count"][failed_agent] = retry_count + 1
-            
-            # Réessayer avec le même agent
-            return failed_agent
-            
-        # Transition de fallback
+    def _handle_error_transition(self, state: WorkflowState, failed_agent: str) -> str:
+        """Détermine la transition quand les reprises de l'agent sont épuisées"""
         fallbacks = {
             "VisionAgent": "DialogAgent",
             "DialogAgent": "InventoryAgent",
@@ -144,19 +279,3 @@ class WorkflowManager:
         }
         
         return fallbacks.get(failed_agent, "DialogAgent")
-        
-    def _setup_transitions(self):
-        """Configure les transitions entre les agents"""
-        # Définir le point d'entrée (dialogue par défaut)
-        self.workflow.set_entry_point("dialog")
-        
-        # Ajouter les transitions conditionnelles
-        for agent_name in self.agents:
-            self.workflow.add_edge(agent_name, self._determine_next_step)
-            
-        # Ajouter des transitions de récupération d'erreur
-        for agent_name in self.agents:
-            self.workflow.add_edge(
-                f"{agent_name}_error",
-                lambda state, agent=agent_name: self._handle_error_transition(state, agent)
-            )
\ No newline at end of file
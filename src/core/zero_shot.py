@@ -0,0 +1,82 @@
+from typing import Any, Dict, List, Optional
+import numpy as np
+import structlog
+from src.core.config import settings
+
+logger = structlog.get_logger()
+
+class EmbeddingZeroShotClassifier:
+    """Classification zero-shot multi-attributs par similarité d'embeddings.
+
+    Les hypothèses de tous les attributs ("Ce foulard est {label}.") sont encodées
+    une seule fois au chargement dans une matrice normalisée. Un texte est ensuite
+    encodé une fois et comparé à toutes les hypothèses par un unique produit
+    matriciel ; un softmax par attribut reproduit les scores du pipeline NLI, et
+    le meilleur label n'est retenu qu'au-delà de `threshold`.
+    """
+
+    def __init__(
+        self,
+        candidates: Dict[str, List[str]],
+        hypothesis_template: str = "Ce foulard est {}.",
+        model_name: Optional[str] = None,
+        threshold: Optional[float] = None,
+        temperature: Optional[float] = None,
+        encoder: Any = None
+    ):
+        self.candidates = candidates
+        self.hypothesis_template = hypothesis_template
+        self.model_name = model_name or settings.VISION_FEATURE_MODEL
+        self.threshold = threshold if threshold is not None else settings.VISION_FEATURE_THRESHOLD
+        self.temperature = temperature or settings.VISION_FEATURE_TEMPERATURE
+        self.encoder = encoder
+        self.labels: List[str] = []
+        self.slices: Dict[str, slice] = {}
+        self.label_embeddings: Optional[np.ndarray] = None
+
+    def load(self):
+        """Charge l'encodeur et précalcule les embeddings des hypothèses (bloquant)"""
+        if self.encoder is None:
+            from sentence_transformers import SentenceTransformer
+            self.encoder = SentenceTransformer(self.model_name)
+
+        self.labels, self.slices = [], {}
+        for attribute, labels in self.candidates.items():
+            self.slices[attribute] = slice(len(self.labels), len(self.labels) + len(labels))
+            self.labels.extend(labels)
+
+        hypotheses = [self.hypothesis_template.format(label) for label in self.labels]
+        self.label_embeddings = self._encode(hypotheses)
+        logger.info("zero_shot_labels_loaded", model=self.model_name, labels=len(self.labels))
+
+    def classify(self, texts: List[str]) -> List[Dict[str, Optional[str]]]:
+        """Retourne, pour chaque texte, le label retenu par attribut (ou None)"""
+        if self.label_embeddings is None:
+            self.load()
+        if not texts:
+            return []
+
+        # (textes × hypothèses) en un seul produit matriciel
+        logits = self._encode(texts) @ self.label_embeddings.T / self.temperature
+
+        results: List[Dict[str, Optional[str]]] = [{} for _ in texts]
+        for attribute, columns in self.slices.items():
+            group = logits[:, columns]
+            probs = np.exp(group - group.max(axis=1, keepdims=True))
+            probs /= probs.sum(axis=1, keepdims=True)
+            best = probs.argmax(axis=1)
+            for row, index in enumerate(best):
+                label = None
+                if probs[row, index] > self.threshold:
+                    label = self.labels[columns.start + index]
+                results[row][attribute] = label
+        return results
+
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        embeddings = self.encoder.encode(
+            texts,
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+            show_progress_bar=False
+        )
+        return np.asarray(embeddings, dtype=np.float32)
@@ -1,16 +1,20 @@
 import os
+import asyncio
 import logging
 from fastapi import FastAPI, File, UploadFile, HTTPException, Depends
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.orm import Session
 from src.core.config import settings
-from src.core.database import get_db, init_db
-from src.core.mcp import MCPBroker
+from src.core.database import close_async_engine, get_db, init_db
+from src.core.mcp import MCPMessage, MCPResponseRouter, close_connection_pools, create_broker
 from src.agents.vision_agent import VisionAgent
 from src.agents.dialog_agent import DialogAgent
 from src.agents.inventory_agent import InventoryAgent
 from src.agents.transaction_agent import TransactionAgent
 from src.core.agent_base import AgentOrchestrator
+from src.core.model_registry import model_registry
+from src.core.ingestion import ImageTooLargeError, image_ingestor
+from src.core.reservations import ReservationSweeper
 
 # Configuration du logging
 logging.basicConfig(level=logging.INFO)
@@ -27,13 +31,25 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Métriques Prometheus
+if settings.ENABLE_METRICS:
+    from prometheus_client import make_asgi_app
+    app.mount("/metrics", make_asgi_app())
+
 # Initialisation des agents
 vision_agent = VisionAgent()
 dialog_agent = DialogAgent()
+mcp_broker = create_broker()
+response_router = MCPResponseRouter(mcp_broker)
 inventory_agent = InventoryAgent()
-transaction_agent = TransactionAgent()
+transaction_agent = TransactionAgent(response_router)
 orchestrator = AgentOrchestrator()
-mcp_broker = MCPBroker()
+reservation_sweeper = ReservationSweeper(
+    on_release=(
+        inventory_agent.availability_cache.invalidate
+        if inventory_agent.availability_cache is not None else None
+    )
+)
 
 @app.on_event("startup")
 async def startup_event():
@@ -41,7 +57,7 @@ async def startup_event():
     # Initialiser la base de données
     init_db()
     
-    # Initialiser les agents
+    # Initialiser les agents (les modèles sont chargés à la première utilisation)
     await vision_agent.initialize()
     await dialog_agent.initialize()
     await inventory_agent.initialize()
@@ -54,7 +70,31 @@ async def startup_event():
     orchestrator.register_agent(transaction_agent, ["transaction_requests"])
     
     # Démarrer l'orchestrateur
-    orchestrator.start()
+    await orchestrator.start()
+    
+    # Écouter les réponses des agents
+    await response_router.start()
+    
+    # Restituer le stock des réservations expirées
+    await reservation_sweeper.start()
+    
+    # Précharger en arrière-plan les modèles configurés, sans retarder le trafic
+    model_registry.start_warm_up(settings.MODEL_WARMUP)
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Libération des ressources à l'arrêt"""
+    await orchestrator.stop()
+    await reservation_sweeper.stop()
+    if inventory_agent.availability_cache is not None:
+        await inventory_agent.availability_cache.stop()
+    await model_registry.close()
+    await asyncio.to_thread(inventory_agent.similarity_index.save)
+    await response_router.stop()
+    await mcp_broker.close()
+    await image_ingestor.close()
+    await close_connection_pools()
+    await close_async_engine()
 
 @app.post("/webhook/whatsapp")
 async def whatsapp_webhook(request: dict, db: Session = Depends(get_db)):
@@ -85,23 +125,32 @@ async def whatsapp_webhook(request: dict, db: Session = Depends(get_db)):
             
         return {"status": "success", "response": response}
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error processing webhook: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 async def process_image_message(image_url: str, customer_id: str):
     """Traite un message contenant une image"""
-    # Publier un message pour l'agent de vision
-    message = {
-        "message_type": "vision_request",
-        "content": {"image_url": image_url},
-        "metadata": {"customer_id": customer_id}
-    }
-    mcp_broker.publish("vision_requests", message)
-    
-    # Attendre et retourner la réponse
-    # TODO: Implémenter un mécanisme d'attente asynchrone
-    return {"status": "processing"}
+    # Télécharger et décoder l'image une seule fois ; les agents du processus
+    # réutilisent l'image décodée
+    try:
+        image = await image_ingestor.ingest(image_url)
+    except ImageTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+        
+    # Publier un message pour l'agent de vision et attendre sa réponse
+    message = MCPMessage(
+        message_type="vision_request",
+        content={
+            "image_url": image_url,
+            "image_path": image.path,
+            "content_hash": image.content_hash
+        },
+        metadata={"customer_id": customer_id}
+    )
+    return await request_agent("vision_requests", message)
 
 async def process_voice_message(voice_url: str, customer_id: str):
     """Traite un message vocal"""
@@ -110,15 +159,29 @@ async def process_voice_message(voice_url: str, customer_id: str):
 
 async def process_text_message(text: str, customer_id: str):
     """Traite un message texte"""
-    message = {
-        "message_type": "dialog_request",
-        "content": {"text": text},
-        "metadata": {"customer_id": customer_id}
+    message = MCPMessage(
+        message_type="dialog_request",
+        content={"text": text},
+        metadata={"customer_id": customer_id}
+    )
+    return await request_agent("dialog_requests", message)
+
+async def request_agent(channel: str, message: MCPMessage):
+    """Envoie une requête à un agent et attend sa réponse dans le budget de latence"""
+    try:
+        response = await response_router.request(channel, message)
+    except asyncio.TimeoutError:
+        # La réponse arrivera après le délai : elle sera traitée comme tardive
+        return {
+            "status": "processing",
+            "correlation_id": message.metadata["correlation_id"]
+        }
+        
+    return {
+        "status": "completed",
+        "message_type": response.message_type,
+        "content": response.content
     }
-    mcp_broker.publish("dialog_requests", message)
-    
-    # TODO: Implémenter un mécanisme d'attente asynchrone
-    return {"status": "processing"}
 
 if __name__ == "__main__":
     import uvicorn
@@ -1,8 +1,10 @@
 import pytest
 from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.orm import sessionmaker
 from src.main import app
 from src.core.config import Settings
-from src.core.mcp import ModelContextProtocol
+from src.core.database import Base, create_pooled_async_engine, create_pooled_engine
 
 @pytest.fixture
 def test_client():
@@ -13,5 +15,15 @@ def settings():
     return Settings()
 
 @pytest.fixture
-def mcp():
-    return ModelContextProtocol()
+def session_factory(tmp_path):
+    """Base sqlite propre au test, schéma créé ; sessions synchrones"""
+    engine = create_pooled_engine(f"sqlite:///{tmp_path / 'shop.db'}", name="test")
+    Base.metadata.create_all(engine)
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+@pytest.fixture
+def async_session_factory(session_factory):
+    """Sessions asyncio sur la même base, configurées comme celles des agents"""
+    engine = create_pooled_async_engine(str(session_factory.kw["bind"].url), name="test")
+    return async_sessionmaker(engine, expire_on_commit=False)
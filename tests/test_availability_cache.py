@@ -0,0 +1,109 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, Mock
+from fakeredis import aioredis as fakeredis
+from src.core.availability_cache import AvailabilityCache
+from src.core.config import settings
+from src.core.mcp import MCPMessage
+
+@pytest.fixture
+def broker():
+    broker = Mock()
+    broker.broadcast = AsyncMock()
+    broker.subscribe = AsyncMock(return_value=AsyncMock())
+    return broker
+
+@pytest.fixture
+def cache(broker, monkeypatch):
+    monkeypatch.setattr(settings, "AVAILABILITY_CACHE_REDIS", False)
+    return AvailabilityCache(broker)
+
+@pytest.mark.asyncio
+async def test_read_through_and_local_invalidation(cache, broker):
+    assert await cache.get(1) is None
+    await cache.set(1, 0)
+    assert await cache.get(1) == 0
+
+    await cache.invalidate([1, 2, 1])
+    assert await cache.get(1) is None
+    channel, message = broker.broadcast.await_args.args
+    assert channel == settings.AVAILABILITY_INVALIDATION_CHANNEL
+    assert message.content == {"product_ids": [1, 2]}
+
+@pytest.mark.asyncio
+async def test_invalidations_from_other_replicas(cache, broker):
+    received = asyncio.Event()
+
+    async def listen(pubsub):
+        yield MCPMessage(message_type="availability_invalidation", content={"product_ids": [1]})
+        received.set()
+        await asyncio.Event().wait()
+
+    broker.listen = listen
+    await cache.set(1, 4)
+    await cache.set(2, 7)
+
+    await cache.start()
+    await asyncio.wait_for(received.wait(), 1)
+    assert await cache.get(1) is None
+    assert await cache.get(2) == 7
+    await cache.stop()
+
+@pytest.mark.asyncio
+async def test_unreachable_bus_does_not_fail_writes(cache, broker):
+    broker.broadcast.side_effect = ConnectionError("redis down")
+    await cache.set(1, 3)
+    await cache.invalidate([1])
+    assert await cache.get(1) is None
+
+@pytest.mark.asyncio
+async def test_listener_resubscribes_after_bus_failure(cache, broker):
+    received = asyncio.Event()
+    attempts = []
+
+    async def listen(pubsub):
+        attempts.append(pubsub)
+        if len(attempts) == 1:
+            raise ConnectionError("redis down")
+        yield MCPMessage(message_type="availability_invalidation", content={"product_ids": [1]})
+        received.set()
+        await asyncio.Event().wait()
+
+    broker.listen = listen
+    cache.reconnect_delay = 0
+    await cache.set(1, 4)
+
+    await cache.start()
+    await asyncio.wait_for(received.wait(), 1)
+    assert broker.subscribe.await_count == 2
+    attempts[0].aclose.assert_awaited_once()
+    assert await cache.get(1) is None
+    await cache.stop()
+
+@pytest.mark.asyncio
+async def test_fill_read_before_an_invalidation_is_dropped(cache):
+    generations = await cache.generations([1])
+    # Le stock change entre la lecture en base et le remplissage
+    await cache.invalidate([1])
+    await cache.set(1, 4, generations)
+    assert await cache.get(1) is None
+
+    await cache.set(1, 3, await cache.generations([1]))
+    assert await cache.get(1) == 3
+
+@pytest.mark.asyncio
+async def test_stale_fill_never_reaches_redis(broker):
+    redis_client = fakeredis.FakeRedis()
+    replicas = [AvailabilityCache(broker), AvailabilityCache(broker)]
+    for replica in replicas:
+        replica.redis_client = redis_client
+    reader, writer = replicas
+
+    generations = await reader.generations([1, 2])
+    # Invalidation par un autre réplica, dont le message n'est pas encore reçu ici
+    await writer.invalidate([1])
+    await reader.set_many({1: 4, 2: 7}, generations)
+
+    assert await redis_client.get(reader.key(1)) is None
+    assert int(await redis_client.get(reader.key(2))) == 7
+    assert await writer.get(1) is None
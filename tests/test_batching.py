@@ -0,0 +1,49 @@
+import asyncio
+import threading
+import pytest
+from src.core.batching import MicroBatcher
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_share_a_batch():
+    batches = []
+
+    def process_batch(items):
+        batches.append(list(items))
+        return [item * 2 for item in items]
+
+    batcher = MicroBatcher(process_batch, max_batch_size=4, max_wait_ms=20, name="test")
+    results = await asyncio.gather(*(batcher.submit(i) for i in range(6)))
+    await batcher.close()
+
+    assert results == [0, 2, 4, 6, 8, 10]
+    assert [len(batch) for batch in batches] == [4, 2]
+
+@pytest.mark.asyncio
+async def test_batch_runs_off_event_loop_thread():
+    threads = []
+
+    def process_batch(items):
+        threads.append(threading.current_thread())
+        return items
+
+    batcher = MicroBatcher(process_batch, max_batch_size=2, max_wait_ms=1, name="test")
+    await batcher.submit("image.jpg")
+    await batcher.close()
+
+    assert threads[0] is not threading.current_thread()
+
+@pytest.mark.asyncio
+async def test_item_error_only_fails_its_request():
+    def process_batch(items):
+        return [ValueError("cannot identify image") if item == "bad" else item for item in items]
+
+    batcher = MicroBatcher(process_batch, max_batch_size=4, max_wait_ms=20, name="test")
+    results = await asyncio.gather(
+        batcher.submit("good"),
+        batcher.submit("bad"),
+        return_exceptions=True
+    )
+    await batcher.close()
+
+    assert results[0] == "good"
+    assert isinstance(results[1], ValueError)
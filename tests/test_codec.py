@@ -0,0 +1,33 @@
+import json
+import pytest
+from src.core import codec
+
+@pytest.fixture
+def payload():
+    return {
+        "message_type": "vision_analysis",
+        "content": {"description": "foulard en soie rouge " * 400, "features": {"color": "rouge"}},
+        "metadata": {"customer_id": "123"},
+        "ttl": 3600
+    }
+
+@pytest.mark.parametrize("name", ["json", "msgpack"])
+def test_round_trip(payload, name):
+    data = codec.encode(payload, codec=name)
+    assert data[0] & codec.FRAME_FLAG
+    assert codec.decode(data) == payload
+
+def test_compression_above_threshold(payload):
+    plain = codec.encode(payload, compression="none")
+    compressed = codec.encode(payload, compression="zlib", threshold=1024)
+
+    assert len(compressed) < len(plain)
+    assert codec.decode(compressed) == payload
+
+def test_small_payload_left_uncompressed():
+    payload = {"message_type": "dialog_request", "content": {"text": "prix?"}}
+    data = codec.encode(payload, compression="zlib", threshold=4096)
+    assert (data[0] >> 2) & 0x03 == 0
+
+def test_legacy_json_payload_is_decoded(payload):
+    assert codec.decode(json.dumps(payload).encode()) == payload
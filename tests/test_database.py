@@ -0,0 +1,113 @@
+import pytest
+from prometheus_client import REGISTRY
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from src.core.database import (
+    ReplicaRouter,
+    create_pooled_async_engine,
+    create_pooled_engine,
+    session_scope,
+    to_async_url
+)
+from src.core.models import Product
+
+def _checked_out():
+    return REGISTRY.get_sample_value("db_pool_checked_out", {"engine": "test"})
+
+def test_unit_of_work_commits_or_rolls_back(session_factory):
+    with session_scope(session_factory) as db:
+        db.add(Product(id=1, name="Carré soie", stock_quantity=3))
+
+    with pytest.raises(RuntimeError):
+        with session_scope(session_factory) as db:
+            db.get(Product, 1).stock_quantity = 0
+            db.add(Product(id=2, name="Étole laine", stock_quantity=1))
+            raise RuntimeError("paiement refusé")
+
+    with session_scope(session_factory) as db:
+        assert [(p.id, p.stock_quantity) for p in db.query(Product)] == [(1, 3)]
+
+def test_connections_return_to_the_pool(session_factory):
+    with session_scope(session_factory) as db:
+        db.query(Product).all()
+        assert _checked_out() == 1
+    assert _checked_out() == 0
+
+def test_async_url_uses_asyncio_driver():
+    assert to_async_url("postgresql://scarf:s3cret@db:5432/scarf_db") == (
+        "postgresql+asyncpg://scarf:s3cret@db:5432/scarf_db"
+    )
+    assert to_async_url("sqlite:///./data/shop.db") == "sqlite+aiosqlite:///./data/shop.db"
+    with pytest.raises(ValueError):
+        to_async_url("mysql://db/scarf")
+
+@pytest.fixture
+def replica_router(session_factory, tmp_path):
+    primary = async_sessionmaker(create_pooled_async_engine(str(session_factory.kw["bind"].url)))
+    replica_url = f"sqlite:///{tmp_path / 'replica.db'}"
+    create_pooled_engine(replica_url, name="test").dispose()
+    replica = async_sessionmaker(create_pooled_async_engine(replica_url, name="replica"))
+    return ReplicaRouter(primary, replica, max_lag=5, check_interval=60)
+
+@pytest.mark.asyncio
+async def test_reads_go_to_replica_while_it_keeps_up(replica_router, monkeypatch):
+    assert await replica_router.session_factory() is replica_router.replica
+
+    # Le résultat de la vérification est réutilisé jusqu'à la suivante
+    async def lagging(db):
+        return 30.0
+    monkeypatch.setattr("src.core.database.replica_lag", lagging)
+    assert await replica_router.session_factory() is replica_router.replica
+
+    replica_router.check_interval = 0
+    assert await replica_router.session_factory() is replica_router.primary
+
+@pytest.mark.asyncio
+async def test_reads_fall_back_to_primary_when_replica_is_down(replica_router, tmp_path):
+    replica_router.replica = async_sessionmaker(
+        create_pooled_async_engine(f"sqlite:///{tmp_path / 'missing' / 'replica.db'}", name="replica")
+    )
+    assert await replica_router.session_factory() is replica_router.primary
+
+@pytest.mark.asyncio
+async def test_read_replayed_on_primary_when_replica_drops(replica_router):
+    targets = []
+
+    async def read(db):
+        targets.append("replica" if "replica" in str(db.bind.url) else "primary")
+        if targets[-1] == "replica":
+            raise OperationalError("SELECT 1", {}, ConnectionResetError("server closed the connection"))
+        return len(targets)
+
+    assert await replica_router.run(read) == 2
+    assert targets == ["replica", "primary"]
+    # Le réplica reste écarté jusqu'à la prochaine vérification
+    assert await replica_router.run(read) == 3
+
+    async def invalid(db):
+        raise ValueError("Order not found")
+    with pytest.raises(ValueError):
+        await replica_router.run(invalid)
+
+@pytest.mark.asyncio
+async def test_only_connection_errors_are_replayed(replica_router):
+    targets = []
+
+    async def locked(db):
+        targets.append("replica" if "replica" in str(db.bind.url) else "primary")
+        raise OperationalError("SELECT 1", {}, Exception("database is locked"))
+
+    # Erreur de la requête : rejouée sur le primaire, elle échouerait de même
+    with pytest.raises(OperationalError):
+        await replica_router.run(locked)
+    assert targets == ["replica"]
+
+    async def dropped(db):
+        targets.append("replica" if "replica" in str(db.bind.url) else "primary")
+        if targets[-1] == "replica":
+            raise OperationalError(
+                "SELECT 1", {}, Exception("terminating connection"), connection_invalidated=True
+            )
+        return targets[-1]
+
+    assert await replica_router.run(dropped) == "primary"
@@ -1,10 +1,13 @@
 import pytest
 from unittest.mock import Mock, patch
 from src.agents.dialog_agent import DialogAgent
+from src.core.model_registry import ModelRegistry
 
 @pytest.fixture
 def dialog_agent():
-    return DialogAgent()
+    agent = DialogAgent()
+    agent.model_registry = ModelRegistry(memory_budget_mb=0)
+    return agent
 
 @pytest.mark.asyncio
 async def test_dialog_agent_initialization(dialog_agent):
@@ -62,3 +65,48 @@ async def test_context_management(dialog_agent):
     result2 = await dialog_agent.process_message(msg2, conversation_id=conversation_id)
     
     assert result2["context"]["previous_filters"] == result1["filters"]
+
+@pytest.mark.asyncio
+async def test_history_store_used_for_prompt(dialog_agent):
+    from unittest.mock import AsyncMock
+    from src.core.mcp import MCPMessage
+
+    llm = Mock()
+    llm.apredict = AsyncMock(return_value="Oui, en soie et en laine.")
+    dialog_agent.model_registry.register("dialog_llm", lambda: llm)
+    await dialog_agent.history_store.append("123", {"role": "user", "content": "Bonjour"})
+
+    with patch.object(dialog_agent, "_prepare_prompt", return_value="prompt") as mock_prompt:
+        await dialog_agent.process(MCPMessage(
+            message_type="dialog_request",
+            content={"text": "Vous avez du rouge?"},
+            metadata={"customer_id": "123"}
+        ))
+
+    assert mock_prompt.call_args[0][1] == [{"role": "user", "content": "Bonjour"}]
+    history = await dialog_agent.history_store.get("123")
+    assert history[-1] == {"role": "assistant", "content": "Oui, en soie et en laine."}
+
+@pytest.mark.asyncio
+async def test_response_cache_bypassed_with_history(dialog_agent):
+    from unittest.mock import AsyncMock
+    from src.core.mcp import MCPMessage
+
+    llm = Mock()
+    llm.apredict = AsyncMock(return_value="Livraison en 48h.")
+    dialog_agent.model_registry.register("dialog_llm", lambda: llm)
+    dialog_agent.response_cache.redis_client = None
+    message = lambda customer_id: MCPMessage(
+        message_type="dialog_request",
+        content={"text": "livraison?"},
+        metadata={"customer_id": customer_id}
+    )
+
+    with patch.object(dialog_agent, "_prepare_prompt", return_value="Message du client : livraison?"):
+        await dialog_agent.process(message("A"))
+        await dialog_agent.process(message("B"))
+        assert llm.apredict.await_count == 1
+
+        # A a désormais un historique : le prompt lui est propre
+        await dialog_agent.process(message("A"))
+        assert llm.apredict.await_count == 2
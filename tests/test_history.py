@@ -0,0 +1,41 @@
+import pytest
+from src.core import history
+from src.core.cache import LRUCache
+from src.core.history import InMemoryHistoryStore
+
+@pytest.mark.asyncio
+async def test_history_bounded_per_customer(monkeypatch):
+    monkeypatch.setattr(history.settings, "HISTORY_MAX_MESSAGES", 4)
+    store = InMemoryHistoryStore()
+
+    for i in range(6):
+        await store.append("123", {"role": "user", "content": f"message {i}"})
+
+    messages = await store.get("123")
+    assert [m["content"] for m in messages] == [f"message {i}" for i in range(2, 6)]
+
+@pytest.mark.asyncio
+async def test_least_recent_customer_evicted(monkeypatch):
+    monkeypatch.setattr(history.settings, "HISTORY_MAX_CUSTOMERS", 2)
+    store = InMemoryHistoryStore()
+
+    await store.append("a", {"role": "user", "content": "bonjour"})
+    await store.append("b", {"role": "user", "content": "bonjour"})
+    await store.get("a")
+    await store.append("c", {"role": "user", "content": "bonjour"})
+
+    assert await store.get("b") == []
+    assert len(await store.get("a")) == 1
+
+def test_idle_entries_expire(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr("src.core.cache.time.monotonic", lambda: now[0])
+    cache = LRUCache(maxsize=10, ttl=60, refresh_on_get=True)
+
+    cache.set("a", 1)
+    now[0] += 50
+    assert cache.get("a") == 1
+    now[0] += 50
+    assert cache.get("a") == 1
+    now[0] += 61
+    assert cache.get("a") is None
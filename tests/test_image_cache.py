@@ -0,0 +1,63 @@
+import random
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from PIL import Image, ImageDraw
+from src.core.image_cache import ImageAnalysisCache
+from src.core.ingestion import ImageIngestor
+
+@pytest.fixture
+def scarf_photo(tmp_path):
+    rng = random.Random(7)
+    image = Image.new("RGB", (800, 600), "white")
+    draw = ImageDraw.Draw(image)
+    for _ in range(30):
+        box = [rng.randint(0, 700), rng.randint(0, 500), rng.randint(700, 800), rng.randint(500, 600)]
+        draw.ellipse(box, fill=(rng.randint(0, 255), rng.randint(0, 80), rng.randint(0, 80)))
+    path = tmp_path / "scarf.jpg"
+    image.save(path, quality=95)
+    return path
+
+@pytest.fixture
+def analysis():
+    return {"description": "a red striped silk scarf", "features": {"pattern": "rayé"}}
+
+def test_same_bytes_hit_from_disk_after_restart(tmp_path, scarf_photo, analysis):
+    cache = ImageAnalysisCache(root=str(tmp_path))
+    fingerprint = cache.fingerprint(ImageIngestor().load(str(scarf_photo)))
+    cache.set(fingerprint["content_hash"], analysis, fingerprint["perceptual_hash"])
+
+    restarted = ImageAnalysisCache(root=str(tmp_path))
+    assert restarted.get(fingerprint["content_hash"]) == analysis
+
+def test_recompressed_copy_matches_perceptually(tmp_path, scarf_photo, analysis):
+    cache = ImageAnalysisCache(root=str(tmp_path))
+    original = cache.fingerprint(ImageIngestor().load(str(scarf_photo)))
+    cache.set(original["content_hash"], analysis, original["perceptual_hash"])
+
+    copy_path = tmp_path / "forwarded.jpg"
+    Image.open(scarf_photo).resize((400, 300)).save(copy_path, quality=60)
+    copy = cache.fingerprint(ImageIngestor().load(str(copy_path)))
+
+    assert copy["content_hash"] != original["content_hash"]
+    assert cache.get(copy["content_hash"], copy["perceptual_hash"]) == analysis
+
+    restarted = ImageAnalysisCache(root=str(tmp_path))
+    assert restarted.get(copy["content_hash"], copy["perceptual_hash"]) == analysis
+
+def test_unknown_image_misses(tmp_path):
+    cache = ImageAnalysisCache(root=str(tmp_path))
+    assert cache.get("0" * 64, "ffffffffffffffff") is None
+
+def test_concurrent_workers_share_the_cache(tmp_path, analysis, monkeypatch):
+    from src.core.config import settings
+    monkeypatch.setattr(settings, "VISION_CACHE_MAX_ENTRIES", 8)
+    cache = ImageAnalysisCache(root=str(tmp_path))
+
+    def worker(n):
+        content_hash, perceptual_hash = f"{n:064x}", f"{n:016x}"
+        cache.set(content_hash, analysis, perceptual_hash)
+        return cache.get(content_hash, perceptual_hash)
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        assert list(pool.map(worker, range(200))) == [analysis] * 200
+    assert len(cache.memory) <= 8
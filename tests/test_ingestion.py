@@ -0,0 +1,40 @@
+import io
+import hashlib
+import httpx
+import pytest
+from PIL import Image
+from src.core.config import settings
+from src.core.ingestion import ImageIngestor, ImageTooLargeError
+
+def _jpeg(size=(3000, 2000)) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", size, (180, 20, 40)).save(buffer, format="JPEG", quality=90)
+    return buffer.getvalue()
+
+def _ingestor(tmp_path, body: bytes, headers=None) -> ImageIngestor:
+    transport = httpx.MockTransport(lambda request: httpx.Response(200, content=body, headers=headers))
+    return ImageIngestor(root=str(tmp_path), client=httpx.AsyncClient(transport=transport))
+
+@pytest.mark.asyncio
+async def test_download_is_content_addressed_and_decode_bounded(tmp_path):
+    body = _jpeg()
+    ingestor = _ingestor(tmp_path, body)
+
+    image = await ingestor.ingest("https://cdn.example.com/photo.jpg")
+
+    assert image.content_hash == hashlib.sha256(body).hexdigest()
+    assert open(image.path, "rb").read() == body
+    assert max(image.image.size) <= settings.MAX_IMAGE_SIZE
+    assert image.resized(224).size == (224, 224)
+    assert image.resized(224) is image.resized(224)
+    assert ingestor.load(image.path) is image
+
+@pytest.mark.asyncio
+async def test_oversized_download_aborted(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "MAX_IMAGE_BYTES", 1000)
+    ingestor = _ingestor(tmp_path, _jpeg())
+
+    with pytest.raises(ImageTooLargeError):
+        await ingestor.download("https://cdn.example.com/photo.jpg")
+
+    assert list((tmp_path / "images").iterdir()) == []
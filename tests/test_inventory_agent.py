@@ -1,6 +1,9 @@
 import pytest
-from unittest.mock import Mock, patch
+from unittest.mock import AsyncMock, Mock, patch
+from sqlalchemy import event, update
 from src.agents.inventory_agent import InventoryAgent
+from src.core.cache import LRUCache
+from src.core.models import Product
 
 @pytest.fixture
 def inventory_agent():
@@ -63,4 +66,114 @@ async def test_stock_alerts(inventory_agent):
         assert len(alerts) > 0
         assert all(item["quantity"] < test_threshold for item in alerts)
         
-        mock_check.assert_called_once_with(test_threshold)
\ No newline at end of file
+        mock_check.assert_called_once_with(test_threshold)
+
+@pytest.fixture
+def shop(session_factory):
+    with session_factory() as db:
+        db.add_all([
+            Product(id=1, name="Carré soie", stock_quantity=3),
+            Product(id=2, name="Étole laine", stock_quantity=1)
+        ])
+        db.commit()
+    return session_factory
+
+@pytest.fixture
+def stocked_agent(inventory_agent, shop, async_session_factory):
+    inventory_agent.session_factory = async_session_factory
+    return inventory_agent
+
+def _stock(shop, product_id):
+    with shop() as db:
+        return db.get(Product, product_id).stock_quantity
+
+@pytest.mark.asyncio
+async def test_reservation_is_conditional_update(stocked_agent, shop):
+    result = await stocked_agent._reserve_product({"product_id": 1, "quantity": 2})
+    assert result["remaining_stock"] == 1
+
+    with pytest.raises(ValueError, match="Insufficient stock"):
+        await stocked_agent._reserve_product({"product_id": 1, "quantity": 2})
+    with pytest.raises(ValueError, match="not found"):
+        await stocked_agent._reserve_product({"product_id": 99, "quantity": 1})
+    assert _stock(shop, 1) == 1
+
+@pytest.mark.asyncio
+async def test_batch_reservation_is_all_or_nothing(stocked_agent, shop):
+    with pytest.raises(ValueError, match="product 2"):
+        await stocked_agent._reserve_products({"items": [
+            {"product_id": 2, "quantity": 2},
+            {"product_id": 1, "quantity": 1}
+        ]})
+    assert (_stock(shop, 1), _stock(shop, 2)) == (3, 1)
+
+    result = await stocked_agent._reserve_products({"items": [
+        {"product_id": 2, "quantity": 1},
+        {"product_id": 1, "quantity": 1},
+        {"product_id": 1, "quantity": 1}
+    ]})
+    assert [item["product_id"] for item in result["reserved"]] == [1, 2]
+    assert (_stock(shop, 1), _stock(shop, 2)) == (1, 0)
+
+@pytest.mark.asyncio
+async def test_stock_update_deducts_active_holds(stocked_agent, shop):
+    stocked_agent.availability_cache = None
+    await stocked_agent._reserve_product({"product_id": 1, "quantity": 2})
+
+    result = await stocked_agent._update_stock({"product_id": 1, "quantity": 10})
+    assert result["available_quantity"] == 8
+    assert _stock(shop, 1) == 8
+
+    with pytest.raises(ValueError, match="held"):
+        await stocked_agent._update_stock({"product_id": 1, "quantity": 1})
+    with pytest.raises(ValueError, match="not found"):
+        await stocked_agent._update_stock({"product_id": 99, "quantity": 1})
+    assert _stock(shop, 1) == 8
+
+@pytest.mark.asyncio
+async def test_availability_is_cached_until_stock_changes(stocked_agent, shop):
+    cache = stocked_agent.availability_cache
+    cache.redis_client = None
+    cache.memory = LRUCache(maxsize=16, ttl=60)
+    cache.broker.broadcast = AsyncMock()
+
+    assert (await stocked_agent._check_availability({"product_id": 2}))["quantity"] == 1
+    # Écriture hors agent : le cache sert l'ancienne valeur jusqu'à invalidation ou TTL
+    with shop() as db:
+        db.execute(update(Product).where(Product.id == 2).values(stock_quantity=9))
+        db.commit()
+    assert (await stocked_agent._check_availability({"product_id": 2}))["quantity"] == 1
+
+    await stocked_agent._reserve_product({"product_id": 2, "quantity": 1})
+    result = await stocked_agent._check_availability({"product_id": 2})
+    assert result == {"product_id": 2, "available": True, "quantity": 8}
+
+@pytest.mark.asyncio
+async def test_bulk_check_is_one_query(stocked_agent):
+    statements = []
+    engine = stocked_agent.session_factory.kw["bind"].sync_engine
+    listener = lambda *args: statements.append(args[2])
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        stocked_agent.availability_cache = None
+        result = await stocked_agent._check_products({"product_ids": [2, 99, 1, 2]})
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+
+    assert len(statements) == 1
+    assert [p["product_id"] for p in result["products"]] == [2, 1]
+    assert result["products"][0]["quantity"] == 1
+    assert result["missing"] == [99]
+
+@pytest.mark.asyncio
+async def test_unset_stock_reads_as_unavailable(stocked_agent, shop):
+    stocked_agent.availability_cache = None
+    with shop() as db:
+        db.add(Product(id=3, name="Bandana coton", stock_quantity=None))
+        db.commit()
+
+    assert await stocked_agent._check_availability({"product_id": 3}) == {
+        "product_id": 3, "available": False, "quantity": 0
+    }
+    result = await stocked_agent._check_products({"product_ids": [3]})
+    assert (result["products"][0]["available"], result["products"][0]["quantity"]) == (False, 0)
@@ -0,0 +1,31 @@
+import pytest
+from unittest.mock import AsyncMock
+from src.core.llm_cache import LLMResponseCache
+
+@pytest.fixture
+def cache():
+    cache = LLMResponseCache("local:mistral-7b-instruct")
+    cache.redis_client = None
+    return cache
+
+def test_near_identical_prompts_share_a_key(cache):
+    assert cache.key("Prix ?") == cache.key("prix?")
+    assert cache.key("vous avez  du ROUGE ?") == cache.key("Vous avez du rouge?")
+    assert cache.key("prix?") != LLMResponseCache("openai:gpt-4").key("prix?")
+
+@pytest.mark.asyncio
+async def test_repeated_prompt_served_from_memory(cache):
+    assert await cache.get("Prix ?") is None
+    await cache.set("Prix ?", "Nos foulards sont à partir de 45€.")
+
+    assert await cache.get("prix?") == "Nos foulards sont à partir de 45€."
+    assert (cache.hits, cache.misses) == (1, 1)
+
+@pytest.mark.asyncio
+async def test_redis_tier_promotes_to_memory(cache):
+    cache.redis_client = AsyncMock()
+    cache.redis_client.get.return_value = b"Livraison en 48h."
+
+    assert await cache.get("livraison?") == "Livraison en 48h."
+    assert await cache.get("livraison?") == "Livraison en 48h."
+    cache.redis_client.get.assert_awaited_once()
@@ -0,0 +1,152 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock
+from fakeredis import aioredis as fakeredis
+from src.core.config import settings
+from src.core.mcp import MCPMessage, MCPResponseRouter, StreamsMCPBroker
+
+@pytest.fixture
+def broker():
+    return AsyncMock()
+
+@pytest.mark.asyncio
+async def test_request_resolved_by_correlated_reply(broker):
+    router = MCPResponseRouter(broker, channel="agent_responses:test")
+
+    async def publish(channel, message):
+        reply = MCPMessage(
+            message_type="dialog_response",
+            content={"response": "Bonjour"},
+            metadata={"correlation_id": message.metadata["correlation_id"]}
+        )
+        asyncio.get_running_loop().call_soon(router._dispatch, reply)
+
+    broker.publish.side_effect = publish
+
+    request = MCPMessage(message_type="dialog_request", content={"text": "prix?"})
+    response = await router.request("dialog_requests", request, timeout=1)
+
+    assert response.content == {"response": "Bonjour"}
+    assert request.metadata["reply_to"] == "agent_responses:test"
+    assert not router._pending
+
+@pytest.mark.asyncio
+async def test_timeout_then_late_reply(broker):
+    late_replies = []
+    router = MCPResponseRouter(
+        broker,
+        channel="agent_responses:test",
+        on_late_reply=late_replies.append
+    )
+
+    request = MCPMessage(message_type="vision_request", content={})
+    with pytest.raises(asyncio.TimeoutError):
+        await router.request("vision_requests", request, timeout=0.01)
+
+    correlation_id = request.metadata["correlation_id"]
+    router._dispatch(MCPMessage(
+        message_type="vision_analysis",
+        content={},
+        metadata={"correlation_id": correlation_id}
+    ))
+
+    assert len(late_replies) == 1
+    assert correlation_id not in router._expired
+
+@pytest.mark.asyncio
+async def test_reply_copies_correlation_id():
+    from src.core.mcp import AsyncMCPBroker
+
+    broker = AsyncMCPBroker.__new__(AsyncMCPBroker)
+    broker.redis_client = AsyncMock()
+    request = MCPMessage(
+        message_type="dialog_request",
+        content={},
+        metadata={"correlation_id": "abc", "reply_to": "agent_responses:1"}
+    )
+    response = MCPMessage(message_type="dialog_response", content={})
+
+    await broker.reply(request, response)
+
+    assert response.metadata["correlation_id"] == "abc"
+    broker.redis_client.publish.assert_awaited_once_with(
+        "agent_responses:1", response.encode()
+    )
+
+def test_create_broker_uses_configured_transport(monkeypatch):
+    from src.core import mcp
+    from src.core.config import MCPTransport
+
+    monkeypatch.setattr(mcp.settings, "MCP_TRANSPORT", MCPTransport.STREAMS)
+    assert isinstance(mcp.create_broker(), mcp.StreamsMCPBroker)
+
+    monkeypatch.setattr(mcp.settings, "MCP_TRANSPORT", MCPTransport.PUBSUB)
+    assert not isinstance(mcp.create_broker(), mcp.StreamsMCPBroker)
+
+def test_stream_entry_trimmed_before_claim_is_skipped():
+    from src.core.mcp import StreamsMCPBroker
+
+    broker = StreamsMCPBroker.__new__(StreamsMCPBroker)
+    message = MCPMessage(message_type="vision_request", content={"i": 1})
+
+    delivery = broker._to_delivery(
+        "vision_requests", "VisionAgent", b"1-0", {b"data": message.to_json().encode()}
+    )
+    assert delivery.entry_id == "1-0"
+    assert delivery.message.content == {"i": 1}
+    assert broker._to_delivery("vision_requests", "VisionAgent", b"2-0", None) is None
+
+@pytest.fixture
+def streams(monkeypatch):
+    monkeypatch.setattr(settings, "MCP_STREAM_BLOCK_MS", 10)
+    broker = StreamsMCPBroker.__new__(StreamsMCPBroker)
+    broker.redis_client = fakeredis.FakeRedis()
+    return broker
+
+async def _next(deliveries):
+    return await asyncio.wait_for(deliveries.__anext__(), 1)
+
+@pytest.mark.asyncio
+async def test_stream_delivery_acked_after_processing(streams):
+    await streams.publish("vision_requests", MCPMessage(message_type="vision_request", content={"i": 1}))
+    deliveries = streams.consume(["vision_requests"], "VisionAgent", "worker-1")
+
+    delivery = await _next(deliveries)
+    assert delivery.message.content == {"i": 1}
+    assert (await streams.redis_client.xpending("vision_requests", "VisionAgent"))["pending"] == 1
+
+    await delivery.ack()
+    assert (await streams.redis_client.xpending("vision_requests", "VisionAgent"))["pending"] == 0
+    await deliveries.aclose()
+
+@pytest.mark.asyncio
+async def test_unacked_entry_redelivered_to_another_worker(streams, monkeypatch):
+    monkeypatch.setattr(settings, "MCP_STREAM_CLAIM_IDLE_MS", 50)
+    await streams.publish("vision_requests", MCPMessage(message_type="vision_request", content={"i": 1}))
+
+    # Le worker 1 s'arrête sans acquitter
+    crashed = streams.consume(["vision_requests"], "VisionAgent", "worker-1")
+    lost = await _next(crashed)
+    await crashed.aclose()
+
+    await asyncio.sleep(0.06)
+    survivor = streams.consume(["vision_requests"], "VisionAgent", "worker-2")
+    delivery = await _next(survivor)
+    assert (delivery.entry_id, delivery.message.content) == (lost.entry_id, {"i": 1})
+
+    await delivery.ack()
+    assert (await streams.redis_client.xpending("vision_requests", "VisionAgent"))["pending"] == 0
+    await survivor.aclose()
+
+@pytest.mark.asyncio
+async def test_expired_entries_trimmed_on_publish(streams):
+    # MINID approximatif : Redis ne purge que des nœuds entiers du stream
+    await streams.redis_client.config_set("stream-node-max-entries", 4)
+    stale = MCPMessage(message_type="vision_request", content={"i": 0})
+    for entry_id in range(1, 5):
+        await streams.redis_client.xadd("vision_requests", {"data": stale.encode()}, id=f"{entry_id}-0")
+
+    await streams.publish("vision_requests", MCPMessage(message_type="vision_request", content={"i": 1}, ttl=60))
+
+    entries = await streams.redis_client.xrange("vision_requests")
+    assert [MCPMessage.decode(fields[b"data"]).content for _, fields in entries] == [{"i": 1}]
@@ -0,0 +1,68 @@
+import asyncio
+import pytest
+from unittest.mock import Mock
+from src.core.model_registry import ModelRegistry
+
+MB = 1024 * 1024
+
+class FakeModel:
+    def __init__(self, size_mb):
+        self.size_mb = size_mb
+
+def make_registry(budget_mb, **sizes):
+    registry = ModelRegistry(memory_budget_mb=budget_mb)
+    loaders = {}
+    for name, size_mb in sizes.items():
+        loaders[name] = Mock(side_effect=lambda size_mb=size_mb: FakeModel(size_mb))
+        registry.register(name, loaders[name], estimated_mb=size_mb)
+    return registry, loaders
+
+@pytest.mark.asyncio
+async def test_models_load_lazily_once():
+    registry, loaders = make_registry(0, blip2=100)
+    loaders["blip2"].assert_not_called()
+
+    async def use():
+        async with registry.use("blip2") as model:
+            return model
+
+    first, second = await asyncio.gather(use(), use())
+    assert first is second
+    loaders["blip2"].assert_called_once()
+
+@pytest.mark.asyncio
+async def test_least_recently_used_model_unloaded_under_budget():
+    registry, loaders = make_registry(250, blip2=100, dialog_llm=100, features=100)
+    unloader = Mock()
+    registry.register("blip2", loaders["blip2"], unloader, estimated_mb=100)
+
+    async with registry.use("blip2"):
+        pass
+    async with registry.use("dialog_llm"):
+        pass
+    async with registry.use("features"):
+        pass
+
+    loaded = {stat["model"] for stat in registry.stats() if stat["loaded"]}
+    assert loaded == {"dialog_llm", "features"}
+    unloader.assert_called_once()
+    assert registry.resident_bytes() <= 250 * MB
+
+@pytest.mark.asyncio
+async def test_models_in_use_are_not_unloaded():
+    registry, _ = make_registry(150, blip2=100, dialog_llm=100)
+
+    async with registry.use("blip2") as blip2:
+        async with registry.use("dialog_llm"):
+            assert registry.get_loaded("blip2") is blip2
+
+@pytest.mark.asyncio
+async def test_warm_up_runs_in_background():
+    registry, loaders = make_registry(0, blip2=100)
+    registry.start_warm_up(["blip2", "unknown"])
+    await registry._warm_up_task
+    loaders["blip2"].assert_called_once()
+
+    await registry.close()
+    with pytest.raises(RuntimeError):
+        registry.get_loaded("blip2")
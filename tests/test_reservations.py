@@ -0,0 +1,127 @@
+import pytest
+from datetime import datetime, timedelta
+from src.agents.transaction_agent import TransactionAgent
+from src.core.config import settings
+from src.core.models import Order, OrderItem, Product, StockReservation
+from src.core.reservations import ReservationSweeper, convert_holds, hold_stock, release_expired
+
+LATER = datetime.utcnow() + timedelta(days=1)
+
+@pytest.fixture
+def db(session_factory):
+    db = session_factory()
+    db.add_all([
+        Product(id=1, name="Carré soie", stock_quantity=5),
+        Product(id=2, name="Étole laine", stock_quantity=5),
+        Order(id=10, status="pending"),
+        Order(id=11, status="pending")
+    ])
+    db.commit()
+    yield db
+    db.close()
+
+@pytest.fixture
+def transaction_agent(async_session_factory):
+    agent = TransactionAgent()
+    agent.session_factory = async_session_factory
+    return agent
+
+def _stock(db, product_id):
+    return db.get(Product, product_id, populate_existing=True).stock_quantity
+
+def test_expired_holds_are_released_in_batches(db):
+    for order_id in (10, 11):
+        hold_stock(db, {1: 2, 2: 1}, order_id=order_id)
+    db.commit()
+    assert (_stock(db, 1), _stock(db, 2)) == (1, 3)
+
+    # Non expirées : rien à libérer
+    assert release_expired(db, batch_size=3) == 0
+
+    assert release_expired(db, batch_size=3, now=LATER) == 3
+    assert release_expired(db, batch_size=3, now=LATER) == 1
+    assert (_stock(db, 1), _stock(db, 2)) == (5, 5)
+    statuses = {reservation.status for reservation in db.query(StockReservation)}
+    assert statuses == {"released"}
+
+def test_converted_holds_are_never_released(db):
+    hold_stock(db, {1: 2}, order_id=10)
+    hold_stock(db, {1: 1}, order_id=11)
+    db.commit()
+
+    assert convert_holds(db, 10) == [(1, 2)]
+    db.commit()
+    assert release_expired(db, now=LATER) == 1
+    assert _stock(db, 1) == 3
+
+def test_sweeper_drains_all_batches(session_factory, db, monkeypatch):
+    monkeypatch.setattr(settings, "RESERVATION_SWEEP_BATCH", 2)
+    for _ in range(5):
+        hold_stock(db, {2: 1}, ttl=1)
+    db.query(StockReservation).update({"expires_at": datetime.utcnow() - timedelta(seconds=1)})
+    db.commit()
+
+    assert ReservationSweeper(session_factory).sweep() == 5
+    assert _stock(db, 2) == 5
+
+@pytest.mark.asyncio
+async def test_payment_converts_or_retakes_stock(transaction_agent, db):
+    db.add(OrderItem(order_id=11, product_id=2, quantity=2, price_at_time=45.0))
+    hold_stock(db, {1: 1}, order_id=10)
+    db.commit()
+
+    await transaction_agent._process_payment({"order_id": 10, "payment_method": "card"})
+    assert release_expired(db, now=LATER) == 0
+    assert _stock(db, 1) == 4
+
+    # Commande 11 sans réservation active : le stock est pris au paiement
+    await transaction_agent._process_payment({"order_id": 11, "payment_method": "card"})
+    assert _stock(db, 2) == 3
+
+    # Paiement redélivré : rien n'est repris une seconde fois
+    await transaction_agent._process_payment({"order_id": 11, "payment_method": "card"})
+    assert _stock(db, 2) == 3
+
+def test_foreign_reservation_ids_are_ignored(db):
+    db.add(OrderItem(order_id=10, product_id=2, quantity=1, price_at_time=45.0))
+    foreign = hold_stock(db, {1: 2}, order_id=11)[0]["reservation"].id
+    cart = hold_stock(db, {2: 1})[0]["reservation"].id
+    db.commit()
+
+    assert convert_holds(db, 10, [foreign, cart]) == [(2, 1)]
+    db.commit()
+    statuses = {(r.id, r.order_id, r.status) for r in db.query(StockReservation)}
+    assert statuses == {(foreign, 11, "held"), (cart, 10, "converted")}
+
+def test_cart_holds_are_capped_at_the_order_lines(db):
+    db.add(OrderItem(order_id=10, product_id=2, quantity=1, price_at_time=45.0))
+    oversized = hold_stock(db, {2: 3})[0]["reservation"].id
+    off_order = hold_stock(db, {1: 2})[0]["reservation"].id
+    db.commit()
+    assert (_stock(db, 1), _stock(db, 2)) == (3, 2)
+
+    released = set()
+    assert convert_holds(db, 10, [oversized, off_order], released_products=released) == [(2, 1)]
+    db.commit()
+    # L'excédent de la réservation est restitué ; celle hors commande reste au panier
+    assert (_stock(db, 1), _stock(db, 2)) == (3, 4)
+    assert released == {2}
+    rows = {r.id: (r.order_id, r.quantity, r.status) for r in db.query(StockReservation)}
+    assert rows == {oversized: (10, 1, "converted"), off_order: (None, 2, "held")}
+
+@pytest.mark.asyncio
+async def test_payment_retakes_only_the_expired_share(transaction_agent, db):
+    db.add_all([
+        OrderItem(order_id=10, product_id=1, quantity=2, price_at_time=80.0),
+        OrderItem(order_id=10, product_id=2, quantity=1, price_at_time=45.0)
+    ])
+    hold_stock(db, {1: 2}, order_id=10)
+    hold_stock(db, {2: 1}, order_id=10, ttl=1)
+    db.query(StockReservation).filter(StockReservation.product_id == 2).update(
+        {"expires_at": datetime.utcnow() - timedelta(seconds=1)}
+    )
+    db.commit()
+    assert release_expired(db) == 1
+
+    await transaction_agent._process_payment({"order_id": 10, "payment_method": "card"})
+    assert (_stock(db, 1), _stock(db, 2)) == (3, 4)
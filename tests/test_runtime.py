@@ -0,0 +1,75 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock
+from src.core.mcp import MCPDelivery, MCPMessage
+from src.core.runtime import AgentRuntime
+
+class FakeBroker:
+    def __init__(self, messages):
+        self.messages = messages
+
+    async def consume(self, channels, group, consumer):
+        for message in self.messages:
+            yield MCPDelivery(channel=channels[0], message=message, ack=AsyncMock())
+        await asyncio.Event().wait()
+
+class SlowAgent:
+    def __init__(self, delay=0.01):
+        self.delay = delay
+        self.active = 0
+        self.max_active = 0
+        self.handled = 0
+
+    async def handle_request(self, message):
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        await asyncio.sleep(self.delay)
+        self.active -= 1
+        self.handled += 1
+
+def _messages(count):
+    return [MCPMessage(message_type="inventory_request", content={"i": i}) for i in range(count)]
+
+@pytest.mark.asyncio
+async def test_concurrency_bounded_by_agent_setting():
+    agent = SlowAgent()
+    runtime = AgentRuntime(FakeBroker(_messages(20)))
+    runtime.register(agent, ["inventory_requests"], concurrency=3, queue_size=5)
+
+    await runtime.start()
+    await asyncio.sleep(0.2)
+    await runtime.stop(timeout=5)
+
+    assert agent.handled == 20
+    assert agent.max_active == 3
+
+@pytest.mark.asyncio
+async def test_queued_messages_drained_on_stop():
+    agent = SlowAgent(delay=0.02)
+    runtime = AgentRuntime(FakeBroker(_messages(5)))
+    runtime.register(agent, ["vision_requests"], concurrency=1, queue_size=10)
+
+    await runtime.start()
+    await asyncio.sleep(0)
+    await asyncio.sleep(0)
+    await runtime.stop(timeout=5)
+
+    assert agent.handled == 5
+
+@pytest.mark.asyncio
+async def test_failed_message_is_not_acked():
+    delivery = MCPDelivery(
+        channel="vision_requests",
+        message=MCPMessage(message_type="vision_request", content={}),
+        ack=AsyncMock()
+    )
+    agent = AsyncMock()
+    agent.handle_request.side_effect = RuntimeError("redis down")
+
+    runtime = AgentRuntime(FakeBroker([]))
+    pool = runtime.register(agent, ["vision_requests"], concurrency=1)
+    await pool.queue.put(delivery)
+    await pool.semaphore.acquire()
+    await pool._handle(await pool.queue.get())
+
+    delivery._ack.assert_not_awaited()
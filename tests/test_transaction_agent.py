@@ -1,6 +1,9 @@
 import pytest
-from unittest.mock import Mock, patch
+from unittest.mock import AsyncMock, Mock, patch
+from sqlalchemy import event, select
 from src.agents.transaction_agent import TransactionAgent
+from src.core.mcp import MCPMessage
+from src.core.models import Order, OrderItem
 
 @pytest.fixture
 def transaction_agent():
@@ -94,4 +97,87 @@ async def test_payment_processing(transaction_agent):
         
         result = await transaction_agent.process_payment(test_payment)
         assert result["success"] is False
-        assert "error" in result
\ No newline at end of file
+        assert "error" in result
+
+@pytest.fixture
+def catalogue_agent(async_session_factory):
+    router = Mock()
+    router.request = AsyncMock(return_value=MCPMessage(
+        message_type="inventory_response",
+        content={
+            "products": [
+                {"product_id": 1, "name": "Carré soie", "price": 80.0, "available": True, "quantity": 3},
+                {"product_id": 2, "name": "Étole laine", "price": 45.0, "available": True, "quantity": 1}
+            ],
+            "missing": []
+        }
+    ))
+    agent = TransactionAgent(router)
+    agent.session_factory = async_session_factory
+    return agent
+
+@pytest.mark.asyncio
+async def test_order_priced_in_one_inventory_round_trip(catalogue_agent):
+    result = await catalogue_agent._create_order({
+        "customer_id": 7,
+        "items": [
+            {"product_id": 1, "quantity": 2, "price": 1.0},
+            {"product_id": 2, "quantity": 1}
+        ]
+    })
+
+    catalogue_agent.response_router.request.assert_awaited_once()
+    channel, message = catalogue_agent.response_router.request.await_args.args
+    assert channel == "inventory_requests"
+    assert message.content == {"action": "check_products", "product_ids": [1, 2]}
+    assert result["total_amount"] == 205.0
+
+@pytest.mark.asyncio
+async def test_order_rejected_when_cart_exceeds_stock(catalogue_agent):
+    with pytest.raises(ValueError, match="product 2"):
+        await catalogue_agent._create_order({
+            "customer_id": 7,
+            "items": [{"product_id": 2, "quantity": 1}, {"product_id": 2, "quantity": 1}]
+        })
+
+@pytest.mark.asyncio
+async def test_failed_order_does_not_poison_later_ones(catalogue_agent):
+    catalogue_agent.response_router.request.return_value.content["products"][1]["price"] = None
+    with pytest.raises(ValueError, match="No price"):
+        await catalogue_agent._create_order({
+            "customer_id": 7,
+            "items": [{"product_id": 2, "quantity": 1, "price": 45.0}]
+        })
+    for quantity in (0, -1, 1.5, "2", None):
+        with pytest.raises(ValueError, match="positive integer"):
+            await catalogue_agent._create_order({
+                "customer_id": 7,
+                "items": [{"product_id": 1, "quantity": quantity}]
+            })
+
+    result = await catalogue_agent._create_order({"customer_id": 7, "items": [{"product_id": 1, "quantity": 1}]})
+    async with catalogue_agent.session_factory() as db:
+        assert (await db.execute(select(Order.id))).scalars().all() == [result["order_id"]]
+
+@pytest.mark.asyncio
+async def test_order_and_items_inserted_in_two_statements(catalogue_agent):
+    statements = []
+    engine = catalogue_agent.session_factory.kw["bind"].sync_engine
+    listener = lambda *args: statements.append(args[2].split()[0])
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        result = await catalogue_agent._create_order({
+            "customer_id": 7,
+            "items": [{"product_id": 1, "quantity": 1}] * 3 + [{"product_id": 2, "quantity": 1}]
+        })
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+
+    assert statements == ["INSERT", "INSERT"]
+    assert result["total_amount"] == 285.0
+    async with catalogue_agent.session_factory() as db:
+        rows = (await db.execute(
+            select(OrderItem.product_id, OrderItem.price_at_time)
+            .where(OrderItem.order_id == result["order_id"])
+        )).all()
+    assert sorted(rows) == [(1, 80.0)] * 3 + [(2, 45.0)]
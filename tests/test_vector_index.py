@@ -0,0 +1,92 @@
+import numpy as np
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from src.core.database import Base
+from src.core.models import Product, load_embedding_matrix, unpack_embedding
+from src.core.vector_index import ProductVectorIndex, track_product_changes
+
+def _embedding(seed: int, dim: int = 32) -> np.ndarray:
+    return np.random.default_rng(seed).normal(size=dim).astype(np.float32)
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    for product_id in range(1, 51):
+        product = Product(id=product_id, name=f"Foulard {product_id}", stock_quantity=1)
+        product.set_embedding(_embedding(product_id))
+        session.add(product)
+    session.add(Product(id=51, name="Sans embedding", stock_quantity=1))
+    session.commit()
+    yield session
+    session.close()
+
+def test_embeddings_stored_as_bytes_and_read_without_copy(db):
+    product = db.get(Product, 3)
+    assert isinstance(product.embedding, bytes)
+    assert (product.embedding_dim, product.embedding_dtype) == (32, "float32")
+
+    vector = product.get_embedding()
+    assert not vector.flags.writeable
+    np.testing.assert_array_equal(vector, _embedding(3))
+
+    packed = np.asarray(_embedding(3), dtype="<f2").tobytes()
+    assert unpack_embedding(packed, 32, "float16").dtype == np.float16
+    with pytest.raises(ValueError):
+        unpack_embedding(packed, 64, "float16")
+
+def test_catalogue_loaded_in_one_scan(db):
+    ids, matrix = load_embedding_matrix(db, batch_size=16)
+    assert ids.tolist() == list(range(1, 51))
+    assert matrix.shape == (50, 32)
+    np.testing.assert_array_equal(matrix[6], _embedding(7))
+
+def test_build_and_search(tmp_path, db):
+    index = ProductVectorIndex(str(tmp_path / "products.faiss"))
+    index.build(db)
+
+    assert len(index) == 50
+    results = index.search(_embedding(7), 3)
+    assert results[0][0] == 7
+    assert results[0][1] == pytest.approx(1.0, abs=1e-4)
+
+def test_persisted_index_is_mapped_then_copied_on_write(tmp_path, db):
+    path = str(tmp_path / "products.faiss")
+    ProductVectorIndex(path).load_or_build(db)
+
+    reloaded = ProductVectorIndex(path)
+    reloaded.load_or_build(db)
+    assert reloaded._mapped
+    assert reloaded.search(_embedding(12), 1)[0][0] == 12
+
+    # Modification : le produit 12 prend l'embedding du 99, le 13 est supprimé
+    reloaded.upsert(12, _embedding(99))
+    reloaded.remove(13)
+    assert not reloaded._mapped
+    assert reloaded.search(_embedding(99), 1)[0][0] == 12
+    assert 13 not in [product_id for product_id, _ in reloaded.search(_embedding(13), 50)]
+
+    reloaded.save()
+    persisted = ProductVectorIndex(path)
+    persisted.load()
+    assert len(persisted) == 49
+
+def test_index_follows_committed_changes_only(tmp_path, db):
+    index = ProductVectorIndex(str(tmp_path / "products.faiss"))
+    index.build(db)
+    track_product_changes(index)
+
+    db.get(Product, 12).set_embedding(_embedding(99))
+    db.delete(db.get(Product, 13))
+    db.flush()
+    assert index.search(_embedding(99), 1)[0][0] != 12
+    db.rollback()
+    assert len(index) == 50
+
+    db.get(Product, 12).set_embedding(_embedding(99))
+    db.delete(db.get(Product, 13))
+    db.commit()
+    assert index.search(_embedding(99), 1)[0][0] == 12
+    assert len(index) == 49
@@ -1,5 +1,5 @@
 import pytest
-from unittest.mock import Mock, patch
+from unittest.mock import AsyncMock, Mock, patch
 from src.agents.vision_agent import VisionAgent
 
 def test_vision_agent_initialization():
@@ -40,3 +40,48 @@ async def test_error_handling():
         
     with pytest.raises(Exception):
         await agent.process_image("invalid_url")
+
+def test_cpu_int8_mode_quantizes_linear_layers():
+    from src.core.config import VisionInferenceMode
+
+    agent = VisionAgent()
+    agent.inference_mode = VisionInferenceMode.CPU_INT8
+
+    with patch('src.agents.vision_agent.AutoProcessor'), \
+         patch('src.agents.vision_agent.AutoModelForVision2Seq') as mock_model, \
+         patch('src.agents.vision_agent.torch') as mock_torch:
+        processor, model = agent._load_blip2()
+
+    assert mock_model.from_pretrained.call_args.kwargs["torch_dtype"] is mock_torch.float32
+    mock_torch.quantization.quantize_dynamic.assert_called_once()
+    assert model is mock_torch.quantization.quantize_dynamic.return_value
+
+def test_auto_mode_falls_back_to_cpu():
+    from src.agents.vision_agent import resolve_inference_mode
+    from src.core.config import VisionInferenceMode
+
+    with patch('src.agents.vision_agent.torch') as mock_torch:
+        mock_torch.cuda.is_available.return_value = False
+        assert resolve_inference_mode(VisionInferenceMode.AUTO) == VisionInferenceMode.CPU_FP32
+        assert resolve_inference_mode(VisionInferenceMode.CPU_INT8) == VisionInferenceMode.CPU_INT8
+
+@pytest.mark.asyncio
+async def test_missing_file_is_reingested_from_url(tmp_path):
+    agent = VisionAgent()
+    content = {
+        "image_url": "https://cdn.example.com/scarf.jpg",
+        "image_path": str(tmp_path / "purged.jpg"),
+        "content_hash": "ab" * 32
+    }
+
+    with patch('src.agents.vision_agent.image_ingestor') as mock_ingestor:
+        mock_ingestor.load.side_effect = FileNotFoundError(content["image_path"])
+        mock_ingestor.ingest = AsyncMock(return_value=Mock(path="images/ab/abab"))
+        image = await agent._load_image(content)
+
+        assert image is mock_ingestor.ingest.return_value
+        mock_ingestor.ingest.assert_awaited_once_with(content["image_url"])
+
+        # Sans URL, l'erreur de lecture est remontée
+        with pytest.raises(FileNotFoundError):
+            await agent._load_image({"image_path": content["image_path"]})
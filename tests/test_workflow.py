@@ -0,0 +1,164 @@
+import asyncio
+import time
+import pytest
+from unittest.mock import AsyncMock
+from src.agents.inventory_agent import InventoryAgent
+from src.agents.style_advisor_agent import StyleAdvisorAgent
+from src.agents.trend_analyzer_agent import TrendAnalyzerAgent
+from src.core.agent_base import BaseAgent
+from src.core.mcp import MCPMessage
+from src.core.models import Customer, Product
+from src.core.workflow import FanOut, WorkflowManager, WorkflowState
+
+def _agent(name, response):
+    agent = type(name, (), {})()
+    agent.process = AsyncMock(return_value=response)
+    return agent
+
+@pytest.fixture
+def workflow_manager():
+    manager = WorkflowManager()
+    manager.agents = {
+        "dialog": _agent("DialogAgent", MCPMessage("dialog_response", {"product_query": "soie"})),
+        "inventory": _agent("InventoryAgent", MCPMessage("inventory_response", {"availability": False}))
+    }
+    for agent in manager.agents.values():
+        manager.add_node(agent)
+    return manager
+
+@pytest.mark.asyncio
+async def test_each_run_has_its_own_state(workflow_manager):
+    workflow_manager.add_node(
+        _agent("DialogAgent", MCPMessage("dialog_response", {"response": "Bonjour"}))
+    )
+
+    first = await workflow_manager.run(MCPMessage("dialog_request", {"text": "prix?"}))
+    second = await workflow_manager.run(MCPMessage("dialog_request", {"text": "livraison?"}))
+
+    assert first is not second
+    assert first.message.content["text"] == "prix?"
+    assert list(second.history) == [("DialogAgent", "dialog_response")]
+    assert not hasattr(workflow_manager, "state")
+
+@pytest.mark.asyncio
+async def test_history_is_bounded(workflow_manager, monkeypatch):
+    from src.core import workflow
+
+    monkeypatch.setattr(workflow.settings, "WORKFLOW_HISTORY_SIZE", 3)
+    # Dialog -> Inventory -> Dialog -> ... jusqu'à WORKFLOW_MAX_STEPS
+    state = await workflow_manager.run(MCPMessage("dialog_request", {"text": "rouge?"}))
+
+    assert len(state.history) == 3
+    assert isinstance(state, WorkflowState)
+    with pytest.raises(AttributeError):
+        state.extra = 1
+
+@pytest.mark.asyncio
+async def test_recommendation_fans_out_in_parallel(workflow_manager):
+    async def slow_process(message, delay=0.1):
+        await asyncio.sleep(delay)
+        return MCPMessage("branch_response", {"ok": True})
+
+    for name in ("StyleAdvisorAgent", "TrendAnalyzerAgent", "InventoryAgent"):
+        agent = _agent(name, None)
+        agent.process = AsyncMock(side_effect=slow_process)
+        workflow_manager.add_node(agent)
+    workflow_manager.add_node(
+        _agent("DialogAgent", MCPMessage("dialog_response", {"recommendation_request": True}))
+    )
+
+    started = time.monotonic()
+    state = await workflow_manager.run(MCPMessage("dialog_request", {"text": "une idée cadeau?"}))
+
+    assert time.monotonic() - started < 0.25
+    assert {"StyleAdvisorAgent", "TrendAnalyzerAgent", "InventoryAgent"} <= set(state.results)
+
+@pytest.mark.asyncio
+async def test_each_branch_receives_its_own_request(workflow_manager, session_factory, async_session_factory):
+    with session_factory() as db:
+        db.add_all([
+            Customer(id=7, name="Léa"),
+            Product(id=1, name="Carré soie", price=80.0, stock_quantity=2),
+            Product(id=2, name="Étole laine", price=45.0, stock_quantity=0)
+        ])
+        db.commit()
+    for agent in (StyleAdvisorAgent(), TrendAnalyzerAgent(), InventoryAgent()):
+        agent.session_factory = async_session_factory
+        workflow_manager.add_node(agent)
+    workflow_manager.add_node(
+        _agent("DialogAgent", MCPMessage("dialog_response", {"recommendation_request": True}))
+    )
+
+    state = await workflow_manager.run(
+        MCPMessage("dialog_request", {"text": "une idée cadeau?"}),
+        context={"customer_id": 7}
+    )
+
+    branches = ("StyleAdvisorAgent", "TrendAnalyzerAgent", "InventoryAgent")
+    assert [state.results[name].message_type for name in branches] == [
+        "style_recommendations", "trend_analysis", "inventory_response"
+    ]
+    assert [p["product_id"] for p in state.results["InventoryAgent"].content["products"]] == [1]
+    assert state.errors == []
+
+@pytest.mark.asyncio
+async def test_slow_branch_times_out_without_blocking_others(workflow_manager):
+    async def hang(message):
+        await asyncio.sleep(10)
+
+    slow = _agent("TrendAnalyzerAgent", None)
+    slow.process = AsyncMock(side_effect=hang)
+    workflow_manager.add_node(slow)
+    state = WorkflowState(MCPMessage("dialog_request", {}))
+
+    await workflow_manager._run_fan_out(
+        state, FanOut(("TrendAnalyzerAgent", "InventoryAgent"), timeout=0.05)
+    )
+
+    assert state.results["TrendAnalyzerAgent"].content["error"] == "timeout"
+    assert state.results["InventoryAgent"].message_type == "inventory_response"
+    assert len(state.errors) == 1
+
+class FlakyAgent(BaseAgent):
+    def __init__(self):
+        super().__init__()
+        self.initializations = 0
+        self.calls = 0
+
+    async def initialize(self):
+        self.initializations += 1
+
+    async def process(self, message):
+        self.calls += 1
+        await asyncio.sleep(0)
+        raise RuntimeError("modèle indisponible")
+
+@pytest.mark.asyncio
+async def test_retries_counted_per_message():
+    agent = FlakyAgent()
+    messages = [MCPMessage("vision_request", {"i": i}) for i in range(4)]
+
+    errors = await asyncio.gather(*(
+        agent.handle_error(RuntimeError("échec"), {"original_message": message})
+        for message in messages
+    ))
+
+    assert [error.metadata["retry_count"] for error in errors] == [agent.max_retries] * 4
+    assert agent.calls == 4 * agent.max_retries
+    assert agent.initializations == 0
+
+@pytest.mark.asyncio
+async def test_failing_agent_is_retried_by_one_layer_only(workflow_manager):
+    agent = type("VisionAgent", (FlakyAgent,), {})()
+    workflow_manager.add_node(agent)
+    workflow_manager.entry_point = "VisionAgent"
+    workflow_manager.add_node(
+        _agent("DialogAgent", MCPMessage("dialog_response", {"response": "Pouvez-vous décrire le foulard ?"}))
+    )
+
+    state = await workflow_manager.run(MCPMessage("vision_request", {}))
+
+    # Un essai puis max_retries reprises, avant le repli sur le dialogue
+    assert agent.calls == 1 + agent.max_retries
+    assert state.retry_count == {"VisionAgent": agent.max_retries}
+    assert [name for name, _ in state.history] == ["VisionAgent", "DialogAgent"]
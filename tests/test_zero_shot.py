@@ -0,0 +1,48 @@
+import re
+import numpy as np
+from src.core.zero_shot import EmbeddingZeroShotClassifier
+
+class BagOfWordsEncoder:
+    """Encodeur de test : sac de mots normalisé sur un vocabulaire construit à la volée"""
+
+    def __init__(self):
+        self.vocabulary = {}
+        self.calls = 0
+
+    def encode(self, texts, **kwargs):
+        self.calls += 1
+        rows = []
+        for text in texts:
+            words = re.findall(r"[\w-]+", text.lower())
+            for word in words:
+                self.vocabulary.setdefault(word, len(self.vocabulary))
+            rows.append(words)
+        embeddings = np.zeros((len(texts), 256), dtype=np.float32)
+        for row, words in enumerate(rows):
+            for word in words:
+                embeddings[row, self.vocabulary[word]] += 1
+        return embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+
+CANDIDATES = {
+    "color": ["rouge", "bleu", "vert"],
+    "material": ["soie", "coton", "laine"],
+    "pattern": ["fleuri", "rayé", "uni"]
+}
+
+def test_labels_encoded_once_and_texts_in_one_pass():
+    encoder = BagOfWordsEncoder()
+    classifier = EmbeddingZeroShotClassifier(CANDIDATES, encoder=encoder, threshold=0.5, temperature=0.05)
+    classifier.load()
+    assert classifier.label_embeddings.shape[0] == 9
+
+    results = classifier.classify(["foulard en soie rouge", "foulard bleu en coton"])
+    assert encoder.calls == 2
+    assert results[0]["color"] == "rouge"
+    assert results[0]["material"] == "soie"
+    assert results[1] == {"color": "bleu", "material": "coton", "pattern": None}
+
+def test_threshold_rejects_ambiguous_attributes():
+    classifier = EmbeddingZeroShotClassifier(CANDIDATES, encoder=BagOfWordsEncoder(), threshold=0.5, temperature=0.05)
+    results = classifier.classify(["foulard rouge et vert"])
+    assert results[0]["color"] is None
+    assert classifier.classify([]) == []
@@ -0,0 +1,83 @@
+"""Embeddings produits stockés en binaire
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+import json
+from typing import Sequence, Union
+
+from alembic import op
+import numpy as np
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 1000
+
+products = sa.table('products',
+    sa.column('id', sa.Integer()),
+    sa.column('embedding', sa.String()),
+    sa.column('embedding_vector', sa.LargeBinary()),
+    sa.column('embedding_dim', sa.Integer()),
+    sa.column('embedding_dtype', sa.String())
+)
+
+def _convert(source: str, convert) -> None:
+    """Recopie une colonne d'embedding vers une autre, par lots de BATCH_SIZE produits"""
+    connection = op.get_bind()
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            sa.select(products.c.id, products.c[source], products.c.embedding_dim, products.c.embedding_dtype)
+            .where(products.c.id > last_id, products.c[source].isnot(None))
+            .order_by(products.c.id)
+            .limit(BATCH_SIZE)
+        ).fetchall()
+        if not rows:
+            break
+        for row in rows:
+            connection.execute(
+                products.update().where(products.c.id == row[0]).values(**convert(*row[1:]))
+            )
+        last_id = rows[-1][0]
+
+def _to_binary(embedding, dim, dtype) -> dict:
+    vector = np.asarray(json.loads(embedding), dtype='<f4').reshape(-1)
+    return {'embedding_vector': vector.tobytes(), 'embedding_dim': vector.shape[0], 'embedding_dtype': 'float32'}
+
+def _to_json(data, dim, dtype) -> dict:
+    vector = np.frombuffer(data, dtype=np.dtype(dtype or 'float32').newbyteorder('<'))
+    return {'embedding': json.dumps(vector.astype(float).tolist())}
+
+def upgrade() -> None:
+    # Nouvelles colonnes binaires, remplies depuis les vecteurs JSON
+    with op.batch_alter_table('products') as batch_op:
+        batch_op.add_column(sa.Column('embedding_vector', sa.LargeBinary(), nullable=True))
+        batch_op.add_column(sa.Column('embedding_dim', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('embedding_dtype', sa.String(length=16), nullable=True))
+    
+    _convert('embedding', _to_binary)
+    
+    # La colonne binaire prend le nom de l'ancienne colonne texte
+    with op.batch_alter_table('products') as batch_op:
+        batch_op.drop_column('embedding')
+        batch_op.alter_column('embedding_vector', new_column_name='embedding')
+
+def downgrade() -> None:
+    with op.batch_alter_table('products') as batch_op:
+        batch_op.alter_column('embedding', new_column_name='embedding_vector')
+    with op.batch_alter_table('products') as batch_op:
+        batch_op.add_column(sa.Column('embedding', sa.String(), nullable=True))
+    
+    _convert('embedding_vector', _to_json)
+    
+    with op.batch_alter_table('products') as batch_op:
+        batch_op.drop_column('embedding_vector')
+        batch_op.drop_column('embedding_dtype')
+        batch_op.drop_column('embedding_dim')